@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Analysis Package
+
+Importable processing for the analysis notebooks (analysis_plots/), so
+measurement CSVs are processed on whole columns and cached instead of
+reparsed cell by cell in each notebook.
+
+Modules:
+    - compute: Compute run derived columns, significant-figure rounding,
+      cached loading and the iOut1 range report
+"""
+
+# Functions are imported on first access (PEP 562), so importing the package
+# does not load pandas
+_LAZY_ATTRIBUTES = {
+    'round_sig_figs': '.compute',
+    'df_round_sig_figs': '.compute',
+    'process_compute': '.compute',
+    'find_compute_runs': '.compute',
+    'load_compute_run': '.compute',
+    'load_compute_runs': '.compute',
+    'iout1_range_report': '.compute',
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
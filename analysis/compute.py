@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""
+Compute Run Analysis
+====================
+
+Derived columns, significant-figure rounding and the iOut1 range report for
+Compute experiment CSVs (analysis_plots/compute_analysis.ipynb), on whole
+columns instead of per cell:
+
+- round_sig_figs() rounds an array with NumPy log10/floor (the notebook's
+  round_to_n_sig_figs via Series.apply, one Python call per cell).
+- load_compute_run() parses and processes a run once and caches the result
+  (Parquet when pyarrow is installed, pickle otherwise) under cache/analysis/,
+  keyed on the source's mtime and size (CRC for runs inside archive zips).
+- find_compute_runs() looks runs up in the run index (experiments/run_index.py).
+- iout1_range_report() bins the IOUT values of all runs in one pass.
+
+Usage:
+    from analysis.compute import find_compute_runs, load_compute_run, iout1_range_report
+
+    runs = {source.name: load_compute_run(source) for source in find_compute_runs()}
+    report = iout1_range_report(runs)
+"""
+
+from __future__ import annotations
+
+import glob
+import hashlib
+import logging
+import os
+import pickle
+import zipfile
+from typing import Dict, Iterable, List, NamedTuple, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MEASUREMENTS_DIR = os.path.join(REPO_ROOT, "measurements")
+ARCHIVE_DIR = os.path.join(REPO_ROOT, "archive")
+CACHE_DIR = os.path.join(REPO_ROOT, "cache", "analysis")
+
+# Bump when process_compute() changes, so cached runs are reprocessed
+PROCESSING_VERSION = 1
+
+# Columns: value / IREFP, 3 decimal places
+DIVIDE_BY_IREFP = ["KGAIN1", "KGAIN2", "TRIM1", "TRIM2"]
+# Columns: A*2/IREFP - 1
+LINEAR_IREFP = ["X1", "X2", "F11", "F12", "IMEAS"]
+
+# iOut1 report range edges (A)
+NA_1 = 1e-9
+NA_100 = 100e-9
+
+# Powers of ten are exact as doubles up to 1e22
+_EXACT_POW10 = 22
+# Scaled values this close to x.5 may round either way; left to round()
+_TIE_TOLERANCE = 1e-6
+
+
+def round_sig_figs(values, n: int = 5):
+    """
+    Round to n significant figures; 0, NaN and Inf are kept.
+
+    Vectorized round(x, n - 1 - floor(log10(|x|))): the value is scaled by a
+    power of ten, rounded and scaled back. Values whose scaled value is
+    within rounding error of a tie (e.g. 1.01845e-05 to 5 figures), or that
+    need more than 22 decimals (10**d no longer exact), go through round()
+    itself, so results match it exactly.
+
+    Args:
+        values: Scalar, array or Series of floats
+
+    Returns:
+        Same type as values (Series keep their index and name)
+    """
+    if isinstance(values, pd.Series):
+        return pd.Series(round_sig_figs(values.to_numpy(dtype=float), n),
+                         index=values.index, name=values.name)
+    x = np.asarray(values, dtype=float)
+    out = x.copy()
+    finite = np.flatnonzero(np.isfinite(x) & (x != 0))
+    xf = x.ravel()[finite]
+    decimals = n - 1 - np.floor(np.log10(np.abs(xf))).astype(int)
+
+    # Near the ends of the float range the scaling overflows (inf, then
+    # inf - inf = NaN); those values need more than 22 decimals and are
+    # redone by round() below
+    with np.errstate(over="ignore", invalid="ignore"):
+        scale = 10.0 ** np.abs(decimals)
+        up = decimals >= 0
+        scaled = np.where(up, xf * scale, xf / scale)
+        rounded = np.round(scaled)
+        rounded = np.where(up, rounded / scale, rounded * scale)
+        exact = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) > _TIE_TOLERANCE
+    exact &= np.abs(decimals) <= _EXACT_POW10
+    for i in np.flatnonzero(~exact):
+        try:
+            rounded[i] = round(float(xf[i]), int(decimals[i]))
+        except OverflowError:
+            rounded[i] = xf[i]  # Rounds past the largest float: keep the value
+    out.ravel()[finite] = rounded
+    return out if out.ndim else float(out)
+
+
+def df_round_sig_figs(df: pd.DataFrame, n: int = 5) -> pd.DataFrame:
+    """Round all float columns to n significant figures (avoids 9.99...e-09 etc.)."""
+    out = df.copy()
+    for col in out.columns:
+        if out[col].dtype.kind == "f":
+            out[col] = round_sig_figs(out[col].to_numpy(), n)
+    return out
+
+
+def process_compute(df: pd.DataFrame, n: int = 5) -> pd.DataFrame:
+    """
+    Add the notebook's derived columns to a Compute CSV.
+
+    e columns (e-prefixed) are bound to [-1, 1], i columns to ±5×IREFP;
+    floats are rounded to n significant figures, OUT1_current is renamed
+    IOUT_meas (moved last) and iOut1 IOUT_sim.
+
+    Raises:
+        ValueError: If the CSV has no IREFP column
+    """
+    if "IREFP" not in df.columns:
+        raise ValueError("no IREFP column")
+    df = df.copy()
+    irefp = df["IREFP"].replace(0, np.nan)
+
+    for col in DIVIDE_BY_IREFP:
+        if col in df.columns:
+            df["e" + col] = (df[col] / irefp).round(3)
+    for col in LINEAR_IREFP:
+        if col in df.columns:
+            df["e" + col] = df[col] * 2 / irefp - 1
+    _clip_e_columns(df)
+
+    df["eXhat"] = df["eX1"] * df["eF11"] + df["eX2"] * df["eF12"]
+    df["eY"] = df["eIMEAS"] - df["eXhat"]
+    df["eXhatplus"] = df["eY"] * df["eKGAIN1"] + df["eXhat"]
+    df["iXhatplus"] = (df["eXhatplus"] + 1) * df["IREFP"] / 2
+
+    # iDeltaX: iXhatplus - X1 for ERASE, X1 - iXhatplus otherwise; minimum 1e-10
+    is_erase = (df["PPG_state"] == "ERASE")
+    df["iDeltaX"] = np.where(is_erase, df["iXhatplus"] - df["X1"], df["X1"] - df["iXhatplus"])
+    df["iDeltaX"] = df["iDeltaX"].clip(lower=1e-10)
+    df["iOut1"] = df["X1"] * df["TRIM1"] / df["iDeltaX"]
+    _clip_e_columns(df)
+
+    irefp_5 = 5.0 * df["IREFP"]
+    for c in [c for c in df.columns if c.startswith("i")]:
+        df[c] = df[c].clip(-irefp_5, irefp_5)
+
+    df = df_round_sig_figs(df, n)
+
+    rename_map = {}
+    if "OUT1_current" in df.columns:
+        rename_map["OUT1_current"] = "IOUT_meas"
+    if "iOut1" in df.columns:
+        rename_map["iOut1"] = "IOUT_sim"
+    if rename_map:
+        df = df.rename(columns=rename_map)
+    if "IOUT_meas" in df.columns:
+        df = df[[c for c in df.columns if c != "IOUT_meas"] + ["IOUT_meas"]]
+    return df
+
+
+def _clip_e_columns(df: pd.DataFrame) -> None:
+    for c in [c for c in df.columns if c.startswith("e")]:
+        df[c] = df[c].clip(-1.0, 1.0)
+
+
+# ============================================================================
+# Cached loading
+# ============================================================================
+
+class RunSource(NamedTuple):
+    """A Compute CSV, on disk or inside an archive zip."""
+    name: str                     # CSV stem, e.g. compute_20260115_161903
+    path: str                     # CSV or zip path
+    member: Optional[str] = None  # Zip member name
+
+    def cache_key(self) -> str:
+        """Identity of the source's current contents."""
+        if self.member is None:
+            st = os.stat(self.path)
+            return f"{os.path.abspath(self.path)}:{st.st_mtime_ns}:{st.st_size}"
+        with zipfile.ZipFile(self.path) as zf:
+            info = zf.getinfo(self.member)
+        return f"{os.path.abspath(self.path)}:{self.member}:{info.CRC:08x}:{info.file_size}"
+
+    def read_csv(self) -> pd.DataFrame:
+        """Parse the raw CSV."""
+        if self.member is None:
+            return pd.read_csv(self.path)
+        with zipfile.ZipFile(self.path) as zf, zf.open(self.member) as f:
+            return pd.read_csv(f)
+
+
+def find_compute_runs(measurements_dir: str = MEASUREMENTS_DIR,
+                      archive_dir: Optional[str] = ARCHIVE_DIR,
+                      use_index: bool = True, rescan: bool = False) -> List[RunSource]:
+    """
+    Compute runs (compute_<timestamp>.csv) in measurements/ and in the
+    archive zips, by name; a run in measurements/ wins over an archived copy.
+
+    With use_index, the run index (experiments/run_index.py) is queried; it
+    holds the runs recorded at runner shutdown and the archives written by
+    archive_by_timestamp. rescan first updates it from the directories
+    (walking measurements_dir, reading new or changed zips), for files
+    written outside a runner. Without use_index, the directory and every zip
+    are listed.
+    """
+    if use_index:
+        return _indexed_compute_runs(measurements_dir, archive_dir, rescan)
+    runs: Dict[str, RunSource] = {}
+    if archive_dir and os.path.isdir(archive_dir):
+        for zip_path in sorted(glob.glob(os.path.join(archive_dir, "*.zip"))):
+            try:
+                with zipfile.ZipFile(zip_path) as zf:
+                    members = zf.namelist()
+            except zipfile.BadZipFile:
+                logger.warning(f"Skipping unreadable archive {zip_path}")
+                continue
+            for member in members:
+                base = os.path.basename(member)
+                if base.startswith("compute_") and base.endswith(".csv"):
+                    runs[base[:-4]] = RunSource(base[:-4], zip_path, member)
+    for path in sorted(glob.glob(os.path.join(measurements_dir, "compute_*.csv"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        runs[name] = RunSource(name, path)
+    return [runs[name] for name in sorted(runs)]
+
+
+def _indexed_compute_runs(measurements_dir: str, archive_dir: Optional[str],
+                          rescan: bool) -> List[RunSource]:
+    from experiments.run_index import RunIndex
+
+    measurements_dir = os.path.abspath(measurements_dir)
+    archive_dir = os.path.abspath(archive_dir) if archive_dir else None
+    with RunIndex() as index:
+        if rescan:
+            index.scan([measurements_dir], archive_dir)
+        files = index.files(glob="compute_*.csv")
+    runs: Dict[str, RunSource] = {}
+    for f in sorted(files, key=lambda f: f.member is None):  # Archived copies first
+        name = f.name[:-4]
+        if f.member is not None:
+            if archive_dir and os.path.dirname(f.path) == archive_dir:
+                runs[name] = RunSource(name, f.path, f.member)
+        elif os.path.dirname(f.path) == measurements_dir:
+            runs[name] = RunSource(name, f.path)
+    return [runs[name] for name in sorted(runs)]
+
+
+def _cache_format() -> str:
+    try:
+        import pyarrow  # noqa: F401
+        return "parquet"
+    except ImportError:
+        return "pkl"
+
+
+def load_compute_run(source: Union[RunSource, str], n: int = 5,
+                     cache_dir: Optional[str] = CACHE_DIR) -> pd.DataFrame:
+    """
+    Processed run (process_compute), from the cache when the source is unchanged.
+
+    Args:
+        source: RunSource or CSV path
+        n: Significant figures
+        cache_dir: Cache directory (None: no cache)
+
+    Raises:
+        ValueError: If the CSV has no IREFP column
+    """
+    if isinstance(source, str):
+        source = RunSource(os.path.splitext(os.path.basename(source))[0], source)
+    if cache_dir is None:
+        return process_compute(source.read_csv(), n)
+
+    fmt = _cache_format()
+    key = f"{PROCESSING_VERSION}:{n}:{source.cache_key()}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    cache_path = os.path.join(cache_dir, f"{source.name}_{digest}.{fmt}")
+    if os.path.exists(cache_path):
+        if fmt == "parquet":
+            return pd.read_parquet(cache_path)
+        with open(cache_path, "rb") as f:
+            return pickle.load(f)
+
+    df = process_compute(source.read_csv(), n)
+    os.makedirs(cache_dir, exist_ok=True)
+    for stale in glob.glob(os.path.join(cache_dir, f"{source.name}_*.{fmt}")):
+        os.remove(stale)
+    tmp_path = cache_path + ".tmp"
+    if fmt == "parquet":
+        df.to_parquet(tmp_path, index=False)
+    else:
+        with open(tmp_path, "wb") as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+    logger.debug(f"Cached {source.name} ({len(df)} rows) in {cache_path}")
+    return df
+
+
+def load_compute_runs(sources: Optional[Iterable[RunSource]] = None, n: int = 5,
+                      cache_dir: Optional[str] = CACHE_DIR) -> Dict[str, pd.DataFrame]:
+    """Processed runs by name (default: all of find_compute_runs()); runs without IREFP are skipped."""
+    runs = {}
+    for source in (find_compute_runs() if sources is None else sources):
+        try:
+            runs[source.name] = load_compute_run(source, n, cache_dir)
+        except ValueError as e:
+            logger.info(f"Skip {source.name}: {e}")
+    return runs
+
+
+# ============================================================================
+# iOut1 range report
+# ============================================================================
+
+REPORT_SERIES = (("IOUT_sim", "sim"), ("IOUT_meas", "measured"))
+
+
+def iout1_range_report(runs: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Counts of IOUT_sim / IOUT_meas values by range (<1 nA, 1-100 nA, >100 nA)
+    per run, one row per run and series.
+
+    All series are binned in one np.bincount over (series, range) codes;
+    NaN counts towards the total only.
+    """
+    labels = []
+    codes = []
+    for dataset, df in runs.items():
+        for column, series_type in REPORT_SERIES:
+            if column not in df.columns:
+                continue
+            values = df[column].to_numpy(dtype=float)
+            code = (values >= NA_1).astype(np.int64) + (values > NA_100)
+            code[np.isnan(values)] = 3
+            codes.append(code + 4 * len(labels))
+            labels.append((dataset, series_type))
+    counts = np.bincount(np.concatenate(codes), minlength=4 * len(labels)).reshape(-1, 4) \
+        if labels else np.zeros((0, 4), dtype=np.int64)
+
+    total = counts.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(total[:, None] > 0, round_sig_figs(100 * counts[:, :3] / total[:, None], 3), 0)
+    return pd.DataFrame({
+        "dataset": [label[0] for label in labels],
+        "series_type": [label[1] for label in labels],
+        "total": total,
+        "below_1nA": counts[:, 0],
+        "within_1nA_to_100nA": counts[:, 1],
+        "above_100nA": counts[:, 2],
+        "pct_below_1nA": pct[:, 0],
+        "pct_within_1nA_100nA": pct[:, 1],
+        "pct_above_100nA": pct[:, 2],
+    })
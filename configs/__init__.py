@@ -15,9 +15,28 @@ The CSV file is NOT read at runtime - these configurations are pre-generated.
 """
 
 from .resource_types import MeasurementType, InstrumentType, ChannelType
-from .compute import COMPUTE_CONFIG
-from .programmer import PROGRAMMER_CONFIG
-from .big_kalman import BIG_KALMAN_CONFIG
+
+# Experiment configurations are loaded on first access (PEP 562), so importing
+# one settings module does not build every experiment's configuration
+_LAZY_ATTRIBUTES = {
+    'COMPUTE_CONFIG': '.compute',
+    'PROGRAMMER_CONFIG': '.programmer',
+    'BIG_KALMAN_CONFIG': '.big_kalman',
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
 
 __all__ = [
     'MeasurementType',
@@ -0,0 +1,512 @@
+# -*- coding: utf-8 -*-
+"""
+Terminal-to-Channel Allocator
+
+Generates experiment configurations (configs/compute.py style) from the
+csvs/instrument_config.csv design specification, instead of allocating
+channels by hand.
+
+The CSV gives, per pin, the terminal name and its measurement type in each
+experiment column (V, I, GNDU, VSU, PPG, COUNTER). Allocation follows the
+channel priorities in resource_types.VALID_CHANNEL_TYPES and optimizes for
+measurement throughput using per-experiment AllocationHints:
+
+    1. Fixed-function terminals: GNDU -> 5270B GNDU, PPG -> 81104A,
+       COUNTER -> 53230A.
+    2. Terminals measured together (one MM spot) are placed on one
+       instrument, chosen to hold the whole group.
+    3. Remaining V terminals (HR-SMU priority).
+    4. Sweep sources (changed every point) on the instrument of the
+       measured terminals, so a point touches as few instruments as possible.
+    5. VSU terminals, then the remaining (fixed) I terminals.
+
+Within a step, terminals are taken in CSV order, and each takes the first
+free channel of the best valid channel type.
+
+transaction_report() estimates the GPIB transactions per measured point of
+any ExperimentConfig: one write per sweep source plus MM / XE / read for
+each instrument in a measurement group.
+
+Usage:
+    python -m configs.allocator Compute [--output configs/compute_generated.py] [--compare]
+
+    --output:  write the generated config module (default: print it)
+    --compare: also report the hand-allocated config (configs/<experiment>.py)
+"""
+
+import argparse
+import csv
+import os
+import sys
+from enum import Enum
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = "configs"
+
+from .resource_types import (
+    MeasurementType, InstrumentType, ChannelInfo, TerminalConfig,
+    ExperimentConfig, MeasurementProfile, VALID_CHANNEL_TYPES,
+    E5270B_CHANNELS, A4156B_CHANNELS, A81104A_CHANNELS, K53230A_CHANNELS,
+)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CSV = os.path.join(REPO_ROOT, "csvs", "instrument_config.csv")
+
+# Channel pool in preference order (instrument, then channel number)
+ALL_CHANNELS: List[ChannelInfo] = [
+    info
+    for table in (E5270B_CHANNELS, A4156B_CHANNELS, A81104A_CHANNELS, K53230A_CHANNELS)
+    for _, info in sorted(table.items())
+]
+
+# MM, XE and data read per instrument in a measurement group
+TRANSACTIONS_PER_MM = 3
+
+
+class AllocationError(Exception):
+    """No valid free channel for a terminal."""
+
+
+class CsvTerminal(NamedTuple):
+    """One terminal of one experiment column of instrument_config.csv."""
+    pin: int
+    terminal: str
+    measurement_type: MeasurementType
+
+
+class AllocationHints(NamedTuple):
+    """How an experiment drives its terminals (not part of the CSV)."""
+    measured_together: Tuple[Tuple[str, ...], ...] = ()  # Terminals sharing one MM spot
+    sweep_sources: Tuple[str, ...] = ()                  # Sources changed every point
+    instruments: Optional[Tuple[InstrumentType, ...]] = None  # Allowed instruments (None = all)
+    description: str = ""
+
+
+ALLOCATION_HINTS: Dict[str, AllocationHints] = {
+    # run_compute measures OUT1 with the source voltages in one MM per
+    # instrument; OUT2 is biased at VDD but not measured
+    "Compute": AllocationHints(
+        measured_together=(
+            ("OUT1", "X1", "IMEAS", "TRIM1", "TRIM2", "F11", "F12"),
+            ("X2", "KGAIN1", "KGAIN2", "IREFP"),
+        ),
+        sweep_sources=("X1", "IMEAS"),
+        description="Computation mode characterization with spot current measurements",
+    ),
+    "Programmer": AllocationHints(
+        measured_together=(("ICELLMEAS",),),
+        sweep_sources=("PROG_IN", "IREFP"),
+        instruments=(InstrumentType.IV5270B, InstrumentType.PG81104A, InstrumentType.CT53230A),
+        description="Programming timing measurement - time from WR_ENB low to PROG_OUT low",
+    ),
+}
+
+
+def read_instrument_csv(path: str = DEFAULT_CSV) -> Dict[str, List[CsvTerminal]]:
+    """
+    Read instrument_config.csv.
+
+    Returns:
+        Experiment column name -> terminals with a measurement type, in CSV order.
+    """
+    experiments: Dict[str, List[CsvTerminal]] = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        columns = [c for c in reader.fieldnames or [] if c not in ("Pins", "Terminals")]
+        for column in columns:
+            experiments[column] = []
+        for row in reader:
+            terminal = (row.get("Terminals") or "").strip()
+            if not terminal:
+                continue
+            for column in columns:
+                value = (row.get(column) or "").strip()
+                if value:
+                    experiments[column].append(
+                        CsvTerminal(int(row["Pins"]), terminal, MeasurementType[value]))
+    return experiments
+
+
+class _ChannelPool:
+    """Free channels, taken by measurement-type priority."""
+
+    def __init__(self, instruments: Optional[Sequence[InstrumentType]] = None):
+        self.free = [c for c in ALL_CHANNELS if instruments is None or c.instrument in instruments]
+
+    def find(self, mtype: MeasurementType,
+             instrument: Optional[InstrumentType] = None,
+             exclude: Sequence[ChannelInfo] = ()) -> Optional[ChannelInfo]:
+        for channel_type in VALID_CHANNEL_TYPES[mtype]:
+            for info in self.free:
+                if (info.channel_type == channel_type and info not in exclude
+                        and (instrument is None or info.instrument == instrument)):
+                    return info
+        return None
+
+    def take(self, info: ChannelInfo) -> ChannelInfo:
+        self.free.remove(info)
+        return info
+
+    def instruments(self) -> List[InstrumentType]:
+        seen: List[InstrumentType] = []
+        for info in self.free:
+            if info.instrument not in seen:
+                seen.append(info.instrument)
+        return seen
+
+
+def _group_fit(pool: _ChannelPool, members: Sequence[CsvTerminal],
+               instrument: InstrumentType) -> Optional[List[ChannelInfo]]:
+    """Channels for a whole group on one instrument (V first), or None."""
+    chosen: List[ChannelInfo] = []
+    for t in sorted(members, key=lambda t: t.measurement_type != MeasurementType.V):
+        info = pool.find(t.measurement_type, instrument, exclude=chosen)
+        if info is None:
+            return None
+        chosen.append(info)
+    # Back in member order
+    order = sorted(members, key=lambda t: t.measurement_type != MeasurementType.V)
+    by_terminal = {t.terminal: info for t, info in zip(order, chosen)}
+    return [by_terminal[t.terminal] for t in members]
+
+
+def allocate(name: str, terminals: Sequence[CsvTerminal],
+             hints: Optional[AllocationHints] = None) -> ExperimentConfig:
+    """
+    Assign every terminal of an experiment to an instrument channel.
+
+    Raises:
+        AllocationError: If a terminal (or a measured-together group) has no
+                         valid free channel.
+    """
+    hints = hints or ALLOCATION_HINTS.get(name, AllocationHints())
+    pool = _ChannelPool(hints.instruments)
+    by_name = {t.terminal: t for t in terminals}
+    assigned: Dict[str, Tuple[CsvTerminal, ChannelInfo]] = {}
+
+    def place(t: CsvTerminal, instrument: Optional[InstrumentType] = None) -> None:
+        info = pool.find(t.measurement_type, instrument)
+        if info is None and instrument is not None:
+            info = pool.find(t.measurement_type)  # Fall back to any instrument
+        if info is None:
+            raise AllocationError(f"{name}: no free channel for {t.terminal} ({t.measurement_type.name})")
+        assigned[t.terminal] = (t, pool.take(info))
+
+    def pending(mtypes: Sequence[MeasurementType]) -> List[CsvTerminal]:
+        return [t for t in terminals if t.terminal not in assigned and t.measurement_type in mtypes]
+
+    # 1. Fixed-function terminals
+    for t in pending([MeasurementType.GNDU, MeasurementType.PPG, MeasurementType.COUNTER]):
+        place(t)
+
+    # 2. Measured-together groups, each on one instrument
+    measure_instrument: Optional[InstrumentType] = None
+    for group in hints.measured_together:
+        members = [by_name[n] for n in group if n in by_name and n not in assigned]
+        if not members:
+            continue
+        for instrument in pool.instruments():
+            fit = _group_fit(pool, members, instrument)
+            if fit is not None:
+                for t, info in zip(members, fit):
+                    assigned[t.terminal] = (t, pool.take(info))
+                measure_instrument = measure_instrument or instrument
+                break
+        else:
+            raise AllocationError(f"{name}: no instrument can hold {', '.join(group)} together")
+
+    # 3. Remaining V terminals (HR-SMU priority)
+    for t in pending([MeasurementType.V]):
+        place(t)
+
+    # 4. Sweep sources next to the measured terminals
+    for source in hints.sweep_sources:
+        t = by_name.get(source)
+        if t is not None and t.terminal not in assigned:
+            place(t, measure_instrument)
+
+    # 5. VSU, then fixed I terminals
+    for t in pending([MeasurementType.VSU]):
+        place(t)
+    for t in pending([MeasurementType.I]):
+        place(t)
+
+    config_terminals = {}
+    for t in terminals:
+        csv_terminal, info = assigned[t.terminal]
+        config_terminals[t.terminal] = TerminalConfig(
+            terminal=t.terminal,
+            measurement_type=t.measurement_type,
+            instrument=info.instrument,
+            channel=info.channel,
+            description=f"{t.terminal} - {info.description} (Pin {t.pin})",
+        )
+    instruments_used = [inst for inst in InstrumentType
+                        if any(cfg.instrument == inst for cfg in config_terminals.values())]
+    return ExperimentConfig(
+        name=name,
+        description=hints.description or f"{name} experiment",
+        terminals=config_terminals,
+        instruments_used=instruments_used,
+    )
+
+
+def transaction_report(config: ExperimentConfig, hints: Optional[AllocationHints] = None) -> Dict[str, object]:
+    """
+    Estimate GPIB transactions per measured point.
+
+    Returns:
+        Dict with sweep writes, MM groups (terminals -> instruments), the
+        instruments touched per point and the total transactions per point.
+    """
+    hints = hints or ALLOCATION_HINTS.get(config.name, AllocationHints())
+    terminals = config.terminals
+    sweep = [s for s in hints.sweep_sources if s in terminals]
+    groups = []
+    touched = {terminals[s].instrument for s in sweep}
+    mm_transactions = 0
+    for group in hints.measured_together:
+        present = [n for n in group if n in terminals]
+        instruments = sorted({terminals[n].instrument for n in present}, key=lambda i: i.value)
+        groups.append({"terminals": present, "instruments": [i.value for i in instruments]})
+        touched.update(instruments)
+        mm_transactions += TRANSACTIONS_PER_MM * len(instruments)
+    return {
+        "experiment": config.name,
+        "sweep_writes": len(sweep),
+        "measurement_groups": groups,
+        "instruments_per_point": len(touched),
+        "transactions_per_point": len(sweep) + mm_transactions,
+    }
+
+
+def format_report(report: Dict[str, object], title: str) -> str:
+    """Human-readable transaction report."""
+    lines = [f"{title}:"]
+    lines.append(f"  Sweep writes per point:       {report['sweep_writes']}")
+    for group in report["measurement_groups"]:
+        lines.append(f"  MM group {', '.join(group['terminals'])}: "
+                     f"{len(group['instruments'])} instrument(s) ({', '.join(group['instruments'])})")
+    lines.append(f"  Instruments touched per point: {report['instruments_per_point']}")
+    lines.append(f"  Transactions per point:        {report['transactions_per_point']}")
+    return "\n".join(lines)
+
+
+def _literal(value, indent: int = 0) -> str:
+    """Python source for a config value (dicts and lists one entry per line)."""
+    pad, inner = "    " * indent, "    " * (indent + 1)
+    if isinstance(value, Enum):
+        return f"{type(value).__name__}.{value.name}"
+    if isinstance(value, MeasurementProfile):
+        fields = ", ".join(f"{field}={getattr(value, field)!r}" for field in value._fields
+                           if getattr(value, field) != MeasurementProfile._field_defaults[field])
+        return f"MeasurementProfile({fields})"
+    if isinstance(value, dict):
+        if not value:
+            return "{}"
+        items = [f"{inner}{_literal(k)}: {_literal(v, indent + 1)}," for k, v in value.items()]
+        return "{\n" + "\n".join(items) + f"\n{pad}}}"
+    if isinstance(value, list):
+        if not value or not any(isinstance(v, (dict, list)) for v in value):
+            return "[" + ", ".join(_literal(v) for v in value) + "]"
+        items = [f"{inner}{_literal(v, indent + 1)}," for v in value]
+        return "[\n" + "\n".join(items) + f"\n{pad}]"
+    if isinstance(value, tuple):
+        return "(" + "".join(f"{_literal(v)}, " for v in value).rstrip() + ")"
+    if isinstance(value, str) and '"' not in value and "\\" not in value:
+        return f'"{value}"'
+    return repr(value)
+
+
+def _reallocated(value, config: ExperimentConfig):
+    """value with terminal -> channel maps (sweep/measure channels) taken from config."""
+    if not isinstance(value, dict):
+        return value
+    value = dict(value)
+    terminals = config.terminals
+    for key in ("sweep_channels", "measure_channels"):
+        if isinstance(value.get(key), dict):
+            value[key] = {name: terminals[name].channel if name in terminals else channel
+                          for name, channel in value[key].items()}
+            if key == "sweep_channels" and value[key] and "instrument" in value:
+                first = next(iter(value[key]))
+                if first in terminals:
+                    value["instrument"] = terminals[first].instrument
+    return value
+
+
+# Helpers derived from the allocation rather than carried over
+_DERIVED = ("TERMINALS", "MEASUREMENT_PROFILES", "CONFIG", "BY_INSTRUMENT", "BY_TYPE",
+            "FIXED_CURRENT_TERMINALS")
+
+
+def render_config_module(config: ExperimentConfig, csv_path: str = DEFAULT_CSV,
+                         hints: Optional[AllocationHints] = None) -> str:
+    """
+    Python source of a config module (configs/compute.py layout) for config.
+
+    Terminals, the terminal groupings (BY_INSTRUMENT, BY_TYPE) and the fixed
+    current terminals come from the allocation. Experiment tables the CSV
+    does not describe (PPG states, linked parameters, defaults, measurement
+    profiles, ...) are carried over from the hand-written configs/<name>.py,
+    so the generated module can replace it.
+    """
+    hints = hints or ALLOCATION_HINTS.get(config.name, AllocationHints())
+    prefix = config.name.upper()
+    existing = _existing_module(config.name)
+    tables = {}
+    if existing is not None:
+        tables = {name: _reallocated(value, config) for name, value in vars(existing).items()
+                  if name.startswith(prefix + "_") and name[len(prefix) + 1:] not in _DERIVED}
+    profiles = {}
+    if config.measurement_profiles:
+        profiles = config.measurement_profiles
+    elif existing is not None:
+        profiles = getattr(existing, f"{prefix}_MEASUREMENT_PROFILES", None) or {}
+    profiles = {name: p for name, p in profiles.items() if name in config.terminals}
+
+    out = [
+        "# -*- coding: utf-8 -*-",
+        '"""',
+        f"{config.name} Experiment Configuration (generated)",
+        "",
+        f"Generated by configs/allocator.py from {os.path.relpath(csv_path, REPO_ROOT)}.",
+        "Edit the CSV or the allocation hints and regenerate rather than editing",
+        "this file by hand.",
+        "",
+        "Resource Allocation Summary:",
+    ]
+    for inst in config.instruments_used:
+        names = sorted((cfg for cfg in config.terminals.values() if cfg.instrument == inst),
+                       key=lambda c: c.channel)
+        out.append(f"    {inst.value}: " + ", ".join(f"{c.terminal} (CH{c.channel})" for c in names))
+    out += [
+        '"""',
+        "",
+        "from .resource_types import (",
+        "    MeasurementType, InstrumentType, TerminalConfig, ExperimentConfig,",
+        "    MeasurementProfile,",
+        ")",
+        "",
+        f"{prefix}_TERMINALS = {{",
+    ]
+    for name, cfg in config.terminals.items():
+        out += [
+            f'    "{name}": TerminalConfig(',
+            f'        terminal="{cfg.terminal}",',
+            f"        measurement_type=MeasurementType.{cfg.measurement_type.name},",
+            f"        instrument=InstrumentType.{cfg.instrument.name},",
+            f"        channel={cfg.channel},",
+            f'        description="{cfg.description}"',
+            "    ),",
+        ]
+    out += [
+        "}",
+        "",
+        f"{prefix}_MEASUREMENT_PROFILES = {_literal(profiles)}",
+        "",
+        f"{prefix}_CONFIG = ExperimentConfig(",
+        f'    name="{config.name}",',
+        f'    description="{config.description}",',
+        f"    terminals={prefix}_TERMINALS,",
+        "    instruments_used=[",
+    ]
+    out += [f"        InstrumentType.{inst.name}," for inst in config.instruments_used]
+    out += [
+        "    ],",
+        f"    measurement_profiles={prefix}_MEASUREMENT_PROFILES,",
+        ")",
+        "",
+        "# Terminals grouped by instrument for efficient setup",
+        f"{prefix}_BY_INSTRUMENT = {{",
+    ]
+    for inst in config.instruments_used:
+        out += [
+            f"    InstrumentType.{inst.name}: {{",
+            f"        name: cfg for name, cfg in {prefix}_TERMINALS.items()",
+            f"        if cfg.instrument == InstrumentType.{inst.name}",
+            "    },",
+        ]
+    out += [
+        "}",
+        "",
+        "# Terminals grouped by measurement type for bias setup",
+        f"{prefix}_BY_TYPE = {{",
+    ]
+    for mtype in MeasurementType:
+        if any(cfg.measurement_type == mtype for cfg in config.terminals.values()):
+            out += [
+                f"    MeasurementType.{mtype.name}: [",
+                f"        name for name, cfg in {prefix}_TERMINALS.items()",
+                f"        if cfg.measurement_type == MeasurementType.{mtype.name}",
+                "    ],",
+            ]
+    fixed = [name for name, cfg in config.terminals.items()
+             if cfg.measurement_type == MeasurementType.I and name not in hints.sweep_sources]
+    out += ["}", ""]
+    if fixed:
+        out += [
+            "# Fixed current terminals (set once per parameter combination, not swept)",
+            f"{prefix}_FIXED_CURRENT_TERMINALS = {_literal(fixed)}",
+            "",
+        ]
+    if tables:
+        out += [
+            f"# Carried over from configs/{config.name.lower()}.py (not described by the CSV)",
+            "",
+        ]
+        for name, value in tables.items():
+            out += [f"{name} = {_literal(value)}", ""]
+    return "\n".join(out)
+
+
+def _existing_module(name: str):
+    """Hand-written config module of an experiment (configs/<name>.py), if any."""
+    import importlib
+    try:
+        return importlib.import_module(f".{name.lower()}", __package__)
+    except ImportError:
+        return None
+
+
+def _existing_config(name: str) -> Optional[ExperimentConfig]:
+    """Hand-allocated config of an experiment (configs/<name>.py), if any."""
+    return getattr(_existing_module(name), f"{name.upper()}_CONFIG", None)
+
+
+def main() -> None:
+    """Allocate one experiment column of the CSV and emit its config module."""
+    parser = argparse.ArgumentParser(description="Generate an experiment config from instrument_config.csv")
+    parser.add_argument("experiment", help="Experiment column of the CSV (e.g. Compute, Programmer)")
+    parser.add_argument("--csv", default=DEFAULT_CSV, help="Design specification CSV")
+    parser.add_argument("--output", help="Write the config module here (default: print it)")
+    parser.add_argument("--compare", action="store_true",
+                        help="Also report the hand-allocated config for comparison")
+    args = parser.parse_args()
+
+    experiments = read_instrument_csv(args.csv)
+    if args.experiment not in experiments:
+        parser.error(f"Unknown experiment {args.experiment!r}; CSV columns: {', '.join(experiments)}")
+    config = allocate(args.experiment, experiments[args.experiment])
+    source = render_config_module(config, args.csv)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(source)
+        print(f"Config written to {args.output}")
+    else:
+        print(source)
+
+    print(format_report(transaction_report(config), "Generated allocation"), file=sys.stderr)
+    if args.compare:
+        existing = _existing_config(args.experiment)
+        if existing is None:
+            print(f"No hand-allocated config for {args.experiment}", file=sys.stderr)
+        else:
+            print(format_report(transaction_report(existing), "Hand-allocated config"), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Bench Definitions
+=================
+
+GPIB address maps for the measurement benches, used by
+`experiments/multi_bench.py` to run one experiment across several benches
+in parallel (one process per bench, each with its own DUT).
+
+Each bench uses the same experiment configuration (configs/compute.py etc.);
+only the instrument addresses differ. Instruments missing from a bench's
+map fall back to experiments.base_experiment.DEFAULT_ADDRESSES.
+"""
+
+from .resource_types import InstrumentType
+
+# ============================================================================
+# 1. BENCH ADDRESS MAPS
+# ============================================================================
+# Bench ID -> {InstrumentType: VISA address}
+# The bench ID is appended to log and CSV file names and is written to the
+# Bench_ID column of the merged CSV.
+
+BENCHES = {
+    "bench1": {
+        InstrumentType.CT53230A: 'GPIB0::5::INSTR',
+        InstrumentType.IV4156B: 'GPIB0::15::INSTR',
+        InstrumentType.IV5270B: 'GPIB0::17::INSTR',
+        InstrumentType.PG81104A: 'GPIB0::10::INSTR',
+        InstrumentType.SW_E5250A: 'GPIB0::18::INSTR',
+    },
+    "bench2": {
+        InstrumentType.CT53230A: 'GPIB1::5::INSTR',
+        InstrumentType.IV4156B: 'GPIB1::15::INSTR',
+        InstrumentType.IV5270B: 'GPIB1::17::INSTR',
+        InstrumentType.PG81104A: 'GPIB1::10::INSTR',
+        InstrumentType.SW_E5250A: 'GPIB1::18::INSTR',
+    },
+}
+
+# ============================================================================
+# 2. RUN SETTINGS
+# ============================================================================
+
+# Benches used when none are named on the command line (all of BENCHES)
+ACTIVE_BENCHES = list(BENCHES)
+
+# How work is split across benches:
+#   "combinations" - each experiment's parameter combinations are dealt
+#                    round-robin across benches (best for one large experiment)
+#   "experiments"  - the enabled experiments are dealt round-robin
+PARTITION_BY = "combinations"
@@ -31,7 +31,8 @@ Remarks:
 """
 
 from .resource_types import (
-    MeasurementType, InstrumentType, TerminalConfig, ExperimentConfig
+    MeasurementType, InstrumentType, TerminalConfig, ExperimentConfig,
+    MeasurementProfile,
 )
 
 # ============================================================================
@@ -93,6 +94,20 @@ BIG_KALMAN_TERMINALS = {
 # SMU7 is VCC duplicate (no terminal; applied in experiment when applying VCC)
 BIG_KALMAN_SMU7_VCC_CHANNEL = 7
 
+# ============================================================================
+# Measurement Profiles
+# ============================================================================
+# CELLMEAS (ICELLMEAS) and MODE currents: high-resolution ADC at 1 PLC with the
+# current range chosen from the expected value. VIMEAS/VREFP are bounded by the
+# 1.8V compliance, so their voltage range starts at 2V.
+
+BIG_KALMAN_MEASUREMENT_PROFILES = {
+    "CELLMEAS": MeasurementProfile(adc=1, integration=(2, 1), predict_range=True, min_i_range=11),
+    "MODE": MeasurementProfile(adc=1, predict_range=True, min_i_range=11),
+    "IMEAS": MeasurementProfile(v_range=11),
+    "IREFP": MeasurementProfile(v_range=11),
+}
+
 # ============================================================================
 # Experiment Config
 # ============================================================================
@@ -105,6 +120,7 @@ BIG_KALMAN_CONFIG = ExperimentConfig(
         InstrumentType.IV5270B,
         InstrumentType.SW_E5250A,
     ],
+    measurement_profiles=BIG_KALMAN_MEASUREMENT_PROFILES,
 )
 
 # ============================================================================
@@ -24,3 +24,15 @@ VOLTAGE_COMPLIANCE_DEFAULT = 0.001  # 1 mA
 
 # Compliance (V) for current sources (IMEAS, IREFP)
 CURRENT_COMPLIANCE_DEFAULT = 1.8  # VCOMP 1.8V for IMEAS
+
+# Switch matrix (E5250A) pattern sequencing
+# Relay settling time (s) waited after switching an output that affects the
+# measurement. None in SWITCH_SENSITIVE_OUTPUTS means every output does;
+# otherwise list the 1-based outputs whose switching must be settled.
+SWITCH_SETTLE_TIME = 0.005  # 5 ms
+SWITCH_SENSITIVE_OUTPUTS = None
+
+# Relay order when a pattern changes an output: "break_before_make" (safe
+# default) or "make_before_break" (only with the mainframe in multiple-route
+# mode; briefly ties the output to both VCC and VSS)
+SWITCH_ORDER = "break_before_make"
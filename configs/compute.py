@@ -47,7 +47,8 @@ Spot Measurements:
 """
 
 from .resource_types import (
-    MeasurementType, InstrumentType, TerminalConfig, ExperimentConfig
+    MeasurementType, InstrumentType, TerminalConfig, ExperimentConfig,
+    MeasurementProfile,
 )
 
 # ============================================================================
@@ -192,6 +193,27 @@ COMPUTE_TERMINALS = {
     ),
 }
 
+# ============================================================================
+# Measurement Profiles (integration time / ranges per measured terminal)
+# ============================================================================
+# OUT1/OUT2 currents: high-resolution ADC at 1 PLC, current range chosen per
+# point from the expected current. Current-source voltages are bounded by the
+# 2V compliance, so the voltage range starts at 2V instead of auto searching.
+
+_OUT_PROFILE = MeasurementProfile(adc=1, integration=(2, 1), predict_range=True, min_i_range=11)
+_ISOURCE_VOLTAGE_PROFILE = MeasurementProfile(v_range=11)
+
+COMPUTE_MEASUREMENT_PROFILES = {
+    "OUT1": _OUT_PROFILE,
+    "OUT2": _OUT_PROFILE,
+    "X1": _ISOURCE_VOLTAGE_PROFILE,
+    "IMEAS": _ISOURCE_VOLTAGE_PROFILE,
+    "TRIM1": _ISOURCE_VOLTAGE_PROFILE,
+    "TRIM2": _ISOURCE_VOLTAGE_PROFILE,
+    "F11": _ISOURCE_VOLTAGE_PROFILE,
+    "F12": _ISOURCE_VOLTAGE_PROFILE,
+}
+
 # ============================================================================
 # Compute Experiment Configuration
 # ============================================================================
@@ -204,7 +226,8 @@ COMPUTE_CONFIG = ExperimentConfig(
         InstrumentType.IV5270B,
         InstrumentType.IV4156B,
         InstrumentType.PG81104A,
-    ]
+    ],
+    measurement_profiles=COMPUTE_MEASUREMENT_PROFILES,
 )
 
 # ============================================================================
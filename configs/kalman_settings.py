@@ -39,6 +39,24 @@ MAX_CURRENT = 100e-9   # 100 nA
 # parameters such as KGAIN2 and F12 below.
 TIME_STEP = 0.01  # seconds
 
+# Real-time step control (experiments/step_scheduler.py):
+#   "off"     - only report the achieved period / jitter
+#   "pace"    - wait for a monotonic-clock deadline so each step takes TIME_STEP
+#               (steps slower than TIME_STEP are reported as overruns; a
+#               hardware step currently takes longer than TIME_STEP, so
+#               pacing only has an effect with a longer TIME_STEP)
+#   "rescale" - run as fast as possible and rescale KGAIN2 / F12 to the
+#               achieved step period (*_PER_SEC * period)
+STEP_RATE_MODE = "off"
+STEP_PERIOD_SMOOTHING = 0.2     # EMA weight of the newest step period
+STEP_RESCALE_TOLERANCE = 0.05   # Re-send KGAIN2/F12 when the period moves by >5%
+
+# Pipelined loop: IMEAS commands are formatted one step ahead and CSV rows /
+# per-step log lines are written by a background thread, so only
+# measure -> X1/X2 update stays on the critical path. Per-step latency
+# statistics are logged at the end either way.
+PIPELINED_LOOP = True
+
 # ============================================================================
 # 4. REFERENCE / FIXED CURRENTS
 # ============================================================================
@@ -115,3 +133,9 @@ ROC_SIGMA = 0
 # in a triangle-wave fashion. When disabled, a fixed ROC magnitude equal to
 # IMEAS_SOFT_ROC_MAX is used (subject to the hard ROC limit).
 ROC_CYCLE_ENABLED = True
+
+# Generated patterns are cached by a hash of the settings above (as .npy files,
+# memory-mapped on reuse). Patterns without RNG_SEED are never cached.
+IMEAS_PATTERN_CACHE_ENABLED = True
+IMEAS_PATTERN_CACHE_DIR = None  # None = <repo>/cache/imeas_patterns
+IMEAS_PATTERN_CACHE_MAX_BYTES = 512 * 1024 * 1024  # LRU eviction beyond this
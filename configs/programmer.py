@@ -45,7 +45,8 @@ Compliance Settings:
 """
 
 from .resource_types import (
-    MeasurementType, InstrumentType, TerminalConfig, ExperimentConfig
+    MeasurementType, InstrumentType, TerminalConfig, ExperimentConfig,
+    MeasurementProfile,
 )
 
 # ============================================================================
@@ -158,6 +159,16 @@ PROGRAMMER_TERMINALS = {
     ),
 }
 
+# ============================================================================
+# Measurement Profiles
+# ============================================================================
+# ICELLMEAS: high-resolution ADC at 1 PLC, current range chosen per point
+# from the expected (last measured) current.
+
+PROGRAMMER_MEASUREMENT_PROFILES = {
+    "ICELLMEAS": MeasurementProfile(adc=1, integration=(2, 1), predict_range=True, min_i_range=11),
+}
+
 # ============================================================================
 # Programmer Experiment Configuration
 # ============================================================================
@@ -170,7 +181,8 @@ PROGRAMMER_CONFIG = ExperimentConfig(
         InstrumentType.IV5270B,
         InstrumentType.PG81104A,
         InstrumentType.CT53230A,
-    ]
+    ],
+    measurement_profiles=PROGRAMMER_MEASUREMENT_PROFILES,
 )
 
 # ============================================================================
@@ -13,7 +13,7 @@ Sections:
     3. PPG SETTINGS - WR_ENB pulse configuration
     4. COUNTER SETTINGS - Time interval measurement thresholds
 """
-import numpy as np
+import math
 
 # ============================================================================
 # 1. VOLTAGE SETTINGS
@@ -54,7 +54,20 @@ PROG_IN_SWEEP = {
 start = 0.1e-9
 stop = 100e-9
 points_per_decade = 10
-PROG_IN_VALUES = np.logspace(np.log10(start), np.log10(stop), int(np.log10(stop/start) * points_per_decade + 1))
+_n_points = int(math.log10(stop/start) * points_per_decade + 1)
+PROG_IN_VALUES = [10 ** (math.log10(start) + (math.log10(stop) - math.log10(start)) * i / (_n_points - 1))
+                  for i in range(_n_points)]  # Log-spaced, as numpy.logspace (no NumPy import at load)
+
+# Adaptive PROG_IN sweep (experiments/adaptive_sweep.py): instead of every
+# PROG_IN_VALUES entry, measure ADAPTIVE_PROG_IN_COARSE_POINTS log-spaced points
+# over the same range, then add geometric midpoints where the pulse width vs
+# PROG_IN curve changes or bends most, up to ADAPTIVE_PROG_IN_BUDGET points per
+# IREFP. Points are then not measured in ascending PROG_IN order.
+ADAPTIVE_PROG_IN = False
+ADAPTIVE_PROG_IN_COARSE_POINTS = 7
+ADAPTIVE_PROG_IN_BUDGET = 15
+ADAPTIVE_PROG_IN_MIN_RATIO = 1.05    # Do not split intervals narrower than 5% in PROG_IN
+ADAPTIVE_PROG_IN_TOLERANCE = 0.02    # Stop refining when no interval scores above this
     
 # ============================================================================
 # 3. PPG SETTINGS (WR_ENB Pulse Configuration)
@@ -138,6 +151,11 @@ def get_settings():
         # Current lists
         "IREFP_VALUES": IREFP_VALUES,
         "PROG_IN_VALUES": PROG_IN_VALUES,
+        "ADAPTIVE_PROG_IN": ADAPTIVE_PROG_IN,
+        "ADAPTIVE_PROG_IN_COARSE_POINTS": ADAPTIVE_PROG_IN_COARSE_POINTS,
+        "ADAPTIVE_PROG_IN_BUDGET": ADAPTIVE_PROG_IN_BUDGET,
+        "ADAPTIVE_PROG_IN_MIN_RATIO": ADAPTIVE_PROG_IN_MIN_RATIO,
+        "ADAPTIVE_PROG_IN_TOLERANCE": ADAPTIVE_PROG_IN_TOLERANCE,
         "PROG_IN_SWEEP": PROG_IN_SWEEP,
         # PPG
         "PPG_WR_ENB": PPG_WR_ENB,
@@ -37,7 +37,7 @@ Compliance Settings:
 """
 
 from enum import Enum, auto
-from typing import Dict, List, NamedTuple
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
 
 class MeasurementType(Enum):
@@ -171,12 +171,105 @@ class TerminalConfig(NamedTuple):
     description: str        # Human-readable description
 
 
+class MeasurementProfile(NamedTuple):
+    """
+    Measurement speed/resolution settings for one terminal (FLEX SMUs).
+
+    Range codes: 0 = auto, +N = limited auto (never below N), -N = fixed
+    (see instruments/ranging.py). ADC, integration and averaging apply to
+    the 5270B only; AIT/AV are per ADC type, shared by all its channels.
+    """
+    adc: Optional[int] = None                        # AAD: 0 = high-speed, 1 = high-resolution
+    integration: Optional[Tuple[int, float]] = None  # AIT (mode, N) for this terminal's ADC
+    averaging: Optional[int] = None                  # AV samples (high-speed ADC)
+    i_range: int = 0                                 # RI range code
+    v_range: int = 0                                 # RV range code
+    predict_range: bool = False                      # Pick RI per point from expected current
+    min_i_range: int = 11                            # Lowest RI code used when predicting
+
+
 class ExperimentConfig(NamedTuple):
     """Complete configuration for an experiment."""
     name: str                           # Experiment name
     description: str                    # Human-readable description
     terminals: Dict[str, TerminalConfig]  # Terminal name -> config
     instruments_used: List[InstrumentType]  # List of instruments needed
+    measurement_profiles: Optional[Dict[str, MeasurementProfile]] = None  # Terminal name -> profile
+
+
+# ============================================================================
+# Compiled Configuration Index
+# ============================================================================
+
+class ConfigIndex:
+    """
+    Lookup tables compiled once from an ExperimentConfig.
+
+    Replaces per-call scans of config.terminals in the runners:
+        terminal(name)              -> TerminalConfig
+        terminal_at(inst, ch)       -> terminal name on a channel
+        channels_of(inst)           -> used channels of an instrument (sorted)
+        terminals_of(inst)          -> its terminals, in channel order
+        by_type[measurement_type]   -> terminals of that type (config order)
+        channels(terminals)         -> channel list for an MM command; cached
+                                       per terminal tuple ("measurement plan")
+    """
+
+    def __init__(self, config: ExperimentConfig):
+        self.config = config
+        self.terminals: Dict[str, TerminalConfig] = dict(config.terminals)
+        self.channel_to_terminal: Dict[Tuple[InstrumentType, int], str] = {}
+        by_instrument: Dict[InstrumentType, List[TerminalConfig]] = {}
+        by_type: Dict[MeasurementType, List[str]] = {}
+        for name, cfg in config.terminals.items():
+            # First terminal on a channel wins (as the runners' lookups did)
+            self.channel_to_terminal.setdefault((cfg.instrument, cfg.channel), name)
+            by_instrument.setdefault(cfg.instrument, []).append(cfg)
+            by_type.setdefault(cfg.measurement_type, []).append(name)
+        self.instrument_channels: Dict[InstrumentType, Tuple[int, ...]] = {
+            inst: tuple(sorted({cfg.channel for cfg in cfgs})) for inst, cfgs in by_instrument.items()
+        }
+        self.instrument_terminals: Dict[InstrumentType, Tuple[str, ...]] = {
+            inst: tuple(cfg.terminal for cfg in sorted(cfgs, key=lambda c: c.channel))
+            for inst, cfgs in by_instrument.items()
+        }
+        self.by_type: Dict[MeasurementType, Tuple[str, ...]] = {
+            mtype: tuple(names) for mtype, names in by_type.items()
+        }
+        self._plans: Dict[Tuple[str, ...], Tuple[int, ...]] = {}
+
+    def terminal(self, name: str) -> TerminalConfig:
+        """TerminalConfig of a terminal (ValueError if unknown)."""
+        try:
+            return self.terminals[name]
+        except KeyError:
+            raise ValueError(f"Unknown terminal: {name}") from None
+
+    def terminal_at(self, instrument: InstrumentType, channel: int,
+                    default: Optional[str] = None) -> Optional[str]:
+        """Name of the terminal on an instrument channel, or default."""
+        return self.channel_to_terminal.get((instrument, channel), default)
+
+    def channels_of(self, instrument: InstrumentType) -> Tuple[int, ...]:
+        """Sorted channels of an instrument used by this configuration."""
+        return self.instrument_channels.get(instrument, ())
+
+    def terminals_of(self, instrument: InstrumentType) -> Tuple[str, ...]:
+        """Terminals on an instrument, in channel order."""
+        return self.instrument_terminals.get(instrument, ())
+
+    def channels(self, terminals: Tuple[str, ...]) -> Tuple[int, ...]:
+        """Channel numbers of terminals, in order (computed once per tuple)."""
+        plan = self._plans.get(terminals)
+        if plan is None:
+            plan = tuple(self.terminal(name).channel for name in terminals)
+            self._plans[terminals] = plan
+        return plan
+
+
+def compile_config(config: ExperimentConfig) -> ConfigIndex:
+    """Compile an ExperimentConfig into a ConfigIndex."""
+    return ConfigIndex(config)
 
 
 # ============================================================================
@@ -16,7 +16,8 @@ Resource Allocation Summary:
 """
 
 from .resource_types import (
-    MeasurementType, InstrumentType, TerminalConfig, ExperimentConfig
+    MeasurementType, InstrumentType, TerminalConfig, ExperimentConfig,
+    MeasurementProfile,
 )
 
 # ============================================================================
@@ -89,6 +90,16 @@ SONOS_TERMINALS = {
     ),
 }
 
+# ============================================================================
+# Measurement Profiles
+# ============================================================================
+# ICELLMEAS: high-resolution ADC at 1 PLC, current range chosen per point
+# from the expected (last measured) current.
+
+SONOS_MEASUREMENT_PROFILES = {
+    "ICELLMEAS": MeasurementProfile(adc=1, integration=(2, 1), predict_range=True, min_i_range=11),
+}
+
 # ============================================================================
 # Sonos Experiment Configuration (no counter)
 # ============================================================================
@@ -100,7 +111,8 @@ SONOS_CONFIG = ExperimentConfig(
     instruments_used=[
         InstrumentType.IV5270B,
         InstrumentType.PG81104A,
-    ]
+    ],
+    measurement_profiles=SONOS_MEASUREMENT_PROFILES,
 )
 
 # ============================================================================
@@ -15,7 +15,6 @@ Sections:
     4. PROG_IDEAL - list of WR_ENB pulse times (seconds)
     5. PROG_ACTUAL - constant WR_ENB time (ms), list of PROG_IN currents
 """
-import numpy as np
 
 # ============================================================================
 # 1. VOLTAGE SETTINGS
@@ -62,6 +61,18 @@ def cell_init_pulse_time(icellmeas_measured: float, target_current: float) -> fl
     return min(time_sec, WR_ENB_MAX_PULSE_SEC)
 
 
+# cell_init controller (experiments/cell_init_controller.py):
+#   "mapping" - cell_init_pulse_time only (the original cell_init)
+#   "model"   - learn the cell's pulse-width -> ln(ICELLMEAS) response online and
+#               solve it for the next pulse; cell_init_pulse_time is the fallback
+#               until the model has data
+CELL_INIT_CONTROLLER = "mapping"
+CELL_INIT_FORGETTING = 0.8        # RLS forgetting factor (lower adapts faster)
+CELL_INIT_MIN_PULSE_SEC = 1e-4    # Smallest pulse the model may propose
+CELL_INIT_MAX_STEP_RATIO = 4.0    # Pulse <= 4x the previous pulse in the same mode
+CELL_INIT_ALLOW_ERASE = False     # Use erase pulses to recover from overshoot
+
+
 # ============================================================================
 # 3. TEST LIMITS (both PROG_IDEAL and PROG_ACTUAL)
 # ============================================================================
@@ -91,9 +102,35 @@ PROG_IDEAL_WR_ENB_TIMES_SEC = [
 
 PROG_ACTUAL_WR_ENB_MS = 100   # Constant WR_ENB pulse width in milliseconds
 
-PROG_ACTUAL_PROG_IN_LIST = np.array([
+PROG_ACTUAL_PROG_IN_LIST = [
     10e-9, 20e-9, 30e-9, 40e-9, 50e-9, 60e-9, 70e-9, 80e-9, 90e-9, 100e-9
-])   # Amps; adjust to your sweep
+]   # Amps; adjust to your sweep
+
+# Which PROG_IN entries the program phase visits (experiments/sonos_strategies.py):
+#   "sweep"     - every entry in order
+#   "adaptive"  - every PROG_ACTUAL_COARSE_STRIDE-th entry, refined where the
+#                 per-pulse response of neighbouring visits differs by more than
+#                 PROG_ACTUAL_REFINE_THRESHOLD (relative)
+#   "bisection" - first entry whose relative ICELLMEAS drop per pulse reaches
+#                 PROG_ACTUAL_RESPONSE_THRESHOLD
+# Each pulse programs the cell further, so before a visit to a lower PROG_IN
+# than the previous one (adaptive refinement, bisection) the cell is re-
+# initialised to the ICELLMEAS the nearest lower visit started from, with
+# erase pulses even when CELL_INIT_ALLOW_ERASE is off.
+PROG_ACTUAL_STRATEGY = "sweep"
+PROG_ACTUAL_COARSE_STRIDE = 3
+PROG_ACTUAL_REFINE_THRESHOLD = 0.5
+PROG_ACTUAL_RESPONSE_THRESHOLD = 0.05
+
+# Use the previous step's "after" measurement as the next step's "before"
+# (PROG_IN only acts during a WR_ENB pulse, so the cell is unchanged in between)
+PROG_ACTUAL_REUSE_BEFORE = False
+
+# Stop the erase phase when ICELLMEAS changes by less than
+# PROG_ACTUAL_STALL_TOLERANCE (relative) for this many consecutive steps
+# (0 = never; not applied in TEST_MODE, where every reading is 0)
+PROG_ACTUAL_STALL_STEPS = 20
+PROG_ACTUAL_STALL_TOLERANCE = 1e-3
 
 # ============================================================================
 # TIMING
@@ -103,6 +140,10 @@ SETTLING_TIME = 0.01      # Seconds after setting currents
 POST_PULSE_DELAY = 0.002  # Seconds after WR_ENB before measure
 CELL_INIT_MAX_ITERATIONS = 200   # Safety limit for cell_init loop
 
+# ICELLMEAS transient capture (5270B sampling measurement around a WR_ENB pulse)
+TRANSIENT_SAMPLE_INTERVAL = 0.001  # Seconds between samples (1 ms)
+TRANSIENT_TAIL_SEC = 0.05          # Seconds sampled after the pulse ends
+
 # ============================================================================
 # HELPER
 # ============================================================================
@@ -119,7 +160,21 @@ def get_settings():
         "PROG_IDEAL_WR_ENB_TIMES_SEC": PROG_IDEAL_WR_ENB_TIMES_SEC,
         "PROG_ACTUAL_WR_ENB_MS": PROG_ACTUAL_WR_ENB_MS,
         "PROG_ACTUAL_PROG_IN_LIST": PROG_ACTUAL_PROG_IN_LIST,
+        "PROG_ACTUAL_STRATEGY": PROG_ACTUAL_STRATEGY,
+        "PROG_ACTUAL_COARSE_STRIDE": PROG_ACTUAL_COARSE_STRIDE,
+        "PROG_ACTUAL_REFINE_THRESHOLD": PROG_ACTUAL_REFINE_THRESHOLD,
+        "PROG_ACTUAL_RESPONSE_THRESHOLD": PROG_ACTUAL_RESPONSE_THRESHOLD,
+        "PROG_ACTUAL_REUSE_BEFORE": PROG_ACTUAL_REUSE_BEFORE,
+        "PROG_ACTUAL_STALL_STEPS": PROG_ACTUAL_STALL_STEPS,
+        "PROG_ACTUAL_STALL_TOLERANCE": PROG_ACTUAL_STALL_TOLERANCE,
         "SETTLING_TIME": SETTLING_TIME,
         "POST_PULSE_DELAY": POST_PULSE_DELAY,
         "CELL_INIT_MAX_ITERATIONS": CELL_INIT_MAX_ITERATIONS,
+        "CELL_INIT_CONTROLLER": CELL_INIT_CONTROLLER,
+        "CELL_INIT_FORGETTING": CELL_INIT_FORGETTING,
+        "CELL_INIT_MIN_PULSE_SEC": CELL_INIT_MIN_PULSE_SEC,
+        "CELL_INIT_MAX_STEP_RATIO": CELL_INIT_MAX_STEP_RATIO,
+        "CELL_INIT_ALLOW_ERASE": CELL_INIT_ALLOW_ERASE,
+        "TRANSIENT_SAMPLE_INTERVAL": TRANSIENT_SAMPLE_INTERVAL,
+        "TRANSIENT_TAIL_SEC": TRANSIENT_TAIL_SEC,
     }
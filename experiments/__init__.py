@@ -16,7 +16,16 @@ Available Experiments:
     - programmer: Programming mode with pulse/counter measurements
 """
 
-from .base_experiment import ExperimentRunner
+# ExperimentRunner is imported on first access (PEP 562), so light helpers
+# (e.g. experiments.imeas_test_pattern) load without the instrument stack
+
+
+def __getattr__(name):
+    if name != 'ExperimentRunner':
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from .base_experiment import ExperimentRunner
+    globals()[name] = ExperimentRunner
+    return ExperimentRunner
 
 __all__ = ['ExperimentRunner']
 
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Adaptive 1-D Sweep Engine
+=========================
+
+Chooses sweep points for a measured curve y(x) over a log-spaced x range
+(e.g. PROG_OUT pulse width vs PROG_IN in `experiments/run_programmer.py`).
+
+The sweep starts with a coarse log-spaced set of points. It then repeatedly
+inserts the geometric midpoint of the interval where the curve is least
+resolved, until the point budget is used or every interval is resolved.
+
+An interval's score is the normalized change of y across it plus the
+curvature (normalized second difference) at its two ends. An interval is
+resolved when its score falls below tolerance or its x ratio falls below
+min_ratio. Failed measurements (None / NaN) are excluded from scoring.
+
+Usage:
+    sweep = AdaptiveSweep(10e-9, 100e-9, coarse_points=5, budget=15)
+    while (x := sweep.propose()) is not None:
+        sweep.observe(x, measure(x))
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+from typing import Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveSweep:
+    """
+    Coarse-then-refine point selection over [start, stop] in log x.
+
+    Args:
+        start, stop: Sweep range (both > 0).
+        coarse_points: Log-spaced points measured first (>= 2).
+        budget: Total points including the coarse ones.
+        min_ratio: Intervals with x_hi / x_lo below this are not split.
+        tolerance: Intervals scoring below this are not split.
+        log_y: Score log(y) when every measured y is positive (for curves
+               spanning decades, e.g. pulse widths).
+    """
+
+    def __init__(self, start: float, stop: float, coarse_points: int = 5,
+                 budget: int = 15, min_ratio: float = 1.05, tolerance: float = 0.02,
+                 log_y: bool = True):
+        if start <= 0 or stop <= 0:
+            raise ValueError("Adaptive sweep range must be positive (log spacing)")
+        if coarse_points < 2:
+            raise ValueError("coarse_points must be at least 2")
+        lo, hi = math.log(min(start, stop)), math.log(max(start, stop))
+        self._coarse = [math.exp(lo + (hi - lo) * i / (coarse_points - 1)) for i in range(coarse_points)]
+        if start > stop:
+            self._coarse.reverse()
+        self.budget = max(budget, coarse_points)
+        self.min_ratio = min_ratio
+        self.tolerance = tolerance
+        self.log_y = log_y
+        self._results: Dict[float, Optional[float]] = {}
+        self._pending: Optional[float] = None
+
+    @property
+    def points(self) -> List[Tuple[float, Optional[float]]]:
+        """Measured (x, y) pairs sorted by x."""
+        return sorted(self._results.items())
+
+    def propose(self) -> Optional[float]:
+        """Next x to measure, or None when the sweep is finished."""
+        if self._pending is not None:
+            return self._pending
+        if len(self._results) >= self.budget:
+            return None
+        for x in self._coarse:
+            if x not in self._results:
+                self._pending = x
+                return x
+        best = self._best_interval()
+        if best is None:
+            return None
+        self._pending = math.sqrt(best[0] * best[1])
+        return self._pending
+
+    def observe(self, x: float, y: Optional[float]) -> None:
+        """Record the measurement at x (None or NaN for a failed point)."""
+        if y is not None and math.isnan(y):
+            y = None
+        self._results[x] = y
+        if self._pending == x:
+            self._pending = None
+
+    def _best_interval(self) -> Optional[Tuple[float, float]]:
+        valid = [(x, y) for x, y in self.points if y is not None]
+        if len(valid) < 2:
+            return None
+        use_log = self.log_y and all(y > 0 for _, y in valid)
+        xs = [math.log(x) for x, _ in valid]
+        ys = [math.log(y) if use_log else y for _, y in valid]
+        span = (max(ys) - min(ys)) or 1.0
+
+        # Normalized curvature at each interior point (change of slope in log x)
+        curvature = [0.0] * len(valid)
+        x_span = (xs[-1] - xs[0]) or 1.0
+        for i in range(1, len(valid) - 1):
+            s1 = (ys[i] - ys[i - 1]) / (xs[i] - xs[i - 1])
+            s2 = (ys[i + 1] - ys[i]) / (xs[i + 1] - xs[i])
+            curvature[i] = abs(s2 - s1) * x_span / span
+
+        best, best_score = None, self.tolerance
+        for i in range(len(valid) - 1):
+            x_lo, x_hi = valid[i][0], valid[i + 1][0]
+            if x_hi / x_lo < self.min_ratio:
+                continue
+            score = abs(ys[i + 1] - ys[i]) / span + curvature[i] + curvature[i + 1]
+            if score > best_score:
+                best, best_score = (x_lo, x_hi), score
+        if best is not None:
+            logger.debug(f"Refining [{best[0]:.4g}, {best[1]:.4g}] (score {best_score:.3f})")
+        return best
@@ -14,21 +14,27 @@ Compliance Settings:
 
 import sys
 import os
+import importlib
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, IO, Iterable, List, Optional, Any, Sequence
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from instruments.base import (
     set_test_mode, get_test_mode, ensure_directories,
-    initialize_csv, set_test_commands_file, get_test_commands_file, LOG_DIR, get_timing_tracker,
-    set_instrument_command_log
+    initialize_csv, set_test_commands_file, get_test_commands_file, LOG_DIR, MEASUREMENTS_DIR, get_timing_tracker,
+    set_instrument_command_log, close_instrument_command_log
 )
-from instruments import CT53230A, IV4156B, IV5270B, PG81104A, SR570, SR560, SW_E5250A
+from instruments.command_log import log_paths
+from instruments.ranging import OVERFLOW_STATUS, FlexReading, RangePredictor, parse_flex_value
+from instruments.recorder import CommandRecorder, get_command_recorder, set_command_recorder
+from experiments.checkpoint import CheckpointStore
+from experiments.run_index import SHORT_NAMES, RunIndex
 from configs.resource_types import (
-    MeasurementType, InstrumentType, TerminalConfig, ExperimentConfig
+    MeasurementType, InstrumentType, TerminalConfig, ExperimentConfig,
+    MeasurementProfile, ConfigIndex, compile_config,
 )
 
 
@@ -41,6 +47,16 @@ DEFAULT_ADDRESSES = {
     InstrumentType.SW_E5250A: 'GPIB0::18::INSTR',
 }
 
+# Driver class per instrument type (module, class); imported on first use so
+# an experiment only loads the drivers it needs
+INSTRUMENT_CLASSES = {
+    InstrumentType.CT53230A: ('instruments.ct_53230a', 'CT53230A'),
+    InstrumentType.IV4156B: ('instruments.iv_4156b', 'IV4156B'),
+    InstrumentType.IV5270B: ('instruments.iv_5270b', 'IV5270B'),
+    InstrumentType.PG81104A: ('instruments.pg_81104a', 'PG81104A'),
+    InstrumentType.SW_E5250A: ('instruments.sw_e5250a', 'SW_E5250A'),
+}
+
 # Default compliance limits
 VOLTAGE_SOURCE_COMPLIANCE = 0.001  # 1mA for voltage sources
 CURRENT_SOURCE_COMPLIANCE = 2.0    # 2V for current sources
@@ -62,7 +78,8 @@ class ExperimentRunner:
     """
     
     def __init__(self, config: ExperimentConfig, test_mode: bool = False,
-                 addresses: Dict[InstrumentType, str] = None):
+                 addresses: Dict[InstrumentType, str] = None,
+                 bench_id: Optional[str] = None, resume: Optional[str] = None):
         """
         Initialize the experiment runner.
         
@@ -70,22 +87,26 @@ class ExperimentRunner:
             config: ExperimentConfig defining terminal mappings
             test_mode: If True, log commands without hardware access
             addresses: Optional custom GPIB addresses
+            bench_id: Optional bench name (see configs/benches.py); appended
+                      to log file names so benches running in parallel do
+                      not share files
+            resume: Optional run ID to continue from its last checkpoint
         """
         self.config = config
+        self.config_index: ConfigIndex = compile_config(config)
         self.test_mode = test_mode
         self.addresses = addresses or DEFAULT_ADDRESSES
+        self.bench_id = bench_id
         
         # Set up logging
         ensure_directories()
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        started = datetime.now()
+        timestamp = started.strftime("%Y%m%d_%H%M%S")
         # Short name mapping for log files
-        short_names = {
-            "Compute": "compute",
-            "Programmer": "prog",
-            "Sonos": "sonos",
-            "BigKalman": "big_kalman",
-        }
-        short_name = short_names.get(config.name, config.name.lower())
+        short_name = SHORT_NAMES.get(config.name, config.name.lower())
+        if bench_id:
+            short_name = f"{short_name}_{bench_id}"
+        self._file_stem = f'{short_name}_{timestamp}'
         log_file = os.path.join(
             LOG_DIR,
             f'{short_name}_{timestamp}.log'
@@ -108,21 +129,43 @@ class ExperimentRunner:
             handlers=file_handlers
         )
         self.logger = logging.getLogger(f'Experiment.{config.name}')
-        
-        # Set up instrument command log (for debugging)
+        if bench_id:
+            self.logger.info(f"Bench: {bench_id}")
+        
+        # Files of this run (path -> role) and what shutdown() records about
+        # it in the run index (experiments/run_index.py)
+        self._started = started.isoformat(timespec="seconds")
+        self._run_files: Dict[str, str] = {log_file: "log"}
+        self._settings_hash: Optional[str] = None
+        self._run_complete: Optional[bool] = None
+        
+        # Set up instrument command log (structured binary; read it with
+        # scripts/query_command_log.py)
         instrument_command_log = os.path.join(
             LOG_DIR,
-            f'{short_name}_inst_{timestamp}.txt'
-        )
-        instrument_command_log_latest = os.path.join(
-            LOG_DIR,
-            f'{short_name}_inst.txt'
+            f'{short_name}_inst_{timestamp}.kcl'
         )
-        set_instrument_command_log(instrument_command_log, instrument_command_log_latest)
+        set_instrument_command_log(instrument_command_log)
         self.logger.info(f"Instrument command log: {instrument_command_log}")
+        for path in log_paths(instrument_command_log):
+            self._run_files[path] = "command_log"
+        
+        # Checkpoint of this run (resuming keeps the original run ID so
+        # further checkpoints extend the same run)
+        self.run_id = resume or f'{short_name}_{timestamp}'
+        self.checkpoint = CheckpointStore(self.run_id)
+        self.resume_state: Optional[Dict[str, Any]] = None
+        if resume:
+            self.resume_state = self.checkpoint.load()
+            if self.resume_state is None:
+                raise ValueError(f"No checkpoint found for run {resume} ({self.checkpoint.path})")
+            self.logger.info(f"Resuming run {resume} from checkpoint saved {self.resume_state.get('saved_at')}")
+        else:
+            self.logger.info(f"Run ID: {self.run_id} (continue an interrupted run with --resume {self.run_id})")
         
         # Set global test mode
         set_test_mode(test_mode)
+        self._recorder: Optional[CommandRecorder] = None
         
         if test_mode:
             # Set up experiment-specific test commands file
@@ -135,10 +178,19 @@ class ExperimentRunner:
                 f'{short_name}_cmd.txt'
             )
             set_test_commands_file(test_commands_file, test_commands_file_latest)
+            self._run_files[test_commands_file] = "commands"
             
             self.logger.info("=" * 60)
             self.logger.info("RUNNING IN TEST MODE - No hardware communication")
             self.logger.info(f"Commands logged to: {get_test_commands_file()}")
+            
+            # Binary command stream for replay/diff (scripts/replay_diff.py),
+            # unless the caller is already recording
+            if get_command_recorder() is None:
+                self._recorder = CommandRecorder(os.path.join(LOG_DIR, f'{short_name}_cmd_{timestamp}.klrec'))
+                set_command_recorder(self._recorder)
+                self._run_files[self._recorder.path] = "recording"
+                self.logger.info(f"Command stream recorded to: {self._recorder.path}")
             self.logger.info("=" * 60)
         
         # Initialize PyVISA (only when not in test mode)
@@ -158,6 +210,15 @@ class ExperimentRunner:
         # Terminal states (voltage/current values)
         self._terminal_states: Dict[str, float] = {}
         
+        # Measurement profiles: range code last sent per (instrument, channel,
+        # "RI"/"RV"), range prediction per terminal and the hint it was given
+        self._range_settings: Dict[tuple, int] = {}
+        self._range_predictor = RangePredictor()
+        self._range_hints: Dict[str, Optional[float]] = {}
+        
+        # Memory-mapped sample stores (open_sample_store), closed in shutdown
+        self._sample_stores: Dict[str, Any] = {}
+        
         # Initialize CSV
         initialize_csv()
     
@@ -169,17 +230,11 @@ class ExperimentRunner:
                 raise ValueError(f"No address configured for {inst_type}")
             
             # Create instrument based on type
-            inst_classes = {
-                InstrumentType.CT53230A: CT53230A,
-                InstrumentType.IV4156B: IV4156B,
-                InstrumentType.IV5270B: IV5270B,
-                InstrumentType.PG81104A: PG81104A,
-                InstrumentType.SW_E5250A: SW_E5250A,
-            }
-            
-            cls = inst_classes.get(inst_type)
-            if cls is None:
+            spec = INSTRUMENT_CLASSES.get(inst_type)
+            if spec is None:
                 raise ValueError(f"Unknown instrument type: {inst_type}")
+            module_name, class_name = spec
+            cls = getattr(importlib.import_module(module_name), class_name)
             
             self._instruments[inst_type] = cls(self.rm, address)
             self.logger.info(f"Initialized {inst_type.value} at {address}")
@@ -197,30 +252,73 @@ class ExperimentRunner:
                 self.logger.error(f"Failed to initialize {inst_type}: {e}")
                 raise
     
+    def gather_instruments(self, call: Callable[[Any], Any],
+                           instruments: Optional[Iterable[InstrumentType]] = None
+                           ) -> Dict[InstrumentType, Any]:
+        """
+        Run call(inst) on several instruments concurrently.
+        
+        Each call runs on its instrument's I/O worker thread (see
+        InstrumentBase.submit), so calls on different instruments overlap
+        while commands to any one instrument stay in order. Blocks without
+        an event loop, so it also works when one is running (Jupyter).
+        
+        Args:
+            call: Function taking the instrument instance
+            instruments: Instrument types to run on (default: all initialized)
+            
+        Returns:
+            Result per instrument type; an exception raised by call is
+            returned as the value instead of being raised.
+        """
+        types = list(self._instruments) if instruments is None else list(instruments)
+        futures = []
+        for inst_type in types:
+            inst = self._get_instrument(inst_type)
+            futures.append(inst.submit(call, inst))
+        results = {}
+        for inst_type, future in zip(types, futures):
+            try:
+                results[inst_type] = future.result()
+            except Exception as e:
+                results[inst_type] = e
+        return results
+    
+    async def agather_instruments(self, call: Callable[[Any], Any],
+                                  instruments: Optional[Iterable[InstrumentType]] = None
+                                  ) -> Dict[InstrumentType, Any]:
+        """Async gather_instruments() for callers running an event loop."""
+        import asyncio  # Only async callers need it (startup time)
+        types = list(self._instruments) if instruments is None else list(instruments)
+        insts = [self._get_instrument(inst_type) for inst_type in types]
+        results = await asyncio.gather(*(inst.acall(call, inst) for inst in insts),
+                                       return_exceptions=True)
+        return dict(zip(types, results))
+    
     def reset_all(self) -> None:
         """Reset all instruments to default state."""
         self.logger.info("Resetting all instruments...")
-        for inst_type, inst in self._instruments.items():
-            try:
-                inst.reset()
+        for inst_type, result in self.gather_instruments(lambda inst: inst.reset()).items():
+            if isinstance(result, Exception):
+                self.logger.error(f"Failed to reset {inst_type.value}: {result}")
+            else:
                 self.logger.info(f"{inst_type.value} reset")
-            except Exception as e:
-                self.logger.error(f"Failed to reset {inst_type.value}: {e}")
+        self._range_settings.clear()
+        self._range_predictor.reset()
     
     def idn_all(self) -> Dict[str, str]:
         """Query identification of all instruments."""
         idn_responses = {}
-        for inst_type, inst in self._instruments.items():
-            try:
-                idn = inst.idn_query()
-                idn_responses[inst_type.value] = idn
-            except Exception as e:
-                self.logger.error(f"Failed to query {inst_type.value} IDN: {e}")
-                idn_responses[inst_type.value] = f"ERROR: {e}"
+        for inst_type, result in self.gather_instruments(lambda inst: inst.idn_query()).items():
+            if isinstance(result, Exception):
+                self.logger.error(f"Failed to query {inst_type.value} IDN: {result}")
+                idn_responses[inst_type.value] = f"ERROR: {result}"
+            else:
+                idn_responses[inst_type.value] = result
         return idn_responses
     
     def idle_all(self) -> None:
-        """Set all instruments to idle state."""
+        """Set all instruments to idle state (one after another, in order)."""
         self.logger.info("Setting all instruments to idle...")
         for inst_type, inst in self._instruments.items():
             try:
@@ -252,16 +350,15 @@ class ExperimentRunner:
         self.logger.info("Checking all instruments for errors...")
         all_errors = {}
         
-        for inst_type, inst in self._instruments.items():
-            try:
-                errors = inst.check_all_errors(max_tries=10)
-                if errors:
-                    all_errors[inst_type.value] = errors
-            except Exception as e:
+        results = self.gather_instruments(lambda inst: inst.check_all_errors(max_tries=10))
+        for inst_type, result in results.items():
+            if isinstance(result, Exception):
                 # If error checking itself fails, record it as an error
-                error_msg = f"Error checking failed: {e}"
+                error_msg = f"Error checking failed: {result}"
                 all_errors[inst_type.value] = [error_msg]
-                self.logger.error(f"Failed to check errors on {inst_type.value}: {e}")
+                self.logger.error(f"Failed to check errors on {inst_type.value}: {result}")
+            elif result:
+                all_errors[inst_type.value] = result
         
         if all_errors:
             self.logger.warning(f"Found errors/warnings on {len(all_errors)} instrument(s)")
@@ -291,13 +388,10 @@ class ExperimentRunner:
         self.logger.error("ERROR: Instrument errors/warnings detected - test terminated")
         self.logger.error("=" * 60)
         
+        instruments_by_name = {inst_type.value: inst for inst_type, inst in self._instruments.items()}
         for instrument_name, error_list in errors.items():
             # Find the instrument instance to get the last command
-            inst = None
-            for inst_type, inst_obj in self._instruments.items():
-                if inst_type.value == instrument_name:
-                    inst = inst_obj
-                    break
+            inst = instruments_by_name.get(instrument_name)
             
             self.logger.error(f"{instrument_name}:")
             
@@ -323,9 +417,7 @@ class ExperimentRunner:
     
     def get_terminal_config(self, terminal: str) -> TerminalConfig:
         """Get configuration for a terminal by name."""
-        if terminal not in self.config.terminals:
-            raise ValueError(f"Unknown terminal: {terminal}")
-        return self.config.terminals[terminal]
+        return self.config_index.terminal(terminal)
     
     def set_terminal_voltage(self, terminal: str, voltage: float,
                             compliance: float = None) -> None:
@@ -391,6 +483,31 @@ class ExperimentRunner:
         self._terminal_states[terminal] = current
         self.logger.info(f"{terminal} (CH{cfg.channel}): Set to {current}A (Vcomp={compliance}V)")
     
+    def prepare_terminal_current(self, terminal: str, current: float,
+                                 compliance: float = None) -> str:
+        """
+        Format the DI command set_terminal_current() would send, without
+        sending it (for look-ahead in closed loops).
+        """
+        if compliance is None:
+            compliance = CURRENT_SOURCE_COMPLIANCE
+        cfg = self.get_terminal_config(terminal)
+        if cfg.measurement_type != MeasurementType.I:
+            raise ValueError(f"Terminal {terminal} is not a current terminal")
+        inst = self._get_instrument(cfg.instrument)
+        return inst.format_current_command(cfg.channel, current, compliance)
+    
+    def apply_terminal_current(self, terminal: str, current: float, command: str) -> None:
+        """
+        Send a command from prepare_terminal_current().
+        
+        Unlike set_terminal_current() nothing is logged, so the call stays
+        cheap on a loop's critical path.
+        """
+        cfg = self.get_terminal_config(terminal)
+        self._get_instrument(cfg.instrument).write(command)
+        self._terminal_states[terminal] = current
+    
     def enable_gndu(self, terminal: str) -> None:
         """
         Enable GNDU terminal.
@@ -521,6 +638,289 @@ class ExperimentRunner:
         self.logger.info(f"{terminal} (CH{cfg.channel}): Current = {current} A")
         return current
     
+    # ========================================================================
+    # Measurement Profiles (integration time / ranges)
+    # ========================================================================
+    
+    def measurement_profile(self, terminal: str) -> Optional[MeasurementProfile]:
+        """Return the MeasurementProfile declared for a terminal, or None."""
+        return (self.config.measurement_profiles or {}).get(terminal)
+    
+    def apply_measurement_profiles(self) -> None:
+        """
+        Send the ADC, integration, averaging and range settings declared in
+        config.measurement_profiles.
+        
+        AIT/AV apply to a whole ADC type on the 5270B; if terminals on the same
+        ADC declare different integration settings, the first one is used and a
+        warning is logged. Call after channels are enabled.
+        """
+        profiles = self.config.measurement_profiles or {}
+        adc_settings: Dict[int, tuple] = {}
+        averaging = None
+        
+        for terminal, profile in profiles.items():
+            cfg = self.get_terminal_config(terminal)
+            inst = self._get_instrument(cfg.instrument)
+            
+            if cfg.instrument == InstrumentType.IV5270B:
+                if profile.adc is not None:
+                    inst.set_adc_type(cfg.channel, profile.adc)
+                if profile.integration is not None:
+                    adc = profile.adc if profile.adc is not None else 0
+                    if adc not in adc_settings:
+                        adc_settings[adc] = profile.integration
+                    elif adc_settings[adc] != profile.integration:
+                        self.logger.warning(f"{terminal}: integration {profile.integration} conflicts with "
+                                            f"{adc_settings[adc]} on ADC {adc}; keeping {adc_settings[adc]}")
+                if profile.averaging is not None:
+                    averaging = max(averaging or 0, profile.averaging)
+                if profile.v_range:
+                    self._set_measurement_range(cfg, "RV", profile.v_range)
+            elif profile.adc is not None or profile.integration or profile.averaging or profile.v_range:
+                self.logger.warning(f"{terminal}: only the current range is supported on {cfg.instrument.value}")
+            
+            if profile.i_range and not profile.predict_range:
+                self._set_measurement_range(cfg, "RI", profile.i_range)
+        
+        if adc_settings or averaging:
+            iv = self._get_instrument(InstrumentType.IV5270B)
+            for adc, (mode, value) in sorted(adc_settings.items()):
+                iv.set_integration_time(adc, mode, value)
+            if averaging:
+                iv.set_averaging(averaging)
+        
+        if profiles:
+            self.logger.info(f"Measurement profiles applied: {list(profiles.keys())}")
+    
+    def prepare_measurement_range(self, terminal: str, expected: Optional[float] = None) -> int:
+        """
+        Set the current range for a terminal's next measurement from the range
+        predictor.
+        
+        Once a terminal has measured values, a fixed range (RI -N) predicted
+        from them is used, so the instrument does no range search at all.
+        expected is the current forced upstream (e.g. X1); it scales the
+        prediction and seeds limited auto ranging for the first point. After
+        an overflow (check_range_overflow) auto ranging is used until a good
+        value is noted. Only terminals whose profile sets predict_range are
+        changed; RI is sent only when the code changes.
+        
+        Returns:
+            The RI code in effect (0 = no profile / auto).
+        """
+        profile = self.measurement_profile(terminal)
+        if profile is None or not profile.predict_range:
+            return profile.i_range if profile else 0
+        self._range_hints[terminal] = expected
+        code = self._range_predictor.predict(terminal, expected, profile.min_i_range)
+        if code == 0:
+            code = max(profile.i_range, 0)
+        cfg = self.get_terminal_config(terminal)
+        if code == 0 and (cfg.instrument, cfg.channel, "RI") not in self._range_settings:
+            return code  # Nothing predicted yet; auto is already in effect
+        self._set_measurement_range(cfg, "RI", code)
+        return code
+    
+    def terminal_readings(self, terminals: Sequence[str], data: str) -> Dict[str, Optional[FlexReading]]:
+        """
+        The FMT 1 data elements of terminals in a spot response.
+        
+        Each element is found by its channel header (A = ch1 ... H = ch8), not
+        by position, so the instrument's channel order does not matter. A
+        single-element response for a single terminal is taken as is.
+        
+        Returns:
+            Terminal -> reading (None if the response has no FMT 1 element
+            for its channel)
+        """
+        readings = [parse_flex_value(token) for token in data.split(",")]
+        if len(readings) == 1 and len(terminals) == 1:
+            return {terminals[0]: readings[0]}
+        by_channel = {r.channel: r for r in readings if r is not None}
+        return {t: by_channel.get(self.get_terminal_config(t).channel) for t in terminals}
+    
+    def check_range_overflow(self, terminal: str, data: str) -> bool:
+        """
+        Check a terminal's FMT 1 data element for an overflow status.
+        
+        data is the instrument's spot response; the element is found as in
+        terminal_readings().
+        
+        On overflow the terminal is switched to auto ranging (RI 0) so the
+        caller can measure the point again.
+        
+        Returns:
+            True if the value must be measured again.
+        """
+        profile = self.measurement_profile(terminal)
+        if profile is None or not profile.predict_range:
+            return False
+        reading = self.terminal_readings([terminal], data)[terminal]
+        if reading is None or reading.status not in OVERFLOW_STATUS:
+            return False
+        self.logger.debug(f"{terminal}: status {reading.status} on predicted range; retrying in auto")
+        self._range_predictor.mark_overflow(terminal)
+        self._set_measurement_range(self.get_terminal_config(terminal), "RI", 0)
+        return True
+    
+    def note_measurement(self, terminal: str, value: float) -> None:
+        """Record a terminal's measured value for range prediction."""
+        self._range_predictor.record(terminal, value, self._range_hints.get(terminal))
+    
+    def _set_measurement_range(self, cfg: TerminalConfig, command: str, code: int) -> None:
+        """Send RI/RV for a terminal's channel unless that code is already set."""
+        key = (cfg.instrument, cfg.channel, command)
+        if self._range_settings.get(key) == code:
+            return
+        inst = self._get_instrument(cfg.instrument)
+        if command == "RI":
+            inst.set_current_range(cfg.channel, code)
+        else:
+            inst.set_voltage_range(cfg.channel, code)
+        self._range_settings[key] = code
+    
+    def open_sample_store(self, name: str, columns: List[str]):
+        """
+        Open (or return the already open) memory-mapped sample store
+        measurements/<run>_<name>.kls for this run (instruments/sample_store.py).
+        
+        Args:
+            name: Store name (e.g. "transients")
+            columns: Column names, time first
+            
+        Returns:
+            SegmentedMemmapWriter; closed by shutdown()
+        """
+        store = self._sample_stores.get(name)
+        if store is None:
+            from instruments.sample_store import SegmentedMemmapWriter, index_path
+            path = os.path.join(MEASUREMENTS_DIR, f'{self._file_stem}_{name}.kls')
+            store = self._sample_stores[name] = SegmentedMemmapWriter(path, columns)
+            self.register_run_file(path, "samples")
+            self.register_run_file(index_path(path), "samples")
+            self.logger.info(f"Sample store: {path}")
+        return store
+    
+    def capture_transient(self, terminals: List[str], interval: float, points: int,
+                          trigger=None, hold_bias: float = 0.0, store=None, label: str = ""):
+        """
+        Capture a time series on 5270B terminals with a sampling measurement.
+        
+        Sampling is started (XE), then trigger() is called (e.g. to fire a PPG
+        pulse), then the whole record is read in one transfer. Terminals keep
+        their present DC bias.
+        
+        Args:
+            terminals: 5270B terminal names, in column order
+            interval: Sampling interval in seconds
+            points: Number of sampling points
+            trigger: Optional callable run right after sampling starts
+            hold_bias: Hold time (s) before the first sample
+            store: Optional SegmentedMemmapWriter (see open_sample_store); the
+                   record is decoded straight into it as one capture
+            label: Capture label in the store
+            
+        Returns:
+            NumPy array (points, 1 + len(terminals)); column 0 is time in
+            seconds. With store, a view of the stored rows.
+        """
+        channels = []
+        for terminal in terminals:
+            cfg = self.get_terminal_config(terminal)
+            if cfg.instrument != InstrumentType.IV5270B:
+                raise ValueError(f"Terminal {terminal} is not on the 5270B; sampling needs MM 10")
+            channels.append(cfg.channel)
+        
+        iv = self._get_instrument(InstrumentType.IV5270B)
+        iv.configure_sampling(channels, interval, points, hold_bias=hold_bias)
+        iv.start_sampling()
+        if trigger is not None:
+            trigger()
+        if store is None:
+            data = iv.read_sampling_array()
+        else:
+            data = store.commit(len(iv.read_sampling_array(out=store.reserve(points))), label)
+        self.logger.info(f"Captured {len(data)} samples on {terminals} "
+                         f"({interval * 1000:g} ms interval)")
+        return data
+    
+    # ========================================================================
+    # Checkpoints
+    # ========================================================================
+    
+    def commit_checkpoint(self, position: Optional[Dict[str, Any]], outputs: Dict[str, IO],
+                          complete: bool = False, **extra: Any) -> None:
+        """
+        Save the run position after a row has been flushed to outputs.
+        
+        Args:
+            position: Loop position of the last committed row (None before
+                      the first row)
+            outputs: Role -> open (flushed) output file
+            complete: True once the run has finished
+            **extra: Additional fields checked on resume
+        """
+        self.checkpoint.save(position, outputs, complete=complete,
+                             experiment=self.config.name, **extra)
+        for role, f in outputs.items():
+            if f is not None:
+                self._run_files[os.path.abspath(f.name)] = role
+        self._run_files[self.checkpoint.path] = "checkpoint"
+        self._settings_hash = extra.get("settings", self._settings_hash)
+        self._run_complete = complete
+    
+    def resume_checkpoint(self, **expected: Any) -> Optional[Dict[str, Any]]:
+        """
+        Checkpoint being resumed, after checking it belongs to this experiment.
+        
+        Args:
+            **expected: Fields that must match the checkpoint (e.g. a settings
+                        fingerprint)
+        
+        Returns:
+            The checkpoint dict, or None when not resuming
+        
+        Raises:
+            ValueError: If the checkpoint is for another experiment or a field
+                        in expected differs
+        """
+        if self.resume_state is None:
+            return None
+        expected = {"experiment": self.config.name, **expected}
+        for key, value in expected.items():
+            if self.resume_state.get(key) != value:
+                raise ValueError(f"Cannot resume {self.run_id}: checkpoint {key} is "
+                                 f"{self.resume_state.get(key)!r}, this run has {value!r}")
+        return self.resume_state
+    
+    # ========================================================================
+    # Run index
+    # ========================================================================
+    
+    def register_run_file(self, path: str, role: str) -> None:
+        """
+        Record an output file of this run in the run index at shutdown
+        (outputs passed to commit_checkpoint are registered automatically).
+        
+        Args:
+            path: File path
+            role: What the file is (e.g. "csv")
+        """
+        self._run_files[os.path.abspath(path)] = role
+    
+    def update_run_index(self) -> None:
+        """Record this run and its files in the run index (logs/run_index.sqlite)."""
+        status = None if self._run_complete is None else ("complete" if self._run_complete else "incomplete")
+        try:
+            with RunIndex() as index:
+                index.record_run(self.run_id, self.config.name, self._run_files,
+                                 settings_hash=self._settings_hash, bench=self.bench_id,
+                                 test_mode=self.test_mode, status=status, started=self._started)
+            self.logger.info(f"Run {self.run_id} recorded in the run index ({len(self._run_files)} files)")
+        except Exception as e:
+            self.logger.warning(f"Could not update the run index: {e}")
+    
     # ========================================================================
     # Experiment Lifecycle
     # ========================================================================
@@ -551,6 +951,20 @@ class ExperimentRunner:
         
         self.idle_all()
         self.close_all()
+        close_instrument_command_log()
+        
+        for store in self._sample_stores.values():
+            store.close()
+            self.logger.info(f"Stored {store.rows} samples in {store.path}")
+        self._sample_stores.clear()
+        
+        self.update_run_index()
+        
+        if self._recorder is not None:
+            set_command_recorder(None)
+            self._recorder.close()
+            self.logger.info(f"Recorded {self._recorder.events} command events to {self._recorder.path}")
+            self._recorder = None
         
         # Log timing information in test mode
         if self.test_mode:
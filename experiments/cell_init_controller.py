@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Model-Based cell_init Controller
+================================
+
+Chooses WR_ENB pulse widths for `SonosExperiment.cell_init` from a response
+model learned online for the cell, instead of a fixed mapping.
+
+Per pulse direction (PROGRAM lowers ICELLMEAS, ERASE raises it) the change in
+log-current is modelled as linear in pulse width:
+
+    ln(I_after / I_before) = a + b * w
+
+and fitted by recursive least squares with a forgetting factor, so the model
+follows the cell as it drifts. The prior holds the intercept near zero, so
+one pulse is enough for a first slope estimate. The next pulse solves the
+model for ln(target / I). It is bounded to [min_pulse, max_pulse] and to
+max_step_ratio times the previous pulse in that direction. Until the model
+has a slope of the right sign, or when the current is not positive, the
+fallback mapping (sonos_settings.cell_init_pulse_time) is used.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+PROGRAM = "PROGRAM"
+ERASE = "ERASE"
+
+# Expected sign of d ln(I) / d w per mode
+_SLOPE_SIGN = {PROGRAM: -1.0, ERASE: 1.0}
+
+
+class PulseResponseModel:
+    """
+    Recursive least squares fit of ln(I_after / I_before) = a + b * w.
+
+    Widths are normalized by width_scale to keep the fit well conditioned.
+
+    Args:
+        width_scale: Typical pulse width in seconds (e.g. the maximum pulse).
+        forgetting: RLS forgetting factor (0-1]; lower adapts faster.
+        intercept_var: Prior variance of a (small = intercept held near 0).
+        slope_var: Prior variance of b (large = slope learned from data).
+    """
+
+    def __init__(self, width_scale: float, forgetting: float = 0.8,
+                 intercept_var: float = 1e-4, slope_var: float = 1e4):
+        self.width_scale = width_scale
+        self.forgetting = forgetting
+        self.theta = [0.0, 0.0]                       # [a, b]
+        self.P = [[intercept_var, 0.0], [0.0, slope_var]]
+        self.updates = 0
+
+    def update(self, width: float, dlog_current: float) -> None:
+        """Add one observed pulse response."""
+        x = (1.0, width / self.width_scale)
+        P, lam = self.P, self.forgetting
+        Px = (P[0][0] * x[0] + P[0][1] * x[1], P[1][0] * x[0] + P[1][1] * x[1])
+        denom = lam + x[0] * Px[0] + x[1] * Px[1]
+        k = (Px[0] / denom, Px[1] / denom)
+        err = dlog_current - (self.theta[0] * x[0] + self.theta[1] * x[1])
+        self.theta = [self.theta[0] + k[0] * err, self.theta[1] + k[1] * err]
+        self.P = [[(P[i][j] - k[i] * Px[j]) / lam for j in range(2)] for i in range(2)]
+        self.updates += 1
+
+    def predict(self, width: float) -> float:
+        """Predicted ln(I_after / I_before) for a pulse of width seconds."""
+        return self.theta[0] + self.theta[1] * width / self.width_scale
+
+    def solve(self, dlog_current: float, slope_sign: float) -> Optional[float]:
+        """
+        Pulse width (s) predicted to change ln(I) by dlog_current, or None if
+        the model has no data or its slope does not have slope_sign.
+        """
+        a, b = self.theta
+        if self.updates == 0 or b * slope_sign <= 0:
+            return None
+        return (dlog_current - a) / b * self.width_scale
+
+
+class CellInitController:
+    """
+    Proposes cell_init pulses from per-mode PulseResponseModels.
+
+    Args:
+        mapping: Fallback (icellmeas, target) -> pulse seconds.
+        max_pulse: Upper pulse bound (s).
+        min_pulse: Lower pulse bound (s).
+        max_step_ratio: A pulse may be at most this many times the previous
+                        pulse in the same mode.
+        forgetting: RLS forgetting factor.
+        allow_erase: Use erase pulses when ICELLMEAS is below target. When
+                     False, program pulses only (as the mapping does).
+    """
+
+    def __init__(self, mapping: Callable[[float, float], float], max_pulse: float,
+                 min_pulse: float = 1e-4, max_step_ratio: float = 4.0,
+                 forgetting: float = 0.8, allow_erase: bool = False):
+        self.mapping = mapping
+        self.max_pulse = max_pulse
+        self.min_pulse = min_pulse
+        self.max_step_ratio = max_step_ratio
+        self.allow_erase = allow_erase
+        self.models: Dict[str, PulseResponseModel] = {
+            mode: PulseResponseModel(max_pulse, forgetting) for mode in (PROGRAM, ERASE)
+        }
+        self._last_pulse: Dict[str, float] = {}
+        self.pulse_counts: List[int] = []  # Pulses used by each finished cell_init
+
+    def propose(self, icellmeas: float, target: float,
+                allow_erase: Optional[bool] = None) -> Tuple[str, float, bool]:
+        """
+        Choose the next pulse.
+
+        Args:
+            icellmeas: Measured ICELLMEAS (A).
+            target: Target ICELLMEAS (A).
+            allow_erase: Overrides the controller's allow_erase for this pulse.
+
+        Returns:
+            (mode, pulse seconds, from_model). pulse is 0.0 when ICELLMEAS is
+            below target and erase pulses are not allowed.
+        """
+        if icellmeas <= 0 or target <= 0:
+            return PROGRAM, min(self.mapping(icellmeas, target), self.max_pulse), False
+
+        mode = PROGRAM if icellmeas > target else ERASE
+        if allow_erase is None:
+            allow_erase = self.allow_erase
+        if mode == ERASE and not allow_erase:
+            return mode, 0.0, False
+
+        width = self.models[mode].solve(math.log(target / icellmeas), _SLOPE_SIGN[mode])
+        from_model = width is not None
+        if width is None:
+            width = self.mapping(icellmeas, target)
+        last = self._last_pulse.get(mode)
+        if last is not None:
+            width = min(width, last * self.max_step_ratio)
+        width = min(max(width, self.min_pulse), self.max_pulse)
+        return mode, width, from_model
+
+    def observe(self, mode: str, pulse: float, before: float, after: float) -> None:
+        """Feed back the measured response to a pulse."""
+        self._last_pulse[mode] = pulse
+        if before > 0 and after > 0:
+            self.models[mode].update(pulse, math.log(after / before))
+
+    def finish(self, pulses: int) -> None:
+        """Record the number of pulses one cell_init used."""
+        self.pulse_counts.append(pulses)
+
+    @property
+    def mean_pulses(self) -> float:
+        """Mean pulses per cell_init so far."""
+        return sum(self.pulse_counts) / len(self.pulse_counts) if self.pulse_counts else 0.0
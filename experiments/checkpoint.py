@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Run Checkpoints
+===============
+
+Lets a long run (Compute combinations, Kalman steps) continue after a crash,
+an instrument error (report_and_exit_on_errors) or a GPIB timeout, instead of
+restarting from scratch.
+
+After every committed row the runner saves:
+- position: where it is in its loops (experiment / combination / PPG state /
+  X1 index for Compute; step index and X1/X2 state for Kalman)
+- outputs:  path and byte offset of each output file after that row
+
+as logs/checkpoints/<run_id>.json. The file is replaced atomically, so it
+always describes a complete row. On resume (`--resume <run_id>`) each output
+file is truncated back to its recorded offset (dropping a row that was
+partially written when the run died) and appended to, and the runner skips
+every point up to the recorded position.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, IO, Optional
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from instruments.base import LOG_DIR
+
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_DIR = os.path.join(LOG_DIR, "checkpoints")
+
+
+class CheckpointStore:
+    """
+    Checkpoint file of one run.
+
+    Args:
+        run_id: Run identifier (file name without .json).
+        directory: Checkpoint directory (default: logs/checkpoints).
+    """
+
+    def __init__(self, run_id: str, directory: Optional[str] = None):
+        self.run_id = run_id
+        self.directory = directory or CHECKPOINT_DIR
+        self.path = os.path.join(self.directory, f"{run_id}.json")
+
+    def save(self, position: Optional[Dict[str, Any]], outputs: Dict[str, IO],
+             complete: bool = False, **extra: Any) -> None:
+        """
+        Record a committed position.
+
+        Args:
+            position: Loop position of the last committed row (None before
+                      the first row).
+            outputs: Role -> open output file, already flushed; its path and
+                     current offset are stored.
+            complete: True once the run has finished.
+            **extra: Additional JSON-serializable fields (e.g. the
+                     experiment name or a settings fingerprint checked on
+                     resume).
+        """
+        data = {
+            "run_id": self.run_id,
+            "saved_at": datetime.now().isoformat(timespec="seconds"),
+            "complete": complete,
+            "position": position,
+            "outputs": {role: {"path": os.path.abspath(f.name), "offset": f.tell()}
+                        for role, f in outputs.items() if f is not None},
+        }
+        data.update(extra)
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Return the saved checkpoint, or None if there is none."""
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f)
+
+
+def reopen_output(path: str, offset: int) -> IO:
+    """
+    Truncate an output file to a committed offset and open it for appending.
+
+    Raises:
+        ValueError: If the file is missing or shorter than offset.
+    """
+    if not os.path.exists(path):
+        raise ValueError(f"Checkpointed output file is missing: {path}")
+    size = os.path.getsize(path)
+    if size < offset:
+        raise ValueError(f"{path} is shorter ({size} bytes) than its checkpoint ({offset} bytes)")
+    if size > offset:
+        logger.warning(f"Dropping {size - offset} bytes written after the last checkpoint of {path}")
+        with open(path, "r+b") as f:
+            f.truncate(offset)
+    return open(path, "a", newline="", encoding="utf-8")
@@ -10,17 +10,25 @@ Shared IMEAS test pattern generator for:
 - Standalone plotting / debugging.
 
 The pattern is a bounded, optionally noisy triangle wave in IMEAS with
-optional cycling of the rate-of-change (ROC).
+optional cycling of the rate-of-change (ROC). `generate_imeas_pattern()`
+returns NumPy arrays; `iter_imeas_pattern()` yields the same values in chunks
+so long soak patterns never have to be held in memory.
+`cached_imeas_pattern()` stores generated patterns as .npy files keyed by a
+hash of the configuration and memory-maps them on reuse.
 """
 
 from __future__ import annotations
 
 import argparse
+import hashlib
+import json
 import logging
-import math
-import random
-from dataclasses import dataclass
-from typing import List, Optional, Sequence, Tuple
+import os
+import tempfile
+from dataclasses import asdict, dataclass
+from typing import Iterator, Optional, Sequence, Tuple
+
+import numpy as np
 
 from configs import kalman_settings as SETTINGS
 
@@ -77,30 +85,133 @@ def _clamp(value: float, lo: float, hi: float) -> float:
     return max(lo, min(hi, value))
 
 
-def _clamp_roc(delta: float, max_abs_delta: float) -> float:
-    if max_abs_delta <= 0.0:
-        return delta
-    if delta > max_abs_delta:
-        return max_abs_delta
-    if delta < -max_abs_delta:
-        return -max_abs_delta
-    return delta
+def _soft_limits(config: IMEASTestConfig) -> Tuple[float, float]:
+    """Soft IMEAS limits nested within the hard limits, in ascending order."""
+    soft_min = _clamp(config.imeas_soft_min, config.imeas_hard_min, config.imeas_hard_max)
+    soft_max = _clamp(config.imeas_soft_max, config.imeas_hard_min, config.imeas_hard_max)
+    if soft_max < soft_min:
+        soft_min, soft_max = soft_max, soft_min
+    return soft_min, soft_max
+
+
+def _roc_magnitude(config: IMEASTestConfig, steps: np.ndarray) -> np.ndarray:
+    """ROC magnitude at each step index (closed form of the ROC sweep)."""
+    if config.roc_cycle_enabled and config.imeas_soft_roc_max > config.imeas_soft_roc_min:
+        # Linear sweep from soft ROC min to soft ROC max over the whole pattern
+        start = max(config.imeas_soft_roc_min, 0.0)
+        start = min(start, config.imeas_soft_roc_max)
+        step_roc = (config.imeas_soft_roc_max - config.imeas_soft_roc_min) / max(
+            config.num_points - 1, 1
+        )
+        return np.clip(start + steps * step_roc,
+                       config.imeas_soft_roc_min, config.imeas_soft_roc_max)
+    # Fixed ROC magnitude equal to soft ROC max (or min if max is not set)
+    base = config.imeas_soft_roc_max if config.imeas_soft_roc_max > 0 else config.imeas_soft_roc_min
+    return np.full(steps.shape, max(base, 0.0))
+
+
+def _fold(t: np.ndarray, span: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fold unfolded triangle coordinates into [0, span].
+
+    Returns:
+        (offset, direction): offset above soft min, and +1/-1 for the
+        direction of travel at that point.
+    """
+    if span <= 0.0:
+        return np.zeros_like(t), np.ones_like(t)
+    m = np.mod(t, 2.0 * span)
+    offset = np.where(m <= span, m, 2.0 * span - m)
+    direction = np.where(m < span, 1.0, -1.0)
+    return offset, direction
+
+
+DEFAULT_CHUNK_SIZE = 65536
+
+
+def iter_imeas_pattern(
+    config: Optional[IMEASTestConfig] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Generate an IMEAS test pattern lazily, chunk_size points at a time.
+
+    The triangle is walked in an unfolded coordinate t (t grows by the ROC
+    at each step) and reflected into [soft_min, soft_max] in closed form, so
+    each chunk only carries t over from the previous one. ROC and IMEAS noise
+    come from two independent NumPy generators spawned from rng_seed; the
+    output is identical for any chunk_size.
+
+    Yields:
+        (imeas, roc) arrays, concatenating to the values described in
+        generate_imeas_pattern().
+    """
+    if config is None:
+        config = _make_default_config_from_settings()
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+
+    n = config.num_points
+    if n <= 0:
+        return
+
+    roc_rng, imeas_rng = (
+        np.random.default_rng(s) for s in np.random.SeedSequence(config.rng_seed).spawn(2)
+    )
+    soft_min, soft_max = _soft_limits(config)
+    span = soft_max - soft_min
+
+    # Start at initial value clamped to hard limits, heading up unless at or
+    # above soft max. A start outside the soft limits enters them on step 1.
+    current = _clamp(config.imeas_initial, config.imeas_hard_min, config.imeas_hard_max)
+    t = min(max(current - soft_min, 0.0), span)
+
+    start = 0
+    while start < n:
+        stop = min(start + chunk_size, n)
+        steps = np.arange(max(start, 1), stop)
+
+        # Step along t: ROC magnitude + ROC noise, then the hard ROC limit
+        delta = _roc_magnitude(config, steps)
+        if config.roc_sigma > 0.0:
+            delta += roc_rng.normal(0.0, config.roc_sigma, steps.size)
+        if config.imeas_hard_roc_max > 0.0:
+            np.clip(delta, -config.imeas_hard_roc_max, config.imeas_hard_roc_max, out=delta)
+
+        # Cumulative sum seeded with the carried t (same rounding for any chunking)
+        t_all = np.cumsum(np.concatenate(([t], delta)))
+        _, direction = _fold(t_all[:-1], span)
+        offset, _ = _fold(t_all[1:], span)
+        t = t_all[-1]
+
+        roc = direction * delta
+        imeas = soft_min + offset
+        if config.imeas_sigma > 0.0:
+            imeas += imeas_rng.normal(0.0, config.imeas_sigma, steps.size)
+        np.clip(imeas, config.imeas_hard_min, config.imeas_hard_max, out=imeas)
+
+        if start == 0:
+            imeas = np.concatenate(([current], imeas))
+            roc = np.concatenate(([0.0], roc))
+        yield imeas, roc
+        start = stop
 
 
 def generate_imeas_pattern(
     config: Optional[IMEASTestConfig] = None,
-) -> Tuple[List[float], List[float]]:
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Tuple[np.ndarray, np.ndarray]:
     """
     Generate an IMEAS test pattern and corresponding ROC sequence.
 
     The pattern:
     - Linearly ramps IMEAS between soft min and soft max (triangle wave).
     - Enforces hard limits on IMEAS and |ROC|.
-    - Optionally cycles ROC magnitude between soft ROC min and max.
+    - Optionally sweeps ROC magnitude from soft ROC min to max.
     - Adds Gaussian noise to IMEAS and ROC (with clamping to hard limits).
 
     Returns:
-        (imeas_values, roc_values) where:
+        (imeas_values, roc_values) arrays where:
             imeas_values[k] is IMEAS at step k (after IMEAS noise + clamping)
             roc_values[k]   is the calculated ROC applied at step k, i.e.
                             the intended IMEAS step (after ROC noise and
@@ -109,97 +220,147 @@ def generate_imeas_pattern(
     if config is None:
         config = _make_default_config_from_settings()
 
-    if config.num_points <= 0:
-        return [], []
+    n = max(config.num_points, 0)
+    imeas_values = np.empty(n)
+    roc_values = np.empty(n)
+    pos = 0
+    for imeas, roc in iter_imeas_pattern(config, chunk_size):
+        imeas_values[pos:pos + imeas.size] = imeas
+        roc_values[pos:pos + roc.size] = roc
+        pos += imeas.size
+
+    if n:
+        logger.info(
+            "Generated IMEAS pattern: %d points, IMEAS in [%g, %g] A, |ROC|_max=%g A/step",
+            n,
+            imeas_values.min(),
+            imeas_values.max(),
+            np.abs(roc_values[1:]).max(initial=0.0),
+        )
 
-    rng = random.Random(config.rng_seed)
+    return imeas_values, roc_values
 
-    # Ensure soft limits are nested within hard limits
-    soft_min = _clamp(config.imeas_soft_min, config.imeas_hard_min, config.imeas_hard_max)
-    soft_max = _clamp(config.imeas_soft_max, config.imeas_hard_min, config.imeas_hard_max)
-    if soft_max < soft_min:
-        soft_min, soft_max = soft_max, soft_min
 
-    imeas_values: List[float] = []
-    roc_values: List[float] = []
+# ============================================================================
+# Pattern cache
+# ============================================================================
 
-    # Start at initial value clamped to hard limits; if it's outside soft
-    # limits we'll move toward the soft range on the first few steps.
-    current = _clamp(config.imeas_initial, config.imeas_hard_min, config.imeas_hard_max)
+# Bump whenever the generated values for a given config change
+GENERATOR_VERSION = 2
+
+_DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "imeas_patterns"
+)
+
+
+def pattern_key(config: IMEASTestConfig) -> str:
+    """Content hash of a pattern configuration (plus generator version)."""
+    payload = json.dumps({"generator_version": GENERATOR_VERSION, **asdict(config)},
+                         sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _write_array(path: str, config: IMEASTestConfig, column: int) -> None:
+    """Stream one column (0 = IMEAS, 1 = ROC) of a pattern into a .npy file."""
+    fd, tmp = tempfile.mkstemp(suffix=".npy", dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        out = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float64,
+                                        shape=(config.num_points,))
+        pos = 0
+        for chunk in iter_imeas_pattern(config):
+            out[pos:pos + chunk[column].size] = chunk[column]
+            pos += chunk[column].size
+        out.flush()
+        del out
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _evict(cache_dir: str, max_bytes: int, keep: str) -> None:
+    """Delete least recently used patterns until the cache fits in max_bytes."""
+    entries = {}
+    for name in os.listdir(cache_dir):
+        key, _, ext = name.partition(".")
+        if ext not in ("json", "imeas.npy", "roc.npy"):
+            continue
+        path = os.path.join(cache_dir, name)
+        size, used = entries.get(key, (0, 0.0))
+        stat = os.stat(path)
+        entries[key] = (size + stat.st_size, max(used, stat.st_mtime))
+
+    total = sum(size for size, _ in entries.values())
+    for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+        if total <= max_bytes:
+            break
+        if key == keep:
+            continue
+        for ext in ("json", "imeas.npy", "roc.npy"):
+            path = os.path.join(cache_dir, f"{key}.{ext}")
+            if os.path.exists(path):
+                os.remove(path)
+        total -= size
+        logger.info("Evicted cached IMEAS pattern %s (%d bytes)", key, size)
+
+
+def cached_imeas_pattern(
+    config: Optional[IMEASTestConfig] = None,
+    use_cache: Optional[bool] = None,
+    cache_dir: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray, Optional[str]]:
+    """
+    Return an IMEAS pattern from the cache, generating and storing it if needed.
+
+    Patterns are stored as <key>.imeas.npy / <key>.roc.npy plus a <key>.json
+    sidecar holding the configuration, and are memory-mapped read-only on
+    reuse. Least recently used patterns are evicted beyond max_bytes. A
+    config without rng_seed is not reproducible and is never cached.
 
-    # Determine initial direction based on where we start relative to soft
-    # limits: if at or below soft_min, go up; if at or above soft_max, go down.
-    if current <= soft_min:
-        direction = 1.0
-    elif current >= soft_max:
-        direction = -1.0
+    Args:
+        config: Pattern configuration (default: from kalman_settings).
+        use_cache: Default SETTINGS.IMEAS_PATTERN_CACHE_ENABLED.
+        cache_dir: Default SETTINGS.IMEAS_PATTERN_CACHE_DIR (None = cache/imeas_patterns).
+        max_bytes: Default SETTINGS.IMEAS_PATTERN_CACHE_MAX_BYTES.
+
+    Returns:
+        (imeas_values, roc_values, key); key identifies the stimulus and is
+        None when the cache was not used.
+    """
+    if config is None:
+        config = _make_default_config_from_settings()
+    if use_cache is None:
+        use_cache = SETTINGS.IMEAS_PATTERN_CACHE_ENABLED
+    if not use_cache or config.rng_seed is None or config.num_points <= 0:
+        imeas, roc = generate_imeas_pattern(config)
+        return imeas, roc, None
+
+    cache_dir = cache_dir or SETTINGS.IMEAS_PATTERN_CACHE_DIR or _DEFAULT_CACHE_DIR
+    if max_bytes is None:
+        max_bytes = SETTINGS.IMEAS_PATTERN_CACHE_MAX_BYTES
+    key = pattern_key(config)
+    meta_path = os.path.join(cache_dir, f"{key}.json")
+    imeas_path = os.path.join(cache_dir, f"{key}.imeas.npy")
+    roc_path = os.path.join(cache_dir, f"{key}.roc.npy")
+
+    if all(os.path.exists(p) for p in (meta_path, imeas_path, roc_path)):
+        os.utime(meta_path)  # Mark as recently used
+        logger.info("Loaded IMEAS pattern %s from cache (%d points)", key, config.num_points)
     else:
-        direction = 1.0
-
-    # Initial ROC magnitude
-    roc_mag = max(config.imeas_soft_roc_min, 0.0)
-    roc_mag = min(roc_mag, config.imeas_soft_roc_max if config.imeas_soft_roc_max > 0 else roc_mag)
-
-    imeas_values.append(current)
-    roc_values.append(0.0)
-
-    for _ in range(1, config.num_points):
-        # Base ROC magnitude: either fixed or cycling between soft ROC min/max
-        if config.roc_cycle_enabled and config.imeas_soft_roc_max > config.imeas_soft_roc_min:
-            # Simple triangle-wave sweep between soft_roc_min and soft_roc_max
-            step_roc = (config.imeas_soft_roc_max - config.imeas_soft_roc_min) / max(
-                config.num_points - 1, 1
-            )
-            roc_mag += step_roc
-            if roc_mag > config.imeas_soft_roc_max or roc_mag < config.imeas_soft_roc_min:
-                # Reflect at the boundaries
-                roc_mag = _clamp(roc_mag, config.imeas_soft_roc_min, config.imeas_soft_roc_max)
-                step_roc = -step_roc
-        else:
-            # Fixed ROC magnitude equal to soft ROC max (or min if max is not set)
-            base = config.imeas_soft_roc_max if config.imeas_soft_roc_max > 0 else config.imeas_soft_roc_min
-            roc_mag = max(base, 0.0)
-
-        # Signed ROC (direction encoded in sign)
-        roc = direction * roc_mag
-
-        # Add noise to ROC, then enforce hard ROC limit
-        if config.roc_sigma > 0.0:
-            roc += rng.gauss(0.0, config.roc_sigma)
-        roc = _clamp_roc(roc, config.imeas_hard_roc_max)
-
-        proposed = current + roc
-
-        # Enforce soft limits with reflection behavior: when we hit soft max
-        # or min, we flip direction and keep walking within [soft_min, soft_max].
-        if proposed > soft_max:
-            overflow = proposed - soft_max
-            proposed = soft_max - overflow
-            direction = -1.0
-        elif proposed < soft_min:
-            underflow = soft_min - proposed
-            proposed = soft_min + underflow
-            direction = 1.0
-
-        # Add IMEAS noise and then clamp to hard limits.
-        if config.imeas_sigma > 0.0:
-            proposed += rng.gauss(0.0, config.imeas_sigma)
-        proposed = _clamp(proposed, config.imeas_hard_min, config.imeas_hard_max)
-
-        imeas_values.append(proposed)
-        # Store the calculated ROC (after ROC noise and clamping, before IMEAS noise).
-        roc_values.append(roc)
-        current = proposed
-
-    logger.info(
-        "Generated IMEAS pattern: %d points, IMEAS in [%g, %g] A, |ROC|_max=%g A/step",
-        len(imeas_values),
-        min(imeas_values),
-        max(imeas_values),
-        max((abs(r) for r in roc_values[1:]), default=0.0),
-    )
+        os.makedirs(cache_dir, exist_ok=True)
+        _write_array(imeas_path, config, 0)
+        _write_array(roc_path, config, 1)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "generator_version": GENERATOR_VERSION,
+                       "config": asdict(config)}, f, indent=2, sort_keys=True)
+        logger.info("Cached IMEAS pattern %s (%d points) in %s", key, config.num_points, cache_dir)
+        _evict(cache_dir, max_bytes, keep=key)
 
-    return imeas_values, roc_values
+    return np.load(imeas_path, mmap_mode="r"), np.load(roc_path, mmap_mode="r"), key
 
 
 def _plot_pattern(imeas: Sequence[float], roc: Sequence[float]) -> None:
@@ -235,6 +396,11 @@ def main() -> None:
         action="store_true",
         help="Generate the pattern but do not display plots",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Regenerate the pattern instead of using the pattern cache",
+    )
     parser.add_argument(
         "--verbose",
         "-v",
@@ -249,13 +415,15 @@ def main() -> None:
     )
 
     config = _make_default_config_from_settings()
-    imeas, roc = generate_imeas_pattern(config)
+    imeas, roc, key = cached_imeas_pattern(config, use_cache=not args.no_cache)
 
     print(f"Generated {len(imeas)} IMEAS points using kalman_settings:")
-    print(f"  IMEAS range: [{min(imeas):.4e}, {max(imeas):.4e}] A")
+    if key:
+        print(f"  Pattern key: {key}")
+    if len(imeas):
+        print(f"  IMEAS range: [{imeas.min():.4e}, {imeas.max():.4e}] A")
     if len(roc) > 1:
-        roc_abs = [abs(r) for r in roc[1:]]
-        print(f"  ROC max: {max(roc_abs):.4e} A/step")
+        print(f"  ROC max: {np.abs(roc[1:]).max():.4e} A/step")
 
     if not args.no_plot:
         _plot_pattern(imeas, roc)
@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Offline Kalman Loop Simulator
+=============================
+
+Vectorized simulation of the ERASE/PROGRAM update law used by
+`experiments/run_kalman.py` (`_compute_ierr` / `_update_current`), run for
+many parameter combinations at once over the whole IMEAS pattern:
+
+    ERASE:   IERR = TRIM / OUT,  X <- clamp(X * (1 + IERR))
+    PROGRAM: IERR = TRIM / OUT,  X <- clamp(X * (1 - IERR))
+
+with X clamped to [MIN_CURRENT, MAX_CURRENT] and IERR = 0 when |OUT| < 1e-15.
+
+How OUT responds to X is given by an out-model. A model receives the mode,
+X1/X2, the present IMEAS and the parameter arrays:
+
+    out_kalman_filter (default)
+        ERASE: OUT = X, so ERASE adds TRIM. PROGRAM: OUT such that the step
+        lands on the filter update of the state before the ERASE (X - TRIM),
+        with currents in units of IREFP (f = F/IREFP, k = KGAIN/IREFP):
+            r  = IMEAS - (f11 * X1 + f12 * X2)
+            X1 <- f11 * X1 + f12 * X2 + k1 * r
+            X2 <- X2 + k2 * r
+        KGAIN1/2, F11/F12 and IMEAS shape the trajectory; TRIM sets how far
+        the ERASE half-step reaches (and so where the bounds clip).
+    out_tracks_x
+        OUT = X, the TEST_MODE model of run_kalman. ERASE then PROGRAM leaves
+        X unchanged, so only TRIM, X1 and X2 can be swept with it.
+
+Usage:
+    python -m experiments.kalman_sim --trim1 10e-9 20e-9 40e-9 --x1 10e-9 50e-9 [--workers 4]
+    python -m experiments.kalman_sim --kgain1 10e-9 25e-9 50e-9 --f12 0.5e-9 1e-9
+
+Results (one row per combination: parameters + convergence metrics) are
+written to measurements/kalman_sim_YYYYMMDD_HHMMSS.csv.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from configs import kalman_settings as SETTINGS
+from experiments.imeas_test_pattern import cached_imeas_pattern
+
+
+logger = logging.getLogger(__name__)
+
+# Parameters that can be swept, with their kalman_settings defaults
+PARAMETER_DEFAULTS: Dict[str, float] = {
+    "TRIM1": SETTINGS.TRIM1_INITIAL,
+    "TRIM2": SETTINGS.TRIM2_INITIAL,
+    "KGAIN1": SETTINGS.KGAIN1_INITIAL,
+    "KGAIN2": SETTINGS.KGAIN2_INITIAL,
+    "F11": SETTINGS.F11_INITIAL,
+    "F12": SETTINGS.F12_INITIAL,
+    "X1": SETTINGS.X1_INITIAL,
+    "X2": SETTINGS.X2_INITIAL,
+}
+
+# Same guard as KalmanExperiment._compute_ierr
+OUT_EPS = 1e-15
+
+# (mode, x1, x2, imeas, params) -> (out1, out2)
+OutModel = Callable[[str, np.ndarray, np.ndarray, float, Dict[str, np.ndarray]],
+                    Tuple[np.ndarray, np.ndarray]]
+
+
+def out_tracks_x(mode: str, x1: np.ndarray, x2: np.ndarray, imeas: float,
+                 params: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """OUT1 = X1, OUT2 = X2 (as run_kalman in TEST_MODE)."""
+    return x1, x2
+
+
+def _out_to_target(x: np.ndarray, target: np.ndarray, trim: np.ndarray) -> np.ndarray:
+    """OUT for which the PROGRAM update x * (1 - TRIM / OUT) gives target."""
+    drop = x - target
+    return np.divide(trim * x, drop, out=np.full(np.broadcast(x, drop, trim).shape, np.inf),
+                     where=drop != 0)
+
+
+def out_kalman_filter(mode: str, x1: np.ndarray, x2: np.ndarray, imeas: float,
+                      params: Dict[str, np.ndarray],
+                      irefp: float = SETTINGS.IREFP_DEFAULT) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Default out-model: a two-state (level X1, rate X2) Kalman update.
+
+    ERASE returns OUT = X (the step adds TRIM). PROGRAM returns the OUT that
+    makes the step land on f11 * X1 + f12 * X2 + k1 * r (X1) and X2 + k2 * r
+    (X2) for the state before the ERASE, where r = IMEAS - (f11 * X1 + f12 * X2)
+    and f = F / IREFP, k = KGAIN / IREFP.
+    """
+    if mode == "ERASE":
+        return x1, x2
+    prev1 = x1 - params["TRIM1"]
+    prev2 = x2 - params["TRIM2"]
+    f11 = params["F11"] / irefp
+    f12 = params["F12"] / irefp
+    predicted = f11 * prev1 + f12 * prev2
+    residual = imeas - predicted
+    target1 = predicted + params["KGAIN1"] / irefp * residual
+    target2 = prev2 + params["KGAIN2"] / irefp * residual
+    return (_out_to_target(x1, target1, params["TRIM1"]),
+            _out_to_target(x2, target2, params["TRIM2"]))
+
+
+OUT_MODELS: Dict[str, OutModel] = {
+    "kalman": out_kalman_filter,
+    "tracks_x": out_tracks_x,
+}
+
+# Parameters an out-model ignores (not offered for sweeps with it)
+IGNORED_PARAMETERS: Dict[str, Tuple[str, ...]] = {
+    "kalman": (),
+    "tracks_x": ("KGAIN1", "KGAIN2", "F11", "F12"),
+}
+
+
+def parameter_grid(**axes: Sequence[float]) -> Dict[str, np.ndarray]:
+    """
+    Build every combination of the given parameter values.
+
+    Parameters not given keep their kalman_settings default.
+
+    Example:
+        parameter_grid(TRIM1=[10e-9, 20e-9], X1=[10e-9, 50e-9, 90e-9])  # 6 combos
+    """
+    unknown = set(axes) - set(PARAMETER_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown parameters: {sorted(unknown)}")
+    names = list(PARAMETER_DEFAULTS)
+    values = [np.asarray(axes.get(name, [PARAMETER_DEFAULTS[name]]), dtype=float) for name in names]
+    mesh = np.meshgrid(*values, indexing="ij")
+    return {name: m.ravel() for name, m in zip(names, mesh)}
+
+
+def _ierr(trim: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """IERR = TRIM / OUT, 0 where |OUT| is below OUT_EPS."""
+    ok = np.abs(out) >= OUT_EPS
+    return np.divide(trim, out, out=np.zeros(np.broadcast(trim, out).shape), where=ok)
+
+
+def simulate(imeas: Sequence[float], params: Dict[str, np.ndarray],
+             out_model: OutModel = out_kalman_filter,
+             min_current: float = SETTINGS.MIN_CURRENT,
+             max_current: float = SETTINGS.MAX_CURRENT) -> Dict[str, np.ndarray]:
+    """
+    Run the closed loop for every parameter combination at once.
+
+    Args:
+        imeas: IMEAS pattern (A).
+        params: Arrays of equal length keyed by PARAMETER_DEFAULTS names
+                (see parameter_grid()).
+        out_model: OUT response model.
+        min_current, max_current: X clamp bounds (A).
+
+    Returns:
+        Dict of arrays (one entry per combination):
+            FINAL_X1/X2    - X after the last PROGRAM update
+            TAIL_MEAN_X1/X2 - mean X over the last quarter of the steps
+            RMS_ERR1/2     - RMS of (X - IMEAS) after each PROGRAM update
+            CLAMP_FRAC1/2  - fraction of updates that hit a bound
+    """
+    params = {name: np.asarray(v, dtype=float) for name, v in params.items()}
+    x1 = params["X1"].copy()
+    x2 = params["X2"].copy()
+    trim1 = params["TRIM1"]
+    trim2 = params["TRIM2"]
+
+    n_steps = len(imeas)
+    tail_start = n_steps - max(n_steps // 4, 1)
+    sq_err1 = np.zeros_like(x1)
+    sq_err2 = np.zeros_like(x2)
+    clamps1 = np.zeros_like(x1)
+    clamps2 = np.zeros_like(x2)
+    tail1 = np.zeros_like(x1)
+    tail2 = np.zeros_like(x2)
+
+    def update(x, ierr, sign, clamps):
+        raw = x * (1.0 + sign * ierr)
+        clamps += (raw < min_current) | (raw > max_current)
+        return np.clip(raw, min_current, max_current)
+
+    for k, i_meas in enumerate(imeas):
+        i_meas = float(i_meas)
+        # ERASE
+        out1, out2 = out_model("ERASE", x1, x2, i_meas, params)
+        x1 = update(x1, _ierr(trim1, out1), 1.0, clamps1)
+        x2 = update(x2, _ierr(trim2, out2), 1.0, clamps2)
+        # PROGRAM
+        out1, out2 = out_model("PROGRAM", x1, x2, i_meas, params)
+        x1 = update(x1, _ierr(trim1, out1), -1.0, clamps1)
+        x2 = update(x2, _ierr(trim2, out2), -1.0, clamps2)
+
+        sq_err1 += (x1 - i_meas) ** 2
+        sq_err2 += (x2 - i_meas) ** 2
+        if k >= tail_start:
+            tail1 += x1
+            tail2 += x2
+
+    n_tail = max(n_steps - tail_start, 1)
+    n_updates = max(2 * n_steps, 1)
+    return {
+        "FINAL_X1": x1,
+        "FINAL_X2": x2,
+        "TAIL_MEAN_X1": tail1 / n_tail,
+        "TAIL_MEAN_X2": tail2 / n_tail,
+        "RMS_ERR1": np.sqrt(sq_err1 / max(n_steps, 1)),
+        "RMS_ERR2": np.sqrt(sq_err2 / max(n_steps, 1)),
+        "CLAMP_FRAC1": clamps1 / n_updates,
+        "CLAMP_FRAC2": clamps2 / n_updates,
+    }
+
+
+def _simulate_chunk(args) -> Dict[str, np.ndarray]:
+    imeas, params, out_model, min_current, max_current = args
+    return simulate(imeas, params, out_model, min_current, max_current)
+
+
+def simulate_grid(imeas: Sequence[float], params: Dict[str, np.ndarray],
+                  out_model: OutModel = out_kalman_filter,
+                  workers: Optional[int] = None,
+                  min_current: float = SETTINGS.MIN_CURRENT,
+                  max_current: float = SETTINGS.MAX_CURRENT) -> Dict[str, np.ndarray]:
+    """
+    simulate(), optionally split across a process pool.
+
+    Args:
+        workers: Number of worker processes; None or 1 runs in this process.
+                 out_model must be a module-level function to be used with
+                 workers.
+
+    Returns:
+        Same as simulate(), in the order of params.
+    """
+    n = len(next(iter(params.values())))
+    if not workers or workers <= 1 or n < 2:
+        return simulate(imeas, params, out_model, min_current, max_current)
+
+    imeas = np.asarray(imeas, dtype=float)
+    bounds = np.linspace(0, n, min(workers, n) + 1).astype(int)
+    chunks = [({k: v[a:b] for k, v in params.items()}) for a, b in zip(bounds[:-1], bounds[1:])]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(_simulate_chunk,
+                              [(imeas, c, out_model, min_current, max_current) for c in chunks]))
+    return {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+
+
+def write_results_csv(path: str, params: Dict[str, np.ndarray],
+                      metrics: Dict[str, np.ndarray]) -> None:
+    """Write one row per combination: parameters then metrics."""
+    columns = list(params) + list(metrics)
+    data = np.column_stack([params[c] for c in params] + [metrics[c] for c in metrics])
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(data.tolist())
+
+
+def main() -> None:
+    """Sweep parameters over the kalman_settings IMEAS pattern and write a CSV."""
+    parser = argparse.ArgumentParser(description="Offline Kalman loop parameter sweep")
+    for name in PARAMETER_DEFAULTS:
+        parser.add_argument(
+            f"--{name.lower()}",
+            type=float,
+            nargs="+",
+            metavar="A",
+            help=f"{name} values to sweep (default: {PARAMETER_DEFAULTS[name]:g})",
+        )
+    parser.add_argument("--out-model", choices=sorted(OUT_MODELS), default="kalman",
+                        help="OUT response model (default: kalman)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: 1)")
+    parser.add_argument("--output", help="Output CSV (default: measurements/kalman_sim_<timestamp>.csv)")
+    parser.add_argument("--top", type=int, default=5, help="Print the N combinations with lowest RMS_ERR1")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    imeas, _, key = cached_imeas_pattern()
+    axes = {name: getattr(args, name.lower()) for name in PARAMETER_DEFAULTS
+            if getattr(args, name.lower())}
+    ignored = sorted(set(axes) & set(IGNORED_PARAMETERS[args.out_model]))
+    if ignored:
+        parser.error(f"the {args.out_model} out-model ignores {', '.join(ignored)}; "
+                     f"sweep them with --out-model kalman")
+    params = parameter_grid(**axes)
+    n_combos = len(params["X1"])
+
+    start = datetime.now()
+    metrics = simulate_grid(imeas, params, OUT_MODELS[args.out_model], workers=args.workers)
+    elapsed = (datetime.now() - start).total_seconds()
+    logger.info(f"Simulated {n_combos} combinations x {len(imeas)} IMEAS steps in {elapsed:.2f} s"
+                + (f" (pattern {key})" if key else ""))
+
+    output = args.output
+    if output is None:
+        measurements_dir = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "measurements",
+        )
+        os.makedirs(measurements_dir, exist_ok=True)
+        output = os.path.join(measurements_dir, f"kalman_sim_{start.strftime('%Y%m%d_%H%M%S')}.csv")
+    write_results_csv(output, params, metrics)
+    print(f"Results: {output}")
+
+    best = np.argsort(metrics["RMS_ERR1"])[:args.top]
+    print(f"Lowest RMS_ERR1 of {n_combos} combinations:")
+    for i in best:
+        settings = ", ".join(f"{name}={params[name][i]:g}" for name in axes) or "defaults"
+        print(f"  {settings}: RMS_ERR1={metrics['RMS_ERR1'][i]:.4e} A, "
+              f"FINAL_X1={metrics['FINAL_X1'][i]:.4e} A")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Multi-Bench Orchestrator
+========================
+
+Runs one experiment on several benches at once. Each bench (an address map
+in configs/benches.py) gets its own process and its own runner instance;
+the work is dealt round-robin across benches and the per-bench CSVs are
+merged afterwards with a Bench_ID column, so N free benches finish a run
+about N times faster.
+
+Supported experiments are listed in RUNNERS. A runner must accept
+`addresses`, `bench_id`, `partition=(index, count)` and `partition_by`,
+and expose the CSV it wrote as `csv_path`.
+
+Usage:
+    python -m experiments.multi_bench [--test] [--benches bench1 bench2]
+                                      [--partition-by combinations|experiments]
+
+Each bench writes its own logs (logs/compute_<bench>_*.log) and CSV
+(measurements/compute_<bench>_<timestamp>.csv); the merged CSV is
+measurements/compute_multi_<timestamp>.csv.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from configs import benches as BENCH_SETTINGS
+from configs.resource_types import InstrumentType
+
+
+logger = logging.getLogger(__name__)
+
+# Experiment name -> (module, runner class)
+RUNNERS = {
+    "compute": ("experiments.run_compute", "ComputeExperiment"),
+}
+
+
+def _runner_class(experiment: str):
+    try:
+        module_name, class_name = RUNNERS[experiment]
+    except KeyError:
+        raise ValueError(f"Unknown experiment {experiment!r}; expected one of {sorted(RUNNERS)}")
+    module = __import__(module_name, fromlist=[class_name])
+    return getattr(module, class_name)
+
+
+def _run_bench(experiment: str, bench_id: str, addresses: Dict[InstrumentType, str],
+               partition: tuple, partition_by: str, test_mode: bool,
+               runner_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Worker: run one bench's share of the experiment (in its own process)."""
+    from experiments.base_experiment import DEFAULT_ADDRESSES
+
+    runner_cls = _runner_class(experiment)
+    start = time.time()
+    with runner_cls(
+        test_mode=test_mode,
+        addresses={**DEFAULT_ADDRESSES, **addresses},
+        bench_id=bench_id,
+        partition=partition,
+        partition_by=partition_by,
+        **runner_kwargs,
+    ) as runner:
+        results = runner.run()
+    return {
+        "bench_id": bench_id,
+        "csv_path": runner.csv_path,
+        "total_measurements": results.get("total_measurements", 0),
+        "elapsed": time.time() - start,
+    }
+
+
+def merge_bench_csvs(csv_paths: Dict[str, str], output: str) -> int:
+    """
+    Concatenate per-bench CSVs into one file with a leading Bench_ID column.
+
+    All inputs must have the same header. Returns the number of data rows.
+    """
+    header: Optional[List[str]] = None
+    rows = 0
+    with open(output, "w", newline="", encoding="utf-8") as out:
+        writer = csv.writer(out)
+        for bench_id, path in csv_paths.items():
+            with open(path, newline="", encoding="utf-8") as f:
+                reader = csv.reader(f)
+                bench_header = next(reader, None)
+                if bench_header is None:
+                    continue
+                if header is None:
+                    header = bench_header
+                    writer.writerow(["Bench_ID"] + header)
+                elif bench_header != header:
+                    raise ValueError(f"CSV header of {bench_id} ({path}) does not match the other benches")
+                for row in reader:
+                    writer.writerow([bench_id] + row)
+                    rows += 1
+    return rows
+
+
+def run_benches(bench_ids: Sequence[str], experiment: str = "compute",
+                test_mode: bool = False, partition_by: str = BENCH_SETTINGS.PARTITION_BY,
+                output: Optional[str] = None, **runner_kwargs) -> Dict[str, Any]:
+    """
+    Run an experiment across benches in parallel and merge the results.
+
+    Args:
+        bench_ids: Bench names from configs/benches.py BENCHES.
+        experiment: Key of RUNNERS.
+        test_mode: Run every bench in TEST_MODE.
+        partition_by: "combinations" or "experiments".
+        output: Merged CSV path (default: measurements/<experiment>_multi_<timestamp>.csv).
+        **runner_kwargs: Passed to every runner (e.g. vdd, vcc).
+
+    Returns:
+        Dict with per-bench summaries, failures, merged CSV path and row count.
+    """
+    unknown = [b for b in bench_ids if b not in BENCH_SETTINGS.BENCHES]
+    if unknown:
+        raise ValueError(f"Unknown bench(es) {unknown}; defined: {sorted(BENCH_SETTINGS.BENCHES)}")
+    _runner_class(experiment)  # Fail early on an unknown experiment
+
+    count = len(bench_ids)
+    start = time.time()
+    benches: Dict[str, Dict[str, Any]] = {}
+    failures: Dict[str, str] = {}
+    # "spawn" gives every bench a fresh interpreter: its own logging handlers,
+    # TEST_MODE command log and VISA resource manager
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=count, mp_context=context) as pool:
+        futures = {
+            bench_id: pool.submit(_run_bench, experiment, bench_id,
+                                  BENCH_SETTINGS.BENCHES[bench_id], (index, count),
+                                  partition_by, test_mode, runner_kwargs)
+            for index, bench_id in enumerate(bench_ids)
+        }
+        for bench_id, future in futures.items():
+            try:
+                benches[bench_id] = future.result()
+                logger.info(f"{bench_id}: {benches[bench_id]['total_measurements']} measurements "
+                            f"in {benches[bench_id]['elapsed']:.1f} s")
+            except BaseException as e:  # SystemExit from instrument errors included
+                failures[bench_id] = repr(e)
+                logger.error(f"{bench_id} failed: {e!r}")
+
+    csv_paths = {b: r["csv_path"] for b, r in benches.items() if r.get("csv_path")}
+    merged_rows = 0
+    if csv_paths:
+        if output is None:
+            measurements_dir = os.path.join(
+                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                "measurements",
+            )
+            os.makedirs(measurements_dir, exist_ok=True)
+            output = os.path.join(
+                measurements_dir,
+                f"{experiment}_multi_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            )
+        merged_rows = merge_bench_csvs(csv_paths, output)
+        logger.info(f"Merged {merged_rows} rows from {len(csv_paths)} bench(es) into {output}")
+    else:
+        output = None
+
+    return {
+        "experiment": experiment,
+        "partition_by": partition_by,
+        "benches": benches,
+        "failures": failures,
+        "merged_csv": output,
+        "merged_rows": merged_rows,
+        "elapsed": time.time() - start,
+    }
+
+
+def main() -> None:
+    """Run an experiment on several benches in parallel."""
+    parser = argparse.ArgumentParser(description="Run an experiment across several benches in parallel")
+    parser.add_argument("--test", "-t", action="store_true",
+                        help="Run in TEST_MODE (log commands without hardware)")
+    parser.add_argument("--experiment", default="compute", choices=sorted(RUNNERS),
+                        help="Experiment to run (default: compute)")
+    parser.add_argument("--benches", nargs="+", default=BENCH_SETTINGS.ACTIVE_BENCHES,
+                        help=f"Benches to use (default: {' '.join(BENCH_SETTINGS.ACTIVE_BENCHES)})")
+    parser.add_argument("--partition-by", choices=["combinations", "experiments"],
+                        default=BENCH_SETTINGS.PARTITION_BY,
+                        help=f"How work is split across benches (default: {BENCH_SETTINGS.PARTITION_BY})")
+    parser.add_argument("--output", help="Merged CSV path")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    summary = run_benches(args.benches, args.experiment, test_mode=args.test,
+                          partition_by=args.partition_by, output=args.output)
+
+    print("\n" + "=" * 60)
+    print("MULTI-BENCH SUMMARY")
+    print("=" * 60)
+    print(f"Experiment: {summary['experiment']} (split by {summary['partition_by']})")
+    for bench_id, result in summary["benches"].items():
+        print(f"  {bench_id}: {result['total_measurements']} measurements, "
+              f"{result['elapsed']:.1f} s -> {result['csv_path']}")
+    for bench_id, error in summary["failures"].items():
+        print(f"  {bench_id}: FAILED ({error})")
+    print(f"Merged CSV: {summary['merged_csv']} ({summary['merged_rows']} rows)")
+    print(f"Total elapsed time: {summary['elapsed']:.1f} s")
+    print("=" * 60)
+
+    if summary["failures"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Closed-Loop Pipeline Helpers
+============================
+
+Helpers for keeping only the true data dependency (measure -> update) on the
+critical path of a closed loop such as `experiments/run_kalman.py`:
+
+- `BackgroundSink` runs I/O callables (CSV rows, log lines) in order on a
+  background thread, so step k-1's output is written while step k measures.
+- `StepLatencyStats` collects per-step latencies and reports p50/p95/max.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundSink:
+    """
+    Runs submitted callables one at a time, in submission order, on a worker
+    thread.
+
+    If a callable raises, later items are dropped and the error is re-raised
+    (as RuntimeError) from the next submit() or from close().
+
+    Args:
+        name: Worker thread name.
+        maxsize: Queue bound; submit() blocks when the worker falls this far
+                 behind (0 = unbounded).
+    """
+
+    def __init__(self, name: str = "background-sink", maxsize: int = 1024):
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._worker, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        """Queue fn(*args, **kwargs) to run on the worker thread."""
+        self._raise_if_failed()
+        self._queue.put((fn, args, kwargs))
+
+    def close(self) -> None:
+        """Run everything still queued, stop the worker and report any failure."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_if_failed()
+
+    def _worker(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is not None:
+                continue
+            fn, args, kwargs = item
+            try:
+                fn(*args, **kwargs)
+            except Exception as exc:
+                logger.error(f"Background sink task {getattr(fn, '__name__', fn)} failed: {exc}")
+                self._error = exc
+
+    def _raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise RuntimeError("Background sink task failed") from self._error
+
+    def __enter__(self) -> "BackgroundSink":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> bool:
+        self.close()
+        return False
+
+
+class StepLatencyStats:
+    """Per-step latency samples with nearest-rank percentiles."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._samples: List[float] = []
+
+    def record(self, seconds: float) -> None:
+        """Add one latency sample (seconds)."""
+        self._samples.append(seconds)
+
+    @contextmanager
+    def measure(self) -> Iterator[None]:
+        """Record the time spent in the with-block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(time.perf_counter() - start)
+
+    def percentile(self, p: float) -> float:
+        """Nearest-rank percentile (p in 0-100) of the samples; 0.0 if empty."""
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        rank = max(1, -(-len(ordered) * p // 100))  # ceil(n * p / 100)
+        return ordered[int(rank) - 1]
+
+    def summary(self) -> Dict[str, float]:
+        """Return count, mean, p50, p95 and max (seconds)."""
+        n = len(self._samples)
+        return {
+            "count": n,
+            "mean": sum(self._samples) / n if n else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "max": max(self._samples) if n else 0.0,
+        }
+
+    def log_summary(self, log: logging.Logger) -> None:
+        """Log the summary in milliseconds."""
+        s = self.summary()
+        log.info(f"{self.name} latency: n={s['count']}, mean={s['mean'] * 1e3:.3f} ms, "
+                 f"p50={s['p50'] * 1e3:.3f} ms, p95={s['p95'] * 1e3:.3f} ms, "
+                 f"max={s['max'] * 1e3:.3f} ms")
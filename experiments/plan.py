@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+"""
+Measurement Plans
+=================
+
+Declarative description of a spot-measurement experiment, compiled to a
+per-instrument command schedule and executed by one engine, instead of each
+run_*.py hand-coding its set / settle / measure / CSV loop.
+
+A MeasurementPlan gives:
+- axes:      nested sweep axes, outermost first. An axis sets one or more
+             parameters together (e.g. a list of parameter combinations).
+- fixed:     parameter values that do not change.
+- convert:   normalized value -> physical value (e.g. Compute's
+             convert_normalized_to_current), given the whole point.
+- linked:    parameter -> terminals it drives (KGAIN -> KGAIN1, KGAIN2).
+- setters:   parameters that are not terminal currents (e.g. ERASE_PROG ->
+             set_ppg_state); called with the raw value.
+- measure:   terminals read at every point.
+- settle:    settle time after a parameter changes (and settle_first before
+             the first point).
+
+compile_plan() turns it into PlanSteps:
+- redundant commands are eliminated: a terminal or setter is only written
+  when its value differs from the previous point.
+- current commands are pre-formatted and batched per instrument into one
+  write (FLEX commands joined with ';').
+- settles are merged into one wait per point (the longest one due).
+- measured terminals are grouped per instrument into one MM spot (MM is only
+  re-sent when the channel list changes). When a point measures on several
+  instruments, their spots run concurrently (InstrumentBase.submit).
+
+PlanEngine.execute() runs the steps and hands each point's readings to a
+callback (CSV row, checkpoint, ...).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from configs.resource_types import InstrumentType, MeasurementType
+from instruments.ranging import parse_flex_value
+
+
+logger = logging.getLogger(__name__)
+
+# Instruments that accept several FLEX commands in one write, and the separator
+BATCH_SEPARATOR = {
+    InstrumentType.IV5270B: ";",
+    InstrumentType.IV4156B: ";",
+}
+
+# Header before the value, e.g. 5270B 'NAI' or 4156B '004AV'
+_DATA_PREFIX = re.compile(r'^[A-Za-z0-9]*[A-Za-z]([+-]?\d.*)')
+
+# Data read method per measuring instrument
+READ_METHODS = {
+    InstrumentType.IV5270B: "read_data",
+    InstrumentType.IV4156B: "read_measurement_data",
+}
+
+
+class Axis(NamedTuple):
+    """
+    One sweep axis.
+
+    params: parameter names set by this axis.
+    values: one tuple per point (same length as params).
+    labels: optional per-point labels returned in PlanStep.labels
+            (default: the point index), e.g. to build checkpoint positions.
+    """
+    params: Tuple[str, ...]
+    values: Sequence[Tuple[Any, ...]]
+    labels: Optional[Sequence[Any]] = None
+
+    @classmethod
+    def single(cls, name: str, values: Iterable[Any]) -> "Axis":
+        """Axis over one parameter."""
+        return cls((name,), [(v,) for v in values])
+
+
+class MeasurementPlan(NamedTuple):
+    """Declarative spot-measurement experiment (see module docstring)."""
+    name: str
+    axes: Sequence[Axis]
+    measure: Tuple[str, ...]
+    fixed: Optional[Dict[str, Any]] = None
+    convert: Optional[Callable[[str, Any, Dict[str, Any]], Any]] = None
+    linked: Optional[Dict[str, Tuple[str, ...]]] = None
+    setters: Optional[Dict[str, Callable[[Any], None]]] = None
+    compliance: Optional[Callable[[float], Optional[float]]] = None
+    settle: Optional[Dict[str, float]] = None
+    settle_first: float = 0.0
+    range_hints: Optional[Dict[str, str]] = None  # Measured terminal -> parameter it follows
+
+
+class MeasureGroup(NamedTuple):
+    """Terminals measured in one MM spot on one instrument."""
+    instrument: InstrumentType
+    terminals: Tuple[str, ...]
+    channels: Tuple[int, ...]
+    send_mm: bool
+
+
+class PlanStep(NamedTuple):
+    """One compiled point."""
+    index: int
+    labels: Tuple[Any, ...]               # Per-axis labels
+    setpoint: Dict[str, Any]              # Normalized parameter values
+    values: Dict[str, Any]                # Converted (physical) parameter values
+    calls: List[Tuple[str, Any]]          # Setter parameters to apply (changed only)
+    writes: Dict[InstrumentType, List[Tuple[str, float, str]]]  # (terminal, current, command)
+    settle: float
+    measure: List[MeasureGroup]
+
+
+class CompiledPlan(NamedTuple):
+    """Compiled schedule plus command counts."""
+    name: str
+    steps: List[PlanStep]
+    stats: Dict[str, int]
+
+
+def iterate_points(plan: MeasurementPlan) -> Iterable[Tuple[Tuple[Any, ...], Dict[str, Any]]]:
+    """Yield (labels, setpoint) for every point, innermost axis fastest."""
+    fixed = dict(plan.fixed or {})
+
+    def walk(level: int, labels: Tuple[Any, ...], setpoint: Dict[str, Any]):
+        if level == len(plan.axes):
+            yield labels, setpoint
+            return
+        axis = plan.axes[level]
+        for i, value in enumerate(axis.values):
+            point = dict(setpoint)
+            point.update(zip(axis.params, value))
+            label = axis.labels[i] if axis.labels is not None else i
+            yield from walk(level + 1, labels + (label,), point)
+
+    yield from walk(0, (), fixed)
+
+
+def compile_plan(plan: MeasurementPlan, runner,
+                 skip: Optional[Callable[[Tuple[Any, ...]], bool]] = None) -> CompiledPlan:
+    """
+    Compile a plan against a runner's terminal configuration.
+
+    Args:
+        plan: The measurement plan.
+        runner: ExperimentRunner (terminal configs, current command format).
+        skip: Optional predicate on a point's labels; skipped points are
+              dropped before redundancy elimination (e.g. already measured
+              points when resuming), so the first compiled point sets
+              everything.
+
+    Raises:
+        ValueError: If a parameter is neither a setter nor a current terminal,
+                    or a measured terminal cannot be spot-measured.
+    """
+    linked = plan.linked or {}
+    setters = plan.setters or {}
+    settle = plan.settle or {}
+    index = runner.config_index
+
+    # Measurement groups: one per instrument, in order of first appearance
+    group_terminals: Dict[InstrumentType, List[str]] = {}
+    for terminal in plan.measure:
+        cfg = index.terminal(terminal)
+        if cfg.instrument not in READ_METHODS:
+            raise ValueError(f"{plan.name}: {terminal} is on {cfg.instrument.value}, which has no spot measurement")
+        group_terminals.setdefault(cfg.instrument, []).append(terminal)
+    groups = [(inst, tuple(terms), index.channels(tuple(terms))) for inst, terms in group_terminals.items()]
+
+    last_terminal: Dict[str, float] = {}
+    last_setter: Dict[str, Any] = {}
+    last_mm: Dict[InstrumentType, Tuple[int, ...]] = {}
+    steps: List[PlanStep] = []
+    stats = {"points": 0, "writes": 0, "commands": 0, "eliminated": 0, "setter_calls": 0,
+             "mm_sent": 0, "settles": 0}
+
+    for labels, setpoint in iterate_points(plan):
+        if skip is not None and skip(labels):
+            continue
+        values = {name: (plan.convert(name, value, setpoint) if plan.convert else value)
+                  for name, value in setpoint.items()}
+
+        calls: List[Tuple[str, Any]] = []
+        writes: Dict[InstrumentType, List[Tuple[str, float, str]]] = {}
+        wait = plan.settle_first if not steps else 0.0
+        for name, value in values.items():
+            if name in setters:
+                if name in last_setter and last_setter[name] == value:
+                    stats["eliminated"] += 1
+                    continue
+                last_setter[name] = value
+                calls.append((name, value))
+                wait = max(wait, settle.get(name, 0.0))
+                continue
+            changed = False
+            for terminal in linked.get(name, (name,)):
+                cfg = index.terminal(terminal)
+                if cfg.measurement_type != MeasurementType.I:
+                    raise ValueError(f"{plan.name}: parameter {name} drives {terminal}, "
+                                     f"which is not a current terminal; give it a setter")
+                if terminal in last_terminal and last_terminal[terminal] == value:
+                    stats["eliminated"] += 1
+                    continue
+                compliance = plan.compliance(value) if plan.compliance else None
+                command = runner.prepare_terminal_current(terminal, value, compliance)
+                writes.setdefault(cfg.instrument, []).append((terminal, value, command))
+                last_terminal[terminal] = value
+                changed = True
+            if changed:
+                wait = max(wait, settle.get(name, 0.0))
+
+        measure = []
+        for inst, terms, channels in groups:
+            send_mm = last_mm.get(inst) != channels
+            last_mm[inst] = channels
+            measure.append(MeasureGroup(inst, terms, channels, send_mm))
+            stats["mm_sent"] += send_mm
+
+        stats["points"] += 1
+        stats["setter_calls"] += len(calls)
+        stats["commands"] += sum(len(w) for w in writes.values())
+        stats["writes"] += sum(1 if inst in BATCH_SEPARATOR else len(w) for inst, w in writes.items())
+        stats["settles"] += wait > 0
+        steps.append(PlanStep(len(steps), labels, setpoint, values, calls, writes, wait, measure))
+
+    return CompiledPlan(plan.name, steps, stats)
+
+
+class PlanEngine:
+    """
+    Executes compiled plans on a runner's instruments.
+
+    Args:
+        runner: ExperimentRunner the plan was compiled against.
+    """
+
+    def __init__(self, runner):
+        self.runner = runner
+        self.logger = runner.logger
+
+    def execute(self, compiled: CompiledPlan, plan: MeasurementPlan,
+                on_point: Callable[[PlanStep, Dict[str, Optional[float]]], None]) -> int:
+        """
+        Run every step: setters, batched current writes, one settle, then
+        one MM spot per instrument (concurrently across instruments).
+
+        Args:
+            compiled: Output of compile_plan(plan, runner).
+            plan: The plan (setters and range hints).
+            on_point: Called with (step, readings) after each point;
+                      readings maps measured terminal -> value (None if the
+                      element could not be parsed).
+
+        Returns:
+            Number of points executed.
+        """
+        runner = self.runner
+        setters = plan.setters or {}
+        range_hints = plan.range_hints or {}
+        s = compiled.stats
+        self.logger.info(f"Plan '{compiled.name}': {s['points']} points, {s['commands']} source commands "
+                         f"in {s['writes']} writes ({s['eliminated']} redundant eliminated), "
+                         f"{s['mm_sent']} MM, {s['settles']} settles")
+
+        for step in compiled.steps:
+            for name, value in step.calls:
+                setters[name](value)
+
+            for inst_type, writes in step.writes.items():
+                inst = runner._get_instrument(inst_type)
+                separator = BATCH_SEPARATOR.get(inst_type)
+                if separator:
+                    inst.write(separator.join(command for _, _, command in writes))
+                else:
+                    for _, _, command in writes:
+                        inst.write(command)
+                for terminal, value, _ in writes:
+                    runner._terminal_states[terminal] = value
+                self.logger.debug(f"{inst_type.value}: " +
+                                  ", ".join(f"{t}={v}A" for t, v, _ in writes))
+
+            if step.settle and not runner.test_mode:
+                time.sleep(step.settle)
+
+            readings: Dict[str, Optional[float]] = {}
+            if len(step.measure) > 1:
+                # One group per instrument, each on its instrument's I/O thread
+                futures = [runner._get_instrument(group.instrument).submit(self._measure, group, step, range_hints)
+                           for group in step.measure]
+                for future in futures:
+                    readings.update(future.result())
+            else:
+                for group in step.measure:
+                    readings.update(self._measure(group, step, range_hints))
+            for terminal in range_hints:
+                # Unparsable readings count as 0.0, as in the hand-coded loops
+                runner.note_measurement(terminal, readings.get(terminal) or 0.0)
+
+            on_point(step, readings)
+        return len(compiled.steps)
+
+    def _measure(self, group: MeasureGroup, step: PlanStep,
+                 range_hints: Dict[str, str]) -> Dict[str, Optional[float]]:
+        """One MM spot on one instrument; retried in auto range after an overflow."""
+        runner = self.runner
+        inst = runner._get_instrument(group.instrument)
+        read = getattr(inst, READ_METHODS[group.instrument])
+        for terminal in group.terminals:
+            if terminal in range_hints:
+                runner.prepare_measurement_range(terminal, expected=step.values.get(range_hints[terminal]))
+        if group.send_mm:
+            inst.set_measurement_mode(1, list(group.channels))
+
+        inst.execute_measurement()
+        data = read()
+        if any([runner.check_range_overflow(t, data) for t in group.terminals]):
+            inst.execute_measurement()
+            data = read()
+        tokens = data.split(",")
+
+        # FMT 1 elements by channel header; other data (4156B) by position
+        flex = runner.terminal_readings(group.terminals, data)
+        readings: Dict[str, Optional[float]] = {}
+        for i, terminal in enumerate(group.terminals):
+            if flex[terminal] is not None:
+                readings[terminal] = flex[terminal].value
+            elif i < len(tokens) and parse_flex_value(tokens[i]) is None:
+                readings[terminal] = _parse_value(tokens[i])
+            else:
+                readings[terminal] = None
+        return readings
+
+
+def _parse_value(token: str) -> Optional[float]:
+    """Value of a data element without an FMT 1 header (4156B); None if unparsable."""
+    match = _DATA_PREFIX.match(token.strip())
+    try:
+        return float(match.group(1) if match else token)
+    except ValueError:
+        return None
@@ -26,7 +26,7 @@ import os
 import re
 import argparse
 import logging
-from typing import Optional
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -34,14 +34,25 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from experiments.base_experiment import ExperimentRunner
 from configs.big_kalman import (
     BIG_KALMAN_CONFIG,
+    BIG_KALMAN_TERMINALS,
     BIG_KALMAN_SMU7_VCC_CHANNEL,
 )
 from configs import big_kalman_settings as SETTINGS
 from configs.resource_types import InstrumentType
+from experiments.switch_sequencer import SwitchPatternSequencer
 
 # E5250A output count
 NUM_SWITCH_OUTPUTS = 36
 
+# Readout name -> terminal whose SMU is measured (order used by measure_all)
+READOUT_TERMINALS = {
+    "ICELLMEAS": "CELLMEAS",
+    "IVCC": "VCC",
+    "VIMEAS": "IMEAS",
+    "VREFP": "IREFP",
+    "MODE": "MODE",
+}
+
 
 def _parse_spot_value(data: str) -> float:
     """Try to extract a single float from 5270B spot measurement response."""
@@ -62,6 +73,29 @@ def _parse_spot_value(data: str) -> float:
     raise ValueError(f"Cannot parse float from spot data: {data!r}")
 
 
+def _parse_spot_values(data: str, channels: Sequence[int]) -> Dict[int, float]:
+    """
+    Parse a multi-channel 5270B spot response into {channel: value}.
+
+    With the default data format each value carries a 3-letter header whose
+    second letter is the channel (A = ch1 ... H = ch8), e.g. "NAI+1.23E-09".
+    Values are assigned by header when every token has one, otherwise in the
+    order of channels.
+    """
+    parts = [p.strip() for p in data.strip().split(",") if p.strip()]
+    if len(parts) != len(channels):
+        raise ValueError(f"Expected {len(channels)} values, got {len(parts)}: {data!r}")
+    by_header = {}
+    for part in parts:
+        m = re.match(r"^[A-Z]([A-H])[A-Z]([-+]?\d.*)$", part)
+        if not m:
+            break
+        by_header[ord(m.group(1)) - ord("A") + 1] = float(m.group(2))
+    if sorted(by_header) == sorted(channels):
+        return by_header
+    return {ch: _parse_spot_value(part) for ch, part in zip(channels, parts)}
+
+
 class BigKalmanExperiment(ExperimentRunner):
     """
     Big Kalman experiment: 5270B + E5250A switch matrix.
@@ -84,6 +118,10 @@ class BigKalmanExperiment(ExperimentRunner):
         self.imeas = imeas if imeas is not None else SETTINGS.IMEAS_DEFAULT
         self.irefp = irefp if irefp is not None else SETTINGS.IREFP_DEFAULT
         self.iadc_ref = iadc_ref if iadc_ref is not None else SETTINGS.IADC_REF_DEFAULT
+        # measure(): channel tuples per readout selection, and the channel list
+        # of the last MM 1 sent (so an unchanged readout skips the MM command)
+        self._readout_channels: Dict[Tuple[str, ...], Tuple[int, ...]] = {}
+        self._spot_channels: Optional[Tuple[int, ...]] = None
 
     # ========================================================================
     # Initialization
@@ -102,6 +140,7 @@ class BigKalmanExperiment(ExperimentRunner):
 
         # E5250A: start with all switches open
         sw.open_all()
+        self._spot_channels = None
 
         # 5270B: enable channels 1–7 (GNDU 0 is always enabled)
         channels = list(range(1, 8))
@@ -110,6 +149,9 @@ class BigKalmanExperiment(ExperimentRunner):
         # Apply default biases (voltages and currents)
         self._apply_biases()
 
+        # ADC / integration time / ranges from BIG_KALMAN_MEASUREMENT_PROFILES
+        self.apply_measurement_profiles()
+
         self.logger.info("=" * 60)
         self.logger.info("BIG KALMAN: INITIALIZATION COMPLETE")
         self.logger.info("=" * 60)
@@ -178,6 +220,46 @@ class BigKalmanExperiment(ExperimentRunner):
         sw = self._get_instrument(InstrumentType.SW_E5250A)
         sw.set_outputs_from_pattern(pattern)
 
+    def run_pattern_sequence(self, patterns: Iterable,
+                             measurements: Sequence[str] = ("ICELLMEAS",),
+                             reorder: bool = True) -> List[Dict[str, Any]]:
+        """
+        Step the switch matrix through patterns and measure at each one.
+
+        Only changed outputs are switched, and the relay settling time
+        (SETTINGS.SWITCH_SETTLE_TIME) is waited only when a changed output is in
+        SETTINGS.SWITCH_SENSITIVE_OUTPUTS.
+
+        Args:
+            patterns: List (or generator) of patterns: 36 bools (True = VCC) or
+                      int bitmasks (bit 0 = output 1).
+            measurements: Names of quantities to read per pattern: IVCC, VIMEAS,
+                          VREFP, ICELLMEAS, MODE.
+            reorder: For lists, let the sequencer reorder patterns to minimize
+                     relay toggles (each result keeps its INDEX in the input).
+
+        Returns:
+            One dict per pattern (see SwitchPatternSequencer.run).
+        """
+        self._get_readout_channels(tuple(measurements))  # validate names up front
+        measurements = tuple(measurements)
+
+        def measure() -> Dict[str, Any]:
+            return self.measure(measurements)
+
+        sequencer = SwitchPatternSequencer(
+            self._get_instrument(InstrumentType.SW_E5250A),
+            measure,
+            settle_time=SETTINGS.SWITCH_SETTLE_TIME,
+            sensitive_outputs=SETTINGS.SWITCH_SENSITIVE_OUTPUTS,
+            order=SETTINGS.SWITCH_ORDER,
+            test_mode=self.test_mode,
+        )
+        results = sequencer.run(patterns, reorder=reorder)
+        self.logger.info(f"Pattern sequence: {sequencer.patterns_applied} patterns at "
+                         f"{sequencer.patterns_per_second:.1f} patterns/s")
+        return results
+
     # ========================================================================
     # Measurements (spot on 5270B)
     # ========================================================================
@@ -186,9 +268,73 @@ class BigKalmanExperiment(ExperimentRunner):
         """Run spot measurement on one channel and return raw response."""
         iv = self._get_instrument(InstrumentType.IV5270B)
         iv.set_measurement_mode(1, [channel])
+        self._spot_channels = (channel,)
         iv.execute_measurement()
         return iv.read_data()
 
+    def _get_readout_channels(self, names: Tuple[str, ...]) -> Tuple[int, ...]:
+        """Return (and cache) the 5270B channels for a tuple of readout names."""
+        channels = self._readout_channels.get(names)
+        if channels is None:
+            unknown = [n for n in names if n not in READOUT_TERMINALS]
+            if unknown or not names:
+                raise ValueError(f"Unknown readout(s) {unknown or names}; valid: {list(READOUT_TERMINALS)}")
+            channels = tuple(BIG_KALMAN_TERMINALS[READOUT_TERMINALS[n]].channel for n in names)
+            self._readout_channels[names] = channels
+        return channels
+
+    def measure(self, terminals: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Read several quantities in one spot measurement (one MM 1 + XE + read).
+
+        The MM command is only sent when the channel list differs from the last
+        spot measurement.
+
+        Args:
+            terminals: Readout names from READOUT_TERMINALS (IVCC, VIMEAS, VREFP,
+                       ICELLMEAS, MODE). None = all of them.
+
+        Returns:
+            Dict of readout name -> value. Currents in A, voltages in V; MODE is
+            the 3-bit code (0–7).
+        """
+        names = tuple(terminals) if terminals is not None else tuple(READOUT_TERMINALS)
+        channels = self._get_readout_channels(names)
+        iv = self._get_instrument(InstrumentType.IV5270B)
+        for name in names:
+            self.prepare_measurement_range(READOUT_TERMINALS[name])
+        if channels != self._spot_channels:
+            iv.set_measurement_mode(1, list(channels))
+            self._spot_channels = channels
+        iv.execute_measurement()
+        data = iv.read_data()
+        overflowed = [self.check_range_overflow(READOUT_TERMINALS[name], data) for name in names]
+        if any(overflowed):
+            iv.execute_measurement()
+            data = iv.read_data()
+        if self.test_mode:
+            values = {ch: 0.0 for ch in channels}
+        else:
+            values = _parse_spot_values(data, channels)
+
+        record = {}
+        for name, ch in zip(names, channels):
+            self.note_measurement(READOUT_TERMINALS[name], values[ch])
+            record[name] = self._mode_code(values[ch]) if name == "MODE" else values[ch]
+        return record
+
+    def capture_transient(self, terminals: List[str], interval: float, points: int,
+                          trigger=None, hold_bias: float = 0.0, store=None, label: str = ""):
+        """Sampling measurement (see ExperimentRunner); next spot resends MM 1."""
+        self._spot_channels = None
+        return super().capture_transient(terminals, interval, points,
+                                         trigger=trigger, hold_bias=hold_bias,
+                                         store=store, label=label)
+
+    def measure_all(self) -> Dict[str, Any]:
+        """Read IVCC, VIMEAS, VREFP, ICELLMEAS and MODE in one spot measurement."""
+        return self.measure()
+
     def measure_ivcc(self) -> float:
         """Measure current on VCC (SMU2). Returns current in A."""
         data = self._spot_measure_channel(2)
@@ -216,7 +362,10 @@ class BigKalmanExperiment(ExperimentRunner):
         Uses IADC_REF from config: 000 = 0A, full scale = IADC_REF.
         """
         data = self._spot_measure_channel(6)
-        i = _parse_spot_value(data)
+        return self._mode_code(_parse_spot_value(data))
+
+    def _mode_code(self, i: float) -> int:
+        """Convert MODE current to the 3-bit code using IADC_REF."""
         # Map current to 0..7; clamp to [0, 1] then scale to 7
         if self.iadc_ref <= 0:
             return 0
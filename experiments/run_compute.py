@@ -11,11 +11,14 @@ This script:
 - Handles TEST_MODE for safe command logging
 
 Usage:
-    python -m experiments.run_compute [--test] [--vdd VDD] [--vcc VCC]
+    python -m experiments.run_compute [--test] [--vdd VDD] [--vcc VCC] [--resume RUN_ID]
+                                      [--plan-engine]
     
     --test: Run in TEST_MODE (log commands without hardware)
     --vdd: VDD voltage (default: 1.8V)
     --vcc: VCC voltage (default: 5.0V)
+    --resume: Continue an interrupted run from its last checkpoint
+    --plan-engine: Run experiments as compiled measurement plans (experiments/plan.py)
 
 Configuration:
     Terminal mappings are defined in configs/compute.py
@@ -44,7 +47,10 @@ import argparse
 import logging
 import itertools
 import csv
+import hashlib
+import json
 import re
+import shutil
 import time
 from datetime import datetime
 from typing import Dict, List, Any, Tuple, Optional
@@ -53,9 +59,11 @@ from typing import Dict, List, Any, Tuple, Optional
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from experiments.base_experiment import ExperimentRunner, CURRENT_SOURCE_COMPLIANCE
+from experiments.checkpoint import reopen_output
+from experiments.plan import Axis, MeasurementPlan, PlanEngine, compile_plan
+from instruments.recorder import mark_point
 from configs.compute import (
     COMPUTE_CONFIG,
-    COMPUTE_TERMINALS,
     COMPUTE_BY_TYPE,
     COMPUTE_SEQUENTIAL_PAIRS,
     COMPUTE_PULSE_CONFIG,
@@ -71,7 +79,7 @@ from configs.compute import (
     COMPUTE_SYNC_SWEEP_TERMINALS,
     COMPUTE_FIXED_CURRENT_TERMINALS,
 )
-from configs.resource_types import MeasurementType, InstrumentType
+from configs.resource_types import MeasurementType, InstrumentType, ExperimentConfig
 
 # Import experiment settings (edit these in configs/compute_settings.py)
 from configs import compute_settings as SETTINGS
@@ -93,7 +101,10 @@ class ComputeExperiment(ExperimentRunner):
     """
     
     def __init__(self, test_mode: bool = False, vdd: float = None, 
-                 vcc: float = None):
+                 vcc: float = None, addresses: Dict[InstrumentType, str] = None,
+                 bench_id: Optional[str] = None, partition: Tuple[int, int] = (0, 1),
+                 partition_by: str = "combinations", resume: Optional[str] = None,
+                 plan_engine: bool = False, config: ExperimentConfig = COMPUTE_CONFIG):
         """
         Initialize Compute experiment.
         
@@ -101,6 +112,20 @@ class ComputeExperiment(ExperimentRunner):
             test_mode: If True, log commands without hardware
             vdd: VDD voltage in volts (default: 1.8V)
             vcc: VCC voltage in volts (default: 5.0V)
+            addresses: Optional custom GPIB addresses (one bench)
+            bench_id: Optional bench name, added to log and CSV file names
+            partition: (index, count) - run only every count-th item starting
+                       at index, so count benches can share one run
+                       (see experiments/multi_bench.py)
+            partition_by: "combinations" (split each experiment's parameter
+                          combinations) or "experiments" (split the enabled
+                          experiment list)
+            resume: Optional run ID to continue from its last checkpoint
+            plan_engine: Run each experiment as a compiled MeasurementPlan
+                         (experiments/plan.py) instead of the hand-coded loop
+            config: Terminal configuration; experiments reusing the Compute
+                    hardware (run_kalman.py) pass a renamed copy so their
+                    logs, run ID and checkpoints get their own name
         
         Note:
             PPG voltage is controlled by state (ERASE=VCC, PROGRAM=0V).
@@ -112,7 +137,12 @@ class ComputeExperiment(ExperimentRunner):
             - Only current values change during measurement loops
             - All instruments are disabled ONCE at experiment end (in shutdown())
         """
-        super().__init__(COMPUTE_CONFIG, test_mode)
+        super().__init__(config, test_mode, addresses, bench_id, resume)
+        if partition_by not in ("combinations", "experiments"):
+            raise ValueError(f"partition_by must be 'combinations' or 'experiments', got {partition_by!r}")
+        self.partition = partition
+        self.partition_by = partition_by
+        self.plan_engine = plan_engine
         self.vdd = vdd if vdd is not None else COMPUTE_DEFAULTS["VDD"]
         self.vcc = vcc if vcc is not None else COMPUTE_DEFAULTS["VCC"]
         
@@ -138,6 +168,10 @@ class ComputeExperiment(ExperimentRunner):
         self._csv_file_latest = None
         self._csv_writer_latest = None
         self._csv_initialized = False
+        self.csv_path: Optional[str] = None
+        
+        # Settings fingerprint stored with checkpoints (see _settings_fingerprint)
+        self._fingerprint: Optional[str] = None
         
         # PPG state tracking (None = not initialized yet)
         self._current_ppg_state = None
@@ -191,15 +225,10 @@ class ComputeExperiment(ExperimentRunner):
         iv5270b = self._get_instrument(InstrumentType.IV5270B)
         iv4156b = self._get_instrument(InstrumentType.IV4156B)
         
-        # Get all used channels from terminal configs
-        used_5270b_channels = set()
-        used_4156b_channels = set()
-        
-        for terminal_name, terminal_cfg in COMPUTE_TERMINALS.items():
-            if terminal_cfg.instrument == InstrumentType.IV5270B:
-                used_5270b_channels.add(terminal_cfg.channel)
-            elif terminal_cfg.instrument == InstrumentType.IV4156B:
-                used_4156b_channels.add(terminal_cfg.channel)
+        # Get all used channels from the compiled terminal index
+        index = self.config_index
+        used_5270b_channels = set(index.channels_of(InstrumentType.IV5270B))
+        used_4156b_channels = set(index.channels_of(InstrumentType.IV4156B))
         
         # Enable all 5270B channels (1-8) - Channel 0 (GNDU) is automatically enabled
         all_5270b_channels = list(range(1, 9))  # Channels 1-8
@@ -216,8 +245,7 @@ class ComputeExperiment(ExperimentRunner):
             if ch == 0:
                 channel_info.append(f"CH0 (VSS/GNDU)")
             else:
-                term_name = next((name for name, cfg in COMPUTE_TERMINALS.items() 
-                                if cfg.instrument == InstrumentType.IV5270B and cfg.channel == ch), f"CH{ch}")
+                term_name = index.terminal_at(InstrumentType.IV5270B, ch, f"CH{ch}")
                 channel_info.append(f"CH{ch} ({term_name})")
         for ch in unused_5270b_channels:
             channel_info.append(f"CH{ch} (GNDU)")
@@ -237,8 +265,7 @@ class ComputeExperiment(ExperimentRunner):
         
         channel_info = []
         for ch in sorted(used_4156b_channels):
-            term_name = next((name for name, cfg in COMPUTE_TERMINALS.items() 
-                            if cfg.instrument == InstrumentType.IV4156B and cfg.channel == ch), f"CH{ch}")
+            term_name = index.terminal_at(InstrumentType.IV4156B, ch, f"CH{ch}")
             channel_info.append(f"CH{ch} ({term_name})")
         for ch in unused_4156b_channels:
             if ch <= 4:  # Only log SMU channels
@@ -253,6 +280,9 @@ class ComputeExperiment(ExperimentRunner):
         # Note: Measurement mode (MM) is set right before each measurement, not during initialization
         # This avoids redundant MM commands that are not used until measurements begin
         
+        # ADC / integration time / fixed ranges from COMPUTE_MEASUREMENT_PROFILES
+        self.apply_measurement_profiles()
+        
         self._channels_initialized = True
         self.logger.info("All channels initialized")
         
@@ -416,6 +446,9 @@ class ComputeExperiment(ExperimentRunner):
     # All current source terminal names (for voltage measurement column ordering)
     _ALL_CURRENT_SOURCES = ["IMEAS", "X1", "X2", "TRIM1", "TRIM2", "F11", "F12",
                             "KGAIN1", "KGAIN2", "IREFP"]
+    # Spot measurement plans (MM channel order): OUT1 current, then source voltages
+    _5270B_MM_TERMINALS = ("OUT1",) + tuple(_5270B_CURRENT_SOURCES)
+    _4156B_MM_TERMINALS = tuple(_4156B_CURRENT_SOURCES)
 
     @staticmethod
     def _remove_3letter_prefix(value: str) -> str:
@@ -461,7 +494,6 @@ class ComputeExperiment(ExperimentRunner):
         # Get terminal configs (for channel numbers and terminal names)
         x1_cfg = self.get_terminal_config("X1")
         imeas_cfg = self.get_terminal_config("IMEAS")
-        out1_cfg = self.get_terminal_config("OUT1")
         
         # If IMEAS value not specified, use same as X1
         if imeas_value is None:
@@ -480,11 +512,11 @@ class ComputeExperiment(ExperimentRunner):
         self.logger.debug(f"IMEAS ({imeas_cfg.terminal}, CH{imeas_cfg.channel}): Set to {imeas_value}A (Vcomp={imeas_compliance}V)")
         
         # --- 5270B spot measurement: OUT1 current + voltages on current sources ---
-        # Build channel list: OUT1 first (measures current), then current sources (measure voltage)
-        channels_5270b = [out1_cfg.channel]
-        for term_name in self._5270B_CURRENT_SOURCES:
-            cfg = self.get_terminal_config(term_name)
-            channels_5270b.append(cfg.channel)
+        # Channel list: OUT1 first (measures current), then current sources (measure voltage)
+        channels_5270b = list(self.config_index.channels(self._5270B_MM_TERMINALS))
+        
+        # OUT1 current range predicted from previous points (OUT1 follows X1)
+        self.prepare_measurement_range("OUT1", expected=x1_value)
         
         inst_5270b.set_measurement_mode(1, channels_5270b)
         self.logger.debug(f"5270B MM 1 on channels {channels_5270b} (OUT1 + current source voltages)")
@@ -492,12 +524,14 @@ class ComputeExperiment(ExperimentRunner):
         inst_5270b.execute_measurement()
         data_5270b = inst_5270b.read_data()
         self.logger.debug(f"5270B raw data: {data_5270b}")
+        if self.check_range_overflow("OUT1", data_5270b):
+            # Predicted range overflowed: measure again in auto range
+            inst_5270b.execute_measurement()
+            data_5270b = inst_5270b.read_data()
+            self.logger.debug(f"5270B raw data (auto range): {data_5270b}")
         
         # --- 4156B spot measurement: voltages on current sources ---
-        channels_4156b = []
-        for term_name in self._4156B_CURRENT_SOURCES:
-            cfg = self.get_terminal_config(term_name)
-            channels_4156b.append(cfg.channel)
+        channels_4156b = list(self.config_index.channels(self._4156B_MM_TERMINALS))
         
         inst_4156b.set_measurement_mode(1, channels_4156b)
         self.logger.debug(f"4156B MM 1 on channels {channels_4156b} (current source voltages)")
@@ -558,6 +592,8 @@ class ComputeExperiment(ExperimentRunner):
         except (IndexError, ValueError) as e:
             self.logger.warning(f"Error parsing 4156B spot measurement data: {e}, data={data_4156b}")
         
+        self.note_measurement("OUT1", results["OUT1_current"])
+        
         self.logger.info(f"Spot measurement complete: OUT1={results['OUT1_current']}A, "
                         f"voltages: " + ", ".join(f"v{t}={results[f'v{t}']}V" for t in self._ALL_CURRENT_SOURCES))
         
@@ -705,19 +741,38 @@ class ComputeExperiment(ExperimentRunner):
         )
         os.makedirs(measurements_dir, exist_ok=True)
         
-        # Generate CSV filename with timestamp
+        # Generate CSV filename with timestamp (and bench, if any)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        prefix = f"compute_{self.bench_id}" if self.bench_id else "compute"
         csv_filename = os.path.join(
             measurements_dir,
-            f"compute_{timestamp}.csv"
+            f"{prefix}_{timestamp}.csv"
         )
         
         # Generate CSV filename without timestamp (overwrites each run)
         csv_filename_latest = os.path.join(
             measurements_dir,
-            "compute.csv"
+            f"{prefix}.csv"
         )
         
+        # The settings are checked before the checkpointed CSV is truncated
+        checkpoint = self.resume_checkpoint(settings=self._settings_fingerprint())
+        if checkpoint is not None:
+            # Resuming: continue the checkpointed CSV from its last committed
+            # row; the latest file is rebuilt from it
+            saved = checkpoint["outputs"]["csv"]
+            csv_filename = saved["path"]
+            self._csv_file = reopen_output(csv_filename, saved["offset"])
+            shutil.copyfile(csv_filename, csv_filename_latest)
+            self._csv_file_latest = open(csv_filename_latest, 'a', newline='', encoding='utf-8')
+            self._csv_writer = csv.writer(self._csv_file)
+            self._csv_writer_latest = csv.writer(self._csv_file_latest)
+            self.csv_path = csv_filename
+            self._csv_initialized = True
+            self.logger.info(f"CSV output resumed: {csv_filename}")
+            return
+        self.csv_path = csv_filename
+        
         # Open CSV files for writing
         self._csv_file = open(csv_filename, 'w', newline='', encoding='utf-8')
         self._csv_writer = csv.writer(self._csv_file)
@@ -751,6 +806,10 @@ class ComputeExperiment(ExperimentRunner):
         
         self._csv_initialized = True
         self.logger.info(f"CSV output initialized: {csv_filename}")
+        
+        # Initial checkpoint: a run that dies before its first row can be
+        # resumed into the same file
+        self._commit_compute_checkpoint(None)
         self.logger.info(f"CSV latest file: {csv_filename_latest}")
     
     def _write_measurement_row(self, experiment_name: str, ppg_state: str, ppg_voltage: float,
@@ -824,6 +883,84 @@ class ComputeExperiment(ExperimentRunner):
         self._csv_writer_latest.writerow(row)
         self._csv_file_latest.flush()
     
+    def _record_measurement(self, position: Dict[str, Any], exp_name: str, ppg_voltage: float,
+                            current_combo: Dict[str, float], spot_results: Dict[str, Any],
+                            exp_results: Dict[str, Any], results: Dict[str, Any],
+                            check_errors: bool = False) -> None:
+        """
+        Write a measured point to the CSV, checkpoint it and add it to the results.
+        
+        Shared by the hand-coded loop and the plan engine.
+        
+        Args:
+            position: Loop position of the point (experiment/combination/PPG/X1
+                      indices, PPG state, measurement number), saved in the checkpoint
+            exp_name: Name of the experiment
+            ppg_voltage: PPG voltage in volts
+            current_combo: Fixed current values of the combination (actual currents)
+            spot_results: Output of execute_spot_measurement()
+            exp_results: Results of the experiment (measurements appended)
+            results: Results of the run (measurements appended)
+            check_errors: Check all instruments for errors afterwards (first measurement)
+        """
+        ppg_state = position["ppg_state"]
+        
+        # Get measured current from spot measurement (OUT1 only)
+        out1_current = spot_results["OUT1_current"]
+        
+        # Extract voltage measurements on current sources
+        voltage_measurements = {
+            k: v for k, v in spot_results.items() if k.startswith("v")
+        }
+        
+        # In test mode, use dummy measurement data but keep correct voltage/current settings
+        if self.test_mode:
+            out1_current = 1e-12  # Dummy measurement
+            voltage_measurements = {f"v{t}": 0.0 for t in self._ALL_CURRENT_SOURCES}
+        
+        # Write row to CSV (include experiment name)
+        self._write_measurement_row(
+            experiment_name=exp_name,
+            ppg_state=ppg_state,
+            ppg_voltage=ppg_voltage,
+            fixed_currents=current_combo,
+            x1_value=spot_results["x1_value"],
+            imeas_value=spot_results["imeas_value"],
+            out1_current=out1_current,
+            voltage_measurements=voltage_measurements,
+        )
+        self._commit_compute_checkpoint(position)
+        
+        # Store results
+        measurement = {
+            "experiment_name": exp_name,
+            "combination_index": position["combination_index"],
+            "x1_index": position["x1_index"],
+            "x1_value": spot_results["x1_value"],
+            "imeas_value": spot_results["imeas_value"],
+            "ppg_state": ppg_state,
+            "ppg_voltage": ppg_voltage,
+            "parameters": current_combo.copy(),
+            "spot_results": spot_results,
+        }
+        exp_results["measurements"].append(measurement)
+        results["measurements"][exp_name] = results["measurements"].get(exp_name, [])
+        results["measurements"][exp_name].append(measurement)
+        mark_point(f"{exp_name}#{len(exp_results['measurements'])}")
+        
+        # Check for errors after first measurement
+        if check_errors:
+            self.logger.info("Checking for errors after first measurement...")
+            errors = self.check_all_instrument_errors()
+            self.report_and_exit_on_errors(errors)
+    
+    def _finish_experiment(self, exp_results: Dict[str, Any], results: Dict[str, Any]) -> None:
+        """Add a finished experiment to the run results and log its measurement count."""
+        results["experiments_run"].append(exp_results)
+        self.logger.info("=" * 60)
+        self.logger.info(f"Experiment '{exp_results['name']}' complete: {len(exp_results['measurements'])} measurements")
+        self.logger.info("=" * 60)
+    
     def _close_csv_output(self) -> None:
         """Close CSV output files."""
         if self._csv_file:
@@ -839,6 +976,177 @@ class ComputeExperiment(ExperimentRunner):
         if self._csv_initialized:
             self.logger.info("CSV output files closed")
     
+    # ========================================================================
+    # Checkpoints
+    # ========================================================================
+    
+    def _settings_fingerprint(self) -> str:
+        """Hash of the settings that define the loop positions of a run (cached)."""
+        if self._fingerprint is not None:
+            return self._fingerprint
+        settings = {
+            "experiments": [exp for exp in SETTINGS.EXPERIMENTS if exp.get("enabled", False)],
+            "vdd": self.vdd,
+            "vcc": self.vcc,
+            "partition": list(self.partition),
+            "partition_by": self.partition_by,
+        }
+        encoded = json.dumps(settings, sort_keys=True, default=str)
+        self._fingerprint = hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+        return self._fingerprint
+    
+    def _commit_compute_checkpoint(self, position: Optional[Dict[str, Any]],
+                                   complete: bool = False) -> None:
+        """Checkpoint the loop position after a CSV row has been flushed."""
+        self.commit_checkpoint(position, {"csv": self._csv_file}, complete=complete,
+                               settings=self._settings_fingerprint())
+    
+    def _resume_point(self) -> Optional[Tuple[int, int, int, int]]:
+        """
+        (experiment, combination, PPG state, X1) indices of the last row
+        committed by the resumed run, or None when starting from scratch.
+        """
+        checkpoint = self.resume_checkpoint(settings=self._settings_fingerprint())
+        if checkpoint is None or checkpoint.get("position") is None:
+            return None
+        p = checkpoint["position"]
+        return (p["experiment_index"], p["combination_index"], p["ppg_index"], p["x1_index"])
+    
+    # ========================================================================
+    # Multi-Bench Partitioning
+    # ========================================================================
+    
+    def _partition_indices(self, count: int, by: str) -> List[int]:
+        """
+        Indices of the items (out of count) this runner measures.
+        
+        Items are dealt round-robin across benches when partitioning by
+        `by`; otherwise all indices are returned.
+        """
+        index, benches = self.partition
+        if by != self.partition_by or benches <= 1:
+            return list(range(count))
+        return list(range(index, count, benches))
+    
+    # ========================================================================
+    # Plan Engine
+    # ========================================================================
+    
+    def build_experiment_plan(self, experiment: Dict[str, Any], combinations: List[Dict[str, Any]],
+                              combo_indices: List[int], x1_list: List[float]) -> MeasurementPlan:
+        """
+        Describe one experiment as a MeasurementPlan.
+        
+        Points are ordered as in the hand-coded loop: combination, PPG state,
+        X1. The combination axis carries every (combination, PPG state) pair
+        labelled (combo_idx, ppg_idx, ppg_state); X1 is its own axis unless
+        it is swept in the combinations.
+        
+        Args:
+            experiment: Experiment dictionary from compute_settings.EXPERIMENTS
+            combinations: Output of generate_experiment_combinations()
+            combo_indices: Combinations run on this bench
+            x1_list: Normalized X1 values (used when X1 is not swept)
+        """
+        sweep_vars = experiment.get("sweep_variables", [])
+        default_states = experiment.get("fixed_values", {}).get("ERASE_PROG", ["ERASE", "PROGRAM"])
+        
+        params = tuple(k for k in combinations[0] if k != "ERASE_PROG") + ("ERASE_PROG",)
+        combo_values, combo_labels = [], []
+        for combo_idx in combo_indices:
+            combo = combinations[combo_idx]
+            states = combo.get("ERASE_PROG", default_states) if "ERASE_PROG" in sweep_vars else default_states
+            if not isinstance(states, list):
+                states = [states]
+            for ppg_idx, state in enumerate(states):
+                combo_values.append(tuple(combo.get(k) for k in params[:-1]) + (state,))
+                combo_labels.append((combo_idx, ppg_idx, state))
+        axes = [Axis(params, combo_values, combo_labels)]
+        fixed = {}
+        if "X1" not in params:
+            axes.append(Axis.single("X1", x1_list))
+        if "IMEAS" not in params:
+            fixed["IMEAS"] = None  # Same as X1
+        
+        def convert(name: str, value: Any, point: Dict[str, Any]) -> Any:
+            if name == "ERASE_PROG":
+                return value
+            if name == "IMEAS" and value is None:
+                name, value = "X1", point["X1"]
+            return self.convert_normalized_to_current(name, value, point.get("IREFP", 100e-9))
+        
+        fixed_sources = [k for k in params if k not in ("ERASE_PROG", "IMEAS", "X1")]
+        return MeasurementPlan(
+            name=experiment.get("name", "Compute"),
+            axes=axes,
+            fixed=fixed,
+            measure=self._5270B_MM_TERMINALS + self._4156B_MM_TERMINALS,
+            convert=convert,
+            linked={k: tuple(v["terminals"]) for k, v in COMPUTE_LINKED_PARAMETERS.items()},
+            setters={"ERASE_PROG": self.set_ppg_state},
+            compliance=lambda current: 0.1 if current > 0 else CURRENT_SOURCE_COMPLIANCE,
+            settle={k: 0.1 for k in fixed_sources},
+            settle_first=1.0,
+            range_hints={"OUT1": "X1"},
+        )
+    
+    def _run_experiment_plan(self, exp_idx: int, experiment: Dict[str, Any],
+                             combinations: List[Dict[str, Any]], combo_indices: List[int],
+                             x1_list: List[float], resume_point: Optional[Tuple[int, int, int, int]],
+                             measurement_num: int, first_measurement_num: int,
+                             last_position: Optional[Dict[str, Any]], exp_results: Dict[str, Any],
+                             results: Dict[str, Any]) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """
+        Run one experiment through the plan engine.
+        
+        Writes the same CSV rows and checkpoints as the hand-coded loop.
+        
+        Returns:
+            (measurement_num, last_position) after the experiment
+        """
+        exp_name = experiment.get("name", f"Experiment_{exp_idx+1}")
+        plan = self.build_experiment_plan(experiment, combinations, combo_indices, x1_list)
+        
+        def position(labels: Tuple[Any, ...]) -> Tuple[int, int, int, int]:
+            combo_idx, ppg_idx, _ = labels[0]
+            return (exp_idx, combo_idx, ppg_idx, labels[1] if len(labels) > 1 else 0)
+        
+        skip = None
+        if resume_point is not None:
+            skip = lambda labels: position(labels) <= resume_point
+        compiled = compile_plan(plan, self, skip=skip)
+        
+        def on_point(step, readings: Dict[str, Optional[float]]) -> None:
+            nonlocal measurement_num, last_position
+            measurement_num += 1
+            _, combo_idx, ppg_idx, x1_idx = position(step.labels)
+            ppg_state = step.values["ERASE_PROG"]
+            x1_value = step.values["X1"]
+            imeas_value = step.values["IMEAS"]
+            current_combo = {k: v for k, v in step.values.items()
+                             if k not in ("ERASE_PROG", "IMEAS", "X1")}
+            self.logger.info(f"[{measurement_num}] Experiment '{exp_name}' - "
+                             f"PPG: {ppg_state}, X1: {x1_value}A, IMEAS: {imeas_value}A")
+            
+            spot_results = {"x1_value": x1_value, "imeas_value": imeas_value,
+                            "OUT1_current": readings.get("OUT1") or 0.0}
+            for term_name in self._ALL_CURRENT_SOURCES:
+                spot_results[f"v{term_name}"] = readings.get(term_name) or 0.0
+            last_position = {
+                "experiment_index": exp_idx,
+                "combination_index": combo_idx,
+                "ppg_index": ppg_idx,
+                "ppg_state": ppg_state,
+                "x1_index": x1_idx,
+                "measurement_num": measurement_num,
+            }
+            self._record_measurement(last_position, exp_name, self.get_ppg_state_voltage(ppg_state),
+                                     current_combo, spot_results, exp_results, results,
+                                     check_errors=measurement_num == first_measurement_num)
+        
+        PlanEngine(self).execute(compiled, plan, on_point)
+        return measurement_num, last_position
+    
     # ========================================================================
     # Main Experiment Execution
     # ========================================================================
@@ -880,6 +1188,11 @@ class ComputeExperiment(ExperimentRunner):
         # Get enabled experiments from settings
         all_experiments = SETTINGS.EXPERIMENTS
         enabled_experiments = [exp for exp in all_experiments if exp.get("enabled", False)]
+        enabled_experiments = [enabled_experiments[i] for i in
+                               self._partition_indices(len(enabled_experiments), "experiments")]
+        if self.partition[1] > 1:
+            self.logger.info(f"Bench partition {self.partition[0] + 1}/{self.partition[1]} "
+                             f"(by {self.partition_by})")
         
         if not enabled_experiments:
             self.logger.warning("No enabled experiments found! Check experiment enable flags in compute_settings.py")
@@ -939,8 +1252,20 @@ class ComputeExperiment(ExperimentRunner):
         
         measurement_num = 0
         
+        # When resuming, every point up to and including resume_point was
+        # already measured and committed to the CSV
+        resume_point = self._resume_point()
+        if resume_point is not None:
+            measurement_num = self.resume_state["position"]["measurement_num"]
+            self.logger.info(f"Resuming after measurement {measurement_num} "
+                             f"(experiment {resume_point[0]+1}, combination {resume_point[1]+1})")
+        first_measurement_num = measurement_num + 1
+        last_position = self.resume_state["position"] if resume_point is not None else None
+        
         # For each enabled experiment
         for exp_idx, experiment in enumerate(enabled_experiments):
+            if resume_point is not None and exp_idx < resume_point[0]:
+                continue
             exp_name = experiment.get("name", f"Experiment_{exp_idx+1}")
             
             self.logger.info("=" * 60)
@@ -949,6 +1274,7 @@ class ComputeExperiment(ExperimentRunner):
             
             # Generate all parameter combinations for this experiment
             combinations = self.generate_experiment_combinations(experiment)
+            combo_indices = self._partition_indices(len(combinations), "combinations")
             
             # Get sweep variables
             sweep_vars = experiment.get("sweep_variables", [])
@@ -991,25 +1317,36 @@ class ComputeExperiment(ExperimentRunner):
             # Calculate total measurements for this experiment (rough estimate)
             if erases_prog_swept:
                 # Will iterate per combo, so can't pre-calculate easily
-                total_exp_measurements_estimate = len(combinations) * len(x1_list) * 2  # Estimate 2 PPG states
+                total_exp_measurements_estimate = len(combo_indices) * len(x1_list) * 2  # Estimate 2 PPG states
             else:
-                total_exp_measurements_estimate = len(combinations) * len(erases_prog_list) * len(x1_list)
+                total_exp_measurements_estimate = len(combo_indices) * len(erases_prog_list) * len(x1_list)
             
-            self.logger.info(f"Experiment '{exp_name}': {len(combinations)} combinations x "
+            self.logger.info(f"Experiment '{exp_name}': {len(combo_indices)} combinations x "
                            f"{len(x1_list)} X1 values = ~{total_exp_measurements_estimate} measurements")
             
             exp_results = {
                 "name": exp_name,
-                "combinations": len(combinations),
+                "combinations": len(combo_indices),
                 "measurements": [],
             }
             
+            if self.plan_engine:
+                # Declarative plan: compiled schedule run by the shared engine
+                measurement_num, last_position = self._run_experiment_plan(
+                    exp_idx, experiment, combinations, combo_indices, x1_list, resume_point,
+                    measurement_num, first_measurement_num, last_position, exp_results, results)
+                self._finish_experiment(exp_results, results)
+                continue
+            
             # Track previous current values to only update changed sources
             prev_current_combo = None
             is_first_iteration_of_experiment = True
             
             # For each parameter combination
-            for combo_idx, combo in enumerate(combinations):
+            for combo_idx in combo_indices:
+                if resume_point is not None and (exp_idx, combo_idx) < resume_point[:2]:
+                    continue
+                combo = combinations[combo_idx]
                 self.logger.info("-" * 60)
                 self.logger.info(f"Experiment '{exp_name}' - Combination {combo_idx+1}/{len(combinations)}")
                 self.logger.info(f"Normalized parameters: {combo}")
@@ -1073,7 +1410,9 @@ class ComputeExperiment(ExperimentRunner):
                 prev_current_combo = current_combo.copy()
                 
                 # For each PPG state in this combination
-                for ppg_state in combo_ppg_states:
+                for ppg_idx, ppg_state in enumerate(combo_ppg_states):
+                    if resume_point is not None and (exp_idx, combo_idx, ppg_idx) < resume_point[:3]:
+                        continue
                     self.logger.info("-" * 40)
                     self.logger.info(f"PPG STATE: {ppg_state} ({COMPUTE_PPG_STATES.get(ppg_state, {}).get('description', 'Unknown')})")
                     
@@ -1083,6 +1422,8 @@ class ComputeExperiment(ExperimentRunner):
                     
                     # For each X1 value
                     for x1_idx, x1_value in enumerate(combo_x1_list):
+                        if resume_point is not None and (exp_idx, combo_idx, ppg_idx, x1_idx) <= resume_point:
+                            continue
                         measurement_num += 1
                         self.logger.info("-" * 30)
                         self.logger.info(f"[{measurement_num}] Experiment '{exp_name}' - "
@@ -1103,59 +1444,23 @@ class ComputeExperiment(ExperimentRunner):
                         # Execute spot measurement for this X1/IMEAS value
                         spot_results = self.execute_spot_measurement(x1_value, imeas_value=imeas_value)
                         
-                        # Get measured current from spot measurement (OUT1 only)
-                        out1_current = spot_results["OUT1_current"]
-                        
-                        # Extract voltage measurements on current sources
-                        voltage_measurements = {
-                            k: v for k, v in spot_results.items() if k.startswith("v")
-                        }
-                        
-                        # In test mode, use dummy measurement data but keep correct voltage/current settings
-                        if self.test_mode:
-                            out1_current = 1e-12  # Dummy measurement
-                            voltage_measurements = {f"v{t}": 0.0 for t in self._ALL_CURRENT_SOURCES}
-                        
-                        # Write row to CSV (include experiment name)
-                        self._write_measurement_row(
-                            experiment_name=exp_name,
-                            ppg_state=ppg_state,
-                            ppg_voltage=ppg_voltage,
-                            fixed_currents=current_combo,
-                            x1_value=spot_results["x1_value"],
-                            imeas_value=spot_results["imeas_value"],
-                            out1_current=out1_current,
-                            voltage_measurements=voltage_measurements,
-                        )
-                        
-                        # Store results
-                        measurement = {
-                            "experiment_name": exp_name,
+                        # Write the CSV row, checkpoint and store results
+                        last_position = {
+                            "experiment_index": exp_idx,
                             "combination_index": combo_idx,
-                            "x1_index": x1_idx,
-                            "x1_value": x1_value,
-                            "imeas_value": spot_results["imeas_value"],
+                            "ppg_index": ppg_idx,
                             "ppg_state": ppg_state,
-                            "ppg_voltage": ppg_voltage,
-                            "parameters": current_combo.copy(),
-                            "spot_results": spot_results,
+                            "x1_index": x1_idx,
+                            "measurement_num": measurement_num,
                         }
-                        exp_results["measurements"].append(measurement)
-                        results["measurements"][exp_name] = results["measurements"].get(exp_name, [])
-                        results["measurements"][exp_name].append(measurement)
-                        
-                        # Check for errors after first measurement
-                        if measurement_num == 1:
-                            self.logger.info("Checking for errors after first measurement...")
-                            errors = self.check_all_instrument_errors()
-                            self.report_and_exit_on_errors(errors)
+                        self._record_measurement(last_position, exp_name, ppg_voltage, current_combo,
+                                                 spot_results, exp_results, results,
+                                                 check_errors=measurement_num == first_measurement_num)
             
-            results["experiments_run"].append(exp_results)
-            self.logger.info("=" * 60)
-            self.logger.info(f"Experiment '{exp_name}' complete: {len(exp_results['measurements'])} measurements")
-            self.logger.info("=" * 60)
+            self._finish_experiment(exp_results, results)
         
         results["total_measurements"] = measurement_num
+        self._commit_compute_checkpoint(last_position, complete=True)
         
         self.logger.info("=" * 60)
         self.logger.info("All experiments complete")
@@ -1252,6 +1557,16 @@ def main():
         default=SETTINGS.VCC,
         help=f'VCC voltage in volts (default: {SETTINGS.VCC})'
     )
+    parser.add_argument(
+        '--resume',
+        metavar='RUN_ID',
+        help='Continue an interrupted run from its last checkpoint (logs/checkpoints/RUN_ID.json)'
+    )
+    parser.add_argument(
+        '--plan-engine',
+        action='store_true',
+        help='Run experiments as compiled measurement plans (batched, deduplicated commands)'
+    )
     args = parser.parse_args()
     
     # Create experiment instance
@@ -1265,6 +1580,8 @@ def main():
         test_mode=args.test,
         vdd=args.vdd,
         vcc=args.vcc,
+        resume=args.resume,
+        plan_engine=args.plan_engine,
     ) as experiment:
         
         # Experiments are now defined in configs/compute_settings.py
@@ -0,0 +1,508 @@
+# -*- coding: utf-8 -*-
+"""
+Run Index
+=========
+
+Persistent SQLite index of experiment runs and their files, so archive,
+search and analysis tools look runs up instead of walking logs/ and
+measurements/ and reading every archive zip.
+
+logs/run_index.sqlite holds:
+- runs:     run ID, experiment, timestamp, bench, TEST_MODE, settings hash
+            (the checkpoint fingerprint), status, start/end time
+- files:    every file of a run (role, size, mtime, data rows for CSVs), on
+            disk or as a member of an archive/*.zip
+- stats:    count/min/max/mean of each numeric column of a CSV
+- archives: zips already indexed (size/mtime), so they are read only once
+
+ExperimentRunner.shutdown() records its run (record_run). scan() picks up
+files written outside a runner (older runs, crashed runs, new archives)
+incrementally: unchanged files and zips are skipped by size and mtime, and
+rows of deleted files are dropped. It still walks every directory, so
+lookups do not scan; run it on request (run_index scan, --rescan).
+
+Usage:
+    with RunIndex() as index:
+        for f in index.files(pattern="20251219_1231"):
+            print(f.run_id, f.role, f.location)
+        latest = index.latest("Compute", role="csv")
+
+    python -m experiments.run_index scan
+    python -m experiments.run_index runs [--experiment Compute]
+    python -m experiments.run_index files PATTERN
+    python -m experiments.run_index stats PATTERN
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import logging
+import os
+import re
+import sqlite3
+import sys
+import zipfile
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from instruments.base import LOG_DIR, MEASUREMENTS_DIR
+
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARCHIVE_DIR = os.path.join(REPO_ROOT, "archive")
+INDEX_PATH = os.path.join(LOG_DIR, "run_index.sqlite")
+
+# Experiment name -> file name prefix (logs/<prefix>_<timestamp>.log, ...)
+SHORT_NAMES = {
+    "Compute": "compute",
+    "Kalman": "kalman",
+    "Programmer": "prog",
+    "Sonos": "sonos",
+    "BigKalman": "big_kalman",
+    "VoltageMeasurement": "voltage",
+}
+_EXPERIMENTS_BY_PREFIX = {prefix: name for name, prefix in SHORT_NAMES.items()}
+# Output files not named after their runner's prefix
+_EXPERIMENTS_BY_PREFIX["current_source_voltages"] = "VoltageMeasurement"
+
+# <prefix>[_inst|_cmd]_<YYYYMMDD_HHMMSS>...
+_RUN_FILE = re.compile(r"^(?P<prefix>.+?)_(?:(?:inst|cmd)_)?(?P<stamp>\d{8}_\d{6})")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id        TEXT PRIMARY KEY,
+    experiment    TEXT,
+    stamp         TEXT,
+    bench         TEXT,
+    test_mode     INTEGER,
+    settings_hash TEXT,
+    status        TEXT,
+    started       TEXT,
+    finished      TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_experiment ON runs (experiment, stamp);
+CREATE TABLE IF NOT EXISTS files (
+    id       INTEGER PRIMARY KEY,
+    run_id   TEXT,
+    role     TEXT,
+    name     TEXT,
+    path     TEXT,
+    member   TEXT NOT NULL DEFAULT '',
+    size     INTEGER,
+    mtime_ns INTEGER,
+    rows     INTEGER,
+    UNIQUE (path, member)
+);
+CREATE INDEX IF NOT EXISTS files_run ON files (run_id);
+CREATE INDEX IF NOT EXISTS files_name ON files (name);
+CREATE TABLE IF NOT EXISTS stats (
+    file_id INTEGER,
+    column  TEXT,
+    count   INTEGER,
+    min     REAL,
+    max     REAL,
+    mean    REAL,
+    PRIMARY KEY (file_id, column)
+);
+CREATE TABLE IF NOT EXISTS archives (
+    path     TEXT PRIMARY KEY,
+    size     INTEGER,
+    mtime_ns INTEGER
+);
+"""
+
+
+class IndexedFile(NamedTuple):
+    """One indexed file."""
+    id: int
+    run_id: str
+    role: str
+    name: str
+    path: str                # Absolute path of the file, or of the zip holding it
+    member: Optional[str]    # Zip member name, None for files on disk
+    size: int
+    rows: Optional[int]      # Data rows (CSV files)
+
+    @property
+    def location(self) -> str:
+        return f"{self.path}:{self.member}" if self.member else self.path
+
+
+class IndexedRun(NamedTuple):
+    """One indexed run."""
+    run_id: str
+    experiment: Optional[str]
+    stamp: Optional[str]
+    bench: Optional[str]
+    test_mode: Optional[bool]
+    settings_hash: Optional[str]
+    status: Optional[str]
+    started: Optional[str]
+    finished: Optional[str]
+
+
+def _relpath(path: str) -> str:
+    """Path as stored: relative to the repository when inside it."""
+    path = os.path.abspath(path)
+    rel = os.path.relpath(path, REPO_ROOT)
+    return path if rel.startswith("..") else rel.replace(os.sep, "/")
+
+
+def _abspath(path: str) -> str:
+    return path if os.path.isabs(path) else os.path.join(REPO_ROOT, *path.split("/"))
+
+
+def classify(name: str) -> Tuple[Optional[str], Optional[str], str]:
+    """(run ID, experiment, role) guessed from a file name (run ID None if it has no timestamp)."""
+    base = os.path.basename(name)
+    ext = os.path.splitext(base)[1].lower()
+    role = {".log": "log", ".kcl": "command_log", ".kcs": "command_log", ".kci": "command_log",
+            ".klrec": "recording", ".csv": "csv", ".kls": "samples", ".idx": "samples",
+            ".json": "checkpoint", ".txt": "commands"}.get(ext, "other")
+    match = _RUN_FILE.match(base)
+    if match is None:
+        return None, None, role
+    prefix, stamp = match.group("prefix"), match.group("stamp")
+    experiment = prefix
+    for short in sorted(_EXPERIMENTS_BY_PREFIX, key=len, reverse=True):
+        if prefix == short or prefix.startswith(short + "_"):
+            experiment = _EXPERIMENTS_BY_PREFIX[short]
+            break
+    return f"{prefix}_{stamp}", experiment, role
+
+
+def summarize_csv(f) -> Tuple[int, Dict[str, Tuple[int, float, float, float]]]:
+    """
+    (data rows, {column: (count, min, max, mean)}) of a CSV text stream;
+    only values that parse as numbers are counted.
+    """
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return 0, {}
+    n = len(header)
+    count = [0] * n
+    total = [0.0] * n
+    low = [float("inf")] * n
+    high = [float("-inf")] * n
+    rows = 0
+    for row in reader:
+        if not row:
+            continue
+        rows += 1
+        for i, text in enumerate(row[:n]):
+            try:
+                value = float(text)
+            except ValueError:
+                continue
+            if value != value:  # NaN
+                continue
+            count[i] += 1
+            total[i] += value
+            if value < low[i]:
+                low[i] = value
+            if value > high[i]:
+                high[i] = value
+    stats = {header[i]: (count[i], low[i], high[i], total[i] / count[i])
+             for i in range(n) if count[i]}
+    return rows, stats
+
+
+class RunIndex:
+    """
+    The run index database.
+
+    Args:
+        path: SQLite file (default: logs/run_index.sqlite); created if missing.
+    """
+
+    def __init__(self, path: str = INDEX_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    # ------------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------------
+
+    def _ensure_run(self, run_id: str, experiment: Optional[str]) -> None:
+        match = re.search(r"\d{8}_\d{6}", run_id)
+        self.db.execute("INSERT OR IGNORE INTO runs (run_id, experiment, stamp) VALUES (?, ?, ?)",
+                        (run_id, experiment, match.group(0) if match else None))
+
+    def _store_file(self, run_id: Optional[str], role: str, name: str, path: str, member: str,
+                    size: int, mtime_ns: int, summary=None) -> None:
+        """Insert or replace one file row (and its stats)."""
+        self._drop_file(path, member)
+        rows, stats = summary if summary is not None else (None, {})
+        cur = self.db.execute(
+            "INSERT INTO files (run_id, role, name, path, member, size, mtime_ns, rows) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (run_id, role, name, path, member, size, mtime_ns, rows))
+        self.db.executemany(
+            "INSERT INTO stats (file_id, column, count, min, max, mean) VALUES (?, ?, ?, ?, ?, ?)",
+            [(cur.lastrowid, column, *values) for column, values in stats.items()])
+
+    def _drop_file(self, path: str, member: str) -> None:
+        for (file_id,) in self.db.execute("SELECT id FROM files WHERE path = ? AND member = ?",
+                                          (path, member)).fetchall():
+            self.db.execute("DELETE FROM stats WHERE file_id = ?", (file_id,))
+            self.db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def _index_file(self, path: str, run_id: Optional[str] = None, role: Optional[str] = None) -> bool:
+        """
+        Index a file on disk; False if it is unchanged since it was indexed.
+
+        Without run_id/role (scan), a file already recorded by a runner keeps
+        its run ID and role; a new one gets them from its name (classify).
+        """
+        st = os.stat(path)
+        stored = _relpath(path)
+        row = self.db.execute("SELECT size, mtime_ns, run_id, role FROM files WHERE path = ? AND member = ''",
+                              (stored,)).fetchone()
+        if row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns \
+                and (run_id is None or (row[2], row[3]) == (run_id, role)):
+            return False
+        guessed_run, experiment, guessed_role = classify(path)
+        if run_id is None and row is not None and row[2]:
+            run_id, role = row[2], row[3]
+        run_id = run_id or guessed_run
+        if run_id:
+            self._ensure_run(run_id, experiment)
+        summary = None
+        if path.lower().endswith(".csv"):
+            with open(path, newline="", encoding="utf-8", errors="replace") as f:
+                summary = summarize_csv(f)
+        self._store_file(run_id, role or guessed_role, os.path.basename(path), stored, "",
+                         st.st_size, st.st_mtime_ns, summary)
+        return True
+
+    def record_run(self, run_id: str, experiment: str, files: Dict[str, str],
+                   settings_hash: Optional[str] = None, bench: Optional[str] = None,
+                   test_mode: bool = False, status: Optional[str] = None,
+                   started: Optional[str] = None) -> None:
+        """
+        Record a run and its files (called by ExperimentRunner.shutdown()).
+
+        Args:
+            run_id: Run ID
+            experiment: Experiment name (ExperimentConfig.name)
+            files: Path -> role of the run's files; missing files are skipped
+            settings_hash: Settings fingerprint (checkpoint "settings")
+            bench: Bench ID
+            test_mode: Whether the run was in TEST_MODE
+            status: "complete", "incomplete" or None if unknown
+            started: Start time (ISO)
+        """
+        match = re.search(r"\d{8}_\d{6}", run_id)
+        with self.db:
+            self.db.execute(
+                "INSERT INTO runs (run_id, experiment, stamp, bench, test_mode, settings_hash, status, started, finished) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (run_id) DO UPDATE SET experiment = excluded.experiment, bench = excluded.bench, "
+                "test_mode = excluded.test_mode, settings_hash = COALESCE(excluded.settings_hash, settings_hash), "
+                "status = excluded.status, started = COALESCE(started, excluded.started), finished = excluded.finished",
+                (run_id, experiment, match.group(0) if match else None, bench, int(test_mode),
+                 settings_hash, status, started, datetime.now().isoformat(timespec="seconds")))
+            for path, role in files.items():
+                if os.path.isfile(path):
+                    self._index_file(path, run_id, role)
+
+    def record_archive(self, zip_path: str, force: bool = False) -> int:
+        """
+        Index the members of an archive zip (CSV members are summarized).
+
+        Members of files already indexed on disk keep their run ID and role.
+
+        Returns:
+            Number of members indexed (0 if the zip is unchanged since it was indexed)
+        """
+        st = os.stat(zip_path)
+        stored = _relpath(zip_path)
+        row = self.db.execute("SELECT size, mtime_ns FROM archives WHERE path = ?", (stored,)).fetchone()
+        if not force and row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return 0
+        count = 0
+        with self.db, zipfile.ZipFile(zip_path) as zf:
+            for (member,) in self.db.execute("SELECT member FROM files WHERE path = ? AND member != ''",
+                                             (stored,)).fetchall():
+                self._drop_file(stored, member)
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                name = os.path.basename(info.filename)
+                known = self.db.execute(
+                    "SELECT run_id, role FROM files WHERE name = ? AND member = '' AND run_id IS NOT NULL",
+                    (name,)).fetchone()
+                run_id, experiment, role = classify(name)
+                if known is not None:
+                    run_id, role = known
+                elif run_id:
+                    self._ensure_run(run_id, experiment)
+                summary = None
+                if name.lower().endswith(".csv"):
+                    with zf.open(info) as raw:
+                        summary = summarize_csv(io.TextIOWrapper(raw, encoding="utf-8", errors="replace", newline=""))
+                mtime_ns = int(datetime(*info.date_time).timestamp() * 1e9)
+                self._store_file(run_id, role, name, stored, info.filename, info.file_size, mtime_ns, summary)
+                count += 1
+            self.db.execute("INSERT OR REPLACE INTO archives (path, size, mtime_ns) VALUES (?, ?, ?)",
+                            (stored, st.st_size, st.st_mtime_ns))
+        return count
+
+    def scan(self, dirs: Iterable[str] = (LOG_DIR, MEASUREMENTS_DIR),
+             archive_dir: Optional[str] = ARCHIVE_DIR) -> int:
+        """
+        Bring the index up to date with dirs (recursively) and the zips in
+        archive_dir: new or changed files are indexed, rows of deleted files
+        under dirs are dropped.
+
+        Returns:
+            Number of files and archive members (re)indexed
+        """
+        count = 0
+        index_file = os.path.abspath(self.path)
+        with self.db:
+            for directory in dirs:
+                if not os.path.isdir(directory):
+                    continue
+                seen = set()
+                for root, _, names in os.walk(directory):
+                    for name in names:
+                        path = os.path.join(root, name)
+                        if os.path.abspath(path).startswith(index_file):
+                            continue  # The index itself (and its journal)
+                        seen.add(_relpath(path))
+                        count += self._index_file(path)
+                prefix = _relpath(directory).rstrip("/") + "/"
+                for (path,) in self.db.execute(
+                        "SELECT path FROM files WHERE member = '' AND substr(path, 1, ?) = ?",
+                        (len(prefix), prefix)).fetchall():
+                    if path not in seen:
+                        self._drop_file(path, "")
+        if archive_dir and os.path.isdir(archive_dir):
+            for name in sorted(os.listdir(archive_dir)):
+                if name.lower().endswith(".zip"):
+                    try:
+                        count += self.record_archive(os.path.join(archive_dir, name))
+                    except zipfile.BadZipFile:
+                        logger.warning(f"Skipping unreadable archive {name}")
+        return count
+
+    # ------------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------------
+
+    def files(self, pattern: Optional[str] = None, glob: Optional[str] = None,
+              run_id: Optional[str] = None, experiment: Optional[str] = None,
+              role: Optional[str] = None, archived: Optional[bool] = None) -> List[IndexedFile]:
+        """
+        Indexed files, oldest run first.
+
+        Args:
+            pattern: Substring of the file name (e.g. a timestamp "20251219_1231")
+            glob: SQLite GLOB on the file name (e.g. "compute_*.csv")
+            run_id, experiment, role: Exact matches
+            archived: True for zip members only, False for files on disk only
+        """
+        where, args = [], []
+        if pattern is not None:
+            where.append("instr(f.name, ?) > 0")
+            args.append(pattern)
+        if glob is not None:
+            where.append("f.name GLOB ?")
+            args.append(glob)
+        if run_id is not None:
+            where.append("f.run_id = ?")
+            args.append(run_id)
+        if experiment is not None:
+            where.append("r.experiment = ?")
+            args.append(experiment)
+        if role is not None:
+            where.append("f.role = ?")
+            args.append(role)
+        if archived is not None:
+            where.append("f.member != ''" if archived else "f.member = ''")
+        sql = ("SELECT f.id, f.run_id, f.role, f.name, f.path, f.member, f.size, f.rows "
+               "FROM files f LEFT JOIN runs r ON r.run_id = f.run_id")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY r.stamp, f.name, f.path"
+        return [IndexedFile(i, run, role_, name, _abspath(path), member or None, size, rows)
+                for i, run, role_, name, path, member, size, rows in self.db.execute(sql, args)]
+
+    def runs(self, experiment: Optional[str] = None) -> List[IndexedRun]:
+        """Indexed runs, oldest first."""
+        sql = "SELECT run_id, experiment, stamp, bench, test_mode, settings_hash, status, started, finished FROM runs"
+        args: Tuple = ()
+        if experiment is not None:
+            sql += " WHERE experiment = ?"
+            args = (experiment,)
+        return [IndexedRun(*row[:4], None if row[4] is None else bool(row[4]), *row[5:])
+                for row in self.db.execute(sql + " ORDER BY stamp, run_id", args)]
+
+    def latest(self, experiment: str, role: str = "csv") -> Optional[IndexedFile]:
+        """File of the given role from the newest run of experiment (on disk preferred), or None."""
+        found = self.files(experiment=experiment, role=role)
+        if not found:
+            return None
+        newest = found[-1].run_id
+        candidates = [f for f in found if f.run_id == newest]
+        return next((f for f in candidates if f.member is None), candidates[0])
+
+    def stats(self, file: IndexedFile) -> Dict[str, Tuple[int, float, float, float]]:
+        """{column: (count, min, max, mean)} of an indexed CSV."""
+        return {column: (count, low, high, mean) for column, count, low, high, mean in self.db.execute(
+            "SELECT column, count, min, max, mean FROM stats WHERE file_id = ?", (file.id,))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run index (logs/run_index.sqlite)")
+    sub = parser.add_subparsers(dest="action", required=True)
+    sub.add_parser("scan", help="Index new/changed files in logs/, measurements/ and archive/")
+    runs = sub.add_parser("runs", help="List runs")
+    runs.add_argument("--experiment", help="Experiment name (e.g. Compute)")
+    files = sub.add_parser("files", help="List files whose name contains PATTERN")
+    files.add_argument("pattern")
+    stats = sub.add_parser("stats", help="Column statistics of the CSVs whose name contains PATTERN")
+    stats.add_argument("pattern")
+    args = parser.parse_args()
+
+    with RunIndex() as index:
+        if args.action == "scan":
+            print(f"Indexed {index.scan()} new or changed file(s) in {index.path}")
+        elif args.action == "runs":
+            for run in index.runs(args.experiment):
+                print(f"{run.run_id:<40} {run.experiment or '':<12} {run.status or '':<10} "
+                      f"{run.settings_hash or '':<16} {'TEST' if run.test_mode else ''}")
+        elif args.action == "files":
+            for f in index.files(pattern=args.pattern):
+                rows = f"{f.rows} rows" if f.rows is not None else ""
+                print(f"{f.run_id or '-':<40} {f.role:<12} {f.size:>10} {rows:>11}  {f.location}")
+        else:
+            for f in index.files(pattern=args.pattern, role="csv"):
+                print(f"{f.location} ({f.rows} rows)")
+                for column, (count, low, high, mean) in index.stats(f).items():
+                    print(f"    {column:<20} n={count:<7} min={low:<12.6g} max={high:<12.6g} mean={mean:.6g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -29,25 +29,33 @@ Bounds:
     terminates immediately if any IMEAS value is outside this bound.
 
 Usage:
-    python -m experiments.run_kalman [--test] [--vdd VDD] [--vcc VCC]
+    python -m experiments.run_kalman [--test] [--vdd VDD] [--vcc VCC] [--resume RUN_ID]
+
+An interrupted run continues from the step after its last checkpoint, with
+the checkpointed X1/X2, when started with --resume RUN_ID.
 """
 
 import sys
 import os
 import argparse
-import logging
 import csv
+import hashlib
+import json
+import time
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from experiments.run_compute import ComputeExperiment  # Reuse hardware setup helpers
+from experiments.checkpoint import reopen_output
 from configs.compute import COMPUTE_CONFIG
 from configs import kalman_settings as SETTINGS
 from configs.resource_types import InstrumentType
-from experiments.imeas_test_pattern import generate_imeas_pattern
+from experiments.pipeline import BackgroundSink, StepLatencyStats
+from experiments.step_scheduler import RESCALE, StepScheduler
+from instruments.recorder import mark_point
 
 
 class KalmanExperiment(ComputeExperiment):
@@ -58,13 +66,13 @@ class KalmanExperiment(ComputeExperiment):
 
     def __init__(self, test_mode: bool = False,
                  vdd: Optional[float] = None,
-                 vcc: Optional[float] = None) -> None:
-        # Initialize as a Compute experiment (uses COMPUTE_CONFIG, logging, etc.)
-        super().__init__(test_mode=test_mode, vdd=vdd, vcc=vcc)
-
-        # Override config name for logging clarity
-        self.config = COMPUTE_CONFIG._replace(name="Kalman")  # type: ignore[attr-defined]
-        self.logger = logging.getLogger("Experiment.Kalman")
+                 vcc: Optional[float] = None,
+                 use_pattern_cache: Optional[bool] = None,
+                 resume: Optional[str] = None) -> None:
+        # Initialize as a Compute experiment on COMPUTE_CONFIG, named "Kalman" so
+        # logs, the run ID and checkpoints are kept apart from Compute runs
+        super().__init__(test_mode=test_mode, vdd=vdd, vcc=vcc, resume=resume,
+                         config=COMPUTE_CONFIG._replace(name="Kalman"))  # type: ignore[attr-defined]
 
         # Current bounds (A)
         self.min_current = SETTINGS.MIN_CURRENT
@@ -83,14 +91,24 @@ class KalmanExperiment(ComputeExperiment):
         self.x1 = SETTINGS.X1_INITIAL
         self.x2 = SETTINGS.X2_INITIAL
 
-        # IMEAS sequence will be generated in run()
-        self.imeas_vector: List[float] = []
+        # IMEAS sequence will be generated in run() (a NumPy array, memory-mapped
+        # when cached); the key identifies the cached stimulus (None when the
+        # pattern cache is not used)
+        self.imeas_vector: Sequence[float] = []
+        self.imeas_pattern_key: Optional[str] = None
+        self.use_pattern_cache = use_pattern_cache
 
         # CSV output for measurements
         self._csv_file = None
         self._csv_writer = None
         self._csv_initialized = False
 
+        # Background writer for CSV rows / step logs (pipelined loop only)
+        self._io_sink: Optional[BackgroundSink] = None
+
+        # Step period KGAIN2 / F12 are currently scaled to (s)
+        self._scaled_period = SETTINGS.TIME_STEP
+
     # ======================================================================
     # CSV OUTPUT
     # ======================================================================
@@ -114,11 +132,25 @@ class KalmanExperiment(ComputeExperiment):
         )
         os.makedirs(measurements_dir, exist_ok=True)
 
+        # The settings (IMEAS vector included) are checked before the
+        # checkpointed CSV is truncated
+        checkpoint = self.resume_checkpoint(settings=self._settings_fingerprint())
+        if checkpoint is not None:
+            # Resuming: continue the checkpointed CSV after its last committed row
+            saved = checkpoint["outputs"]["csv"]
+            self._csv_file = reopen_output(saved["path"], saved["offset"])
+            self._csv_writer = csv.writer(self._csv_file)
+            self.csv_path = saved["path"]
+            self._csv_initialized = True
+            self.logger.info(f"Kalman CSV output resumed: {saved['path']}")
+            return
+
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         csv_filename = os.path.join(
             measurements_dir,
             f"kalman_{timestamp}.csv",
         )
+        self.csv_path = csv_filename
 
         self._csv_file = open(csv_filename, "w", newline="", encoding="utf-8")
         self._csv_writer = csv.writer(self._csv_file)
@@ -152,10 +184,10 @@ class KalmanExperiment(ComputeExperiment):
         ierr1: float,
         ierr2: float,
     ) -> None:
-        """Write a single measurement row to the Kalman CSV file."""
-        if not self._csv_initialized:
-            self._initialize_csv_output()
-
+        """
+        Write a single measurement row to the Kalman CSV file (on the
+        background sink when the loop is pipelined).
+        """
         row = [
             step_index,
             mode,
@@ -168,9 +200,68 @@ class KalmanExperiment(ComputeExperiment):
             ierr2,
         ]
 
+        if self._io_sink is not None:
+            self._io_sink.submit(self._write_csv_row, row)
+        else:
+            self._write_csv_row(row)
+
+    def _write_csv_row(self, row: List[Any]) -> None:
+        """Append one row to the Kalman CSV file and flush it."""
+        if not self._csv_initialized:
+            self._initialize_csv_output()
         self._csv_writer.writerow(row)
         self._csv_file.flush()
 
+    def _commit_step(self, position: Optional[Dict[str, Any]], complete: bool = False) -> None:
+        """
+        Checkpoint the loop after a step's rows (on the background sink when
+        pipelined, so the checkpoint follows the rows it covers).
+        """
+        if self._io_sink is not None:
+            self._io_sink.submit(self._commit_kalman_checkpoint, position, complete)
+        else:
+            self._commit_kalman_checkpoint(position, complete)
+
+    def _commit_kalman_checkpoint(self, position: Optional[Dict[str, Any]], complete: bool) -> None:
+        """Save a checkpoint covering every row written so far."""
+        self.commit_checkpoint(position, {"csv": self._csv_file}, complete=complete,
+                               settings=self._settings_fingerprint())
+
+    def _settings_fingerprint(self) -> str:
+        """Hash of the IMEAS vector and fixed currents a resumed run must share (cached)."""
+        if self._fingerprint is not None:
+            return self._fingerprint
+        settings = {
+            "imeas_sha256": hashlib.sha256(memoryview(self.imeas_vector)).hexdigest(),
+            "vdd": self.vdd,
+            "vcc": self.vcc,
+            "irefp": self.irefp,
+            "trim": [self.trim1, self.trim2],
+            "kgain1": self.kgain1,
+            "f11": self.f11,
+            "bounds": [self.min_current, self.max_current],
+        }
+        encoded = json.dumps(settings, sort_keys=True)
+        self._fingerprint = hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+        return self._fingerprint
+
+    def _log_step(self, msg: str, *args: Any) -> None:
+        """Log a per-step info line (on the background sink when pipelined)."""
+        if self._io_sink is not None:
+            self._io_sink.submit(self.logger.info, msg, *args)
+        else:
+            self.logger.info(msg, *args)
+
+    def _force_x_currents(self) -> None:
+        """Force the present X1/X2 values."""
+        if self._io_sink is not None:
+            for terminal, value in (("X1", self.x1), ("X2", self.x2)):
+                self.apply_terminal_current(terminal, value, self.prepare_terminal_current(terminal, value))
+                self._log_step("%s: Set to %gA", terminal, value)
+        else:
+            self.set_terminal_current("X1", self.x1)
+            self.set_terminal_current("X2", self.x2)
+
     def _close_csv_output(self) -> None:
         """Close Kalman CSV output file, if open."""
         if self._csv_file:
@@ -180,6 +271,20 @@ class KalmanExperiment(ComputeExperiment):
             self._csv_initialized = False
             self.logger.info("Kalman CSV output file closed")
 
+    def _rescale_time_currents(self, period: float) -> None:
+        """
+        Scale KGAIN2 / F12 to the achieved step period (*_PER_SEC * period)
+        when it has moved by more than STEP_RESCALE_TOLERANCE.
+        """
+        if abs(period - self._scaled_period) <= SETTINGS.STEP_RESCALE_TOLERANCE * self._scaled_period:
+            return
+        self._scaled_period = period
+        self.kgain2 = SETTINGS.KGAIN2_PER_SEC * period
+        self.f12 = SETTINGS.F12_PER_SEC * period
+        self.set_terminal_current("KGAIN2", self.kgain2)
+        self.set_terminal_current("F12", self.f12)
+        self._log_step("Step period %.3f ms: KGAIN2 = %g A, F12 = %g", period * 1e3, self.kgain2, self.f12)
+
     # ======================================================================
     # HELPER: CLAMP CURRENTS
     # ======================================================================
@@ -204,14 +309,16 @@ class KalmanExperiment(ComputeExperiment):
                    ERASE step  -> update X1/X2 with (1 + IERR)
                    PROGRAM step -> update X1/X2 with (1 - IERR)
                X1/X2 are clamped to [0.1 nA, 100 nA] after each update.
+
+        With SETTINGS.PIPELINED_LOOP, the IMEAS command for step k+1 is
+        formatted while step k runs and CSV rows / step logs are written by a
+        background thread. Steps are paced to TIME_STEP, or KGAIN2 / F12
+        rescaled to the achieved period, per SETTINGS.STEP_RATE_MODE.
         """
         self.logger.info("=" * 60)
         self.logger.info("Executing Kalman-style closed-loop experiment")
         self.logger.info("=" * 60)
 
-        # Initialize CSV output for this run
-        self._initialize_csv_output()
-
         # ------------------------------------------------------------------
         # One-time initialization (reuse ComputeExperiment helpers)
         # ------------------------------------------------------------------
@@ -233,8 +340,36 @@ class KalmanExperiment(ComputeExperiment):
         # Generate IMEAS test vector using shared pattern generator
         # ------------------------------------------------------------------
         self.logger.info("Generating IMEAS test pattern from kalman_settings.")
-        imeas_values, roc_values = generate_imeas_pattern()
+        # Imported here: the generator needs NumPy, which --help does not
+        from experiments.imeas_test_pattern import cached_imeas_pattern
+        imeas_values, roc_values, self.imeas_pattern_key = cached_imeas_pattern(
+            use_cache=self.use_pattern_cache)
         self.imeas_vector = imeas_values
+        if self.imeas_pattern_key:
+            self.logger.info("IMEAS pattern key: %s", self.imeas_pattern_key)
+
+        # Initialize CSV output for this run (needs the IMEAS vector for the
+        # settings check when resuming)
+        self._initialize_csv_output()
+
+        # ------------------------------------------------------------------
+        # Resume: restore the loop state of the last committed step
+        # ------------------------------------------------------------------
+        start_step = 0
+        last_position: Optional[Dict[str, Any]] = None
+        checkpoint = self.resume_checkpoint(settings=self._settings_fingerprint())
+        if checkpoint is not None and checkpoint.get("position") is not None:
+            last_position = checkpoint["position"]
+            start_step = last_position["step_index"] + 1
+            self.x1 = last_position["x1"]
+            self.x2 = last_position["x2"]
+            self.kgain2 = last_position["kgain2"]
+            self.f12 = last_position["f12"]
+            self._scaled_period = last_position["scaled_period"]
+            self.logger.info("Resuming at IMEAS step %d/%d: X1 = %g A, X2 = %g A",
+                             start_step + 1, len(self.imeas_vector), self.x1, self.x2)
+        elif checkpoint is None:
+            self._commit_step(None)
 
         # ------------------------------------------------------------------
         # Apply fixed currents that do NOT change during the loop
@@ -274,20 +409,41 @@ class KalmanExperiment(ComputeExperiment):
             x1_trajectory.append(self.x1)
             x2_trajectory.append(self.x2)
 
-        for idx, imeas in enumerate(self.imeas_vector):
-            self.logger.info("-" * 60)
-            self.logger.info("IMEAS step %d/%d: IMEAS = %g A", idx + 1, len(self.imeas_vector), imeas)
-
-            # Set IMEAS for this step
-            self.set_terminal_current("IMEAS", imeas)
+        pipelined = SETTINGS.PIPELINED_LOOP
+        num_steps = len(self.imeas_vector)
+        step_stats = StepLatencyStats("Kalman step")
+        critical_stats = StepLatencyStats("Measure -> update")
+        scheduler = StepScheduler(SETTINGS.TIME_STEP, SETTINGS.STEP_RATE_MODE,
+                                  smoothing=SETTINGS.STEP_PERIOD_SMOOTHING,
+                                  test_mode=self.test_mode)
+        next_imeas_cmd = None
+        if pipelined:
+            self._io_sink = BackgroundSink(name="kalman-io")
+            if start_step < num_steps:
+                next_imeas_cmd = self.prepare_terminal_current("IMEAS", float(self.imeas_vector[start_step]))
+
+        scheduler.start()
+        for idx in range(start_step, num_steps):
+            imeas = float(self.imeas_vector[idx])
+            step_start = time.perf_counter()
+            self._log_step("-" * 60)
+            self._log_step("IMEAS step %d/%d: IMEAS = %g A", idx + 1, num_steps, imeas)
+
+            # Set IMEAS for this step (pre-formatted one step ahead when pipelined)
+            if pipelined:
+                self.apply_terminal_current("IMEAS", imeas, next_imeas_cmd)
+                if idx + 1 < num_steps:
+                    next_imeas_cmd = self.prepare_terminal_current("IMEAS", float(self.imeas_vector[idx + 1]))
+            else:
+                self.set_terminal_current("IMEAS", imeas)
 
             # -------------------- ERASE STEP -------------------------------
             self.set_ppg_state("ERASE")
 
             # Ensure X1/X2 terminals use current values before measurement
-            self.set_terminal_current("X1", self.x1)
-            self.set_terminal_current("X2", self.x2)
+            self._force_x_currents()
 
+            critical_start = time.perf_counter()
             if self.test_mode:
                 # In TEST_MODE, bypass hardware measurement so X1/X2 still
                 # evolve according to the update equations using a simple
@@ -304,6 +460,7 @@ class KalmanExperiment(ComputeExperiment):
 
             x1_after_erase = self._update_current(self.x1, ierr1_erase, mode="ERASE")
             x2_after_erase = self._update_current(self.x2, ierr2_erase, mode="ERASE")
+            critical_time = time.perf_counter() - critical_start
 
             # Log ERASE measurement
             self._write_measurement_row(
@@ -325,9 +482,9 @@ class KalmanExperiment(ComputeExperiment):
             self.x1 = x1_after_erase
             self.x2 = x2_after_erase
 
-            self.set_terminal_current("X1", self.x1)
-            self.set_terminal_current("X2", self.x2)
+            self._force_x_currents()
 
+            critical_start = time.perf_counter()
             if self.test_mode:
                 out1_prog = self.x1
                 out2_prog = self.x2
@@ -341,6 +498,7 @@ class KalmanExperiment(ComputeExperiment):
 
             self.x1 = self._update_current(self.x1, ierr1_prog, mode="PROGRAM")
             self.x2 = self._update_current(self.x2, ierr2_prog, mode="PROGRAM")
+            critical_stats.record(critical_time + time.perf_counter() - critical_start)
 
             # Log PROGRAM measurement
             self._write_measurement_row(
@@ -354,6 +512,16 @@ class KalmanExperiment(ComputeExperiment):
                 ierr1=ierr1_prog,
                 ierr2=ierr2_prog,
             )
+            last_position = {
+                "step_index": idx,
+                "x1": self.x1,
+                "x2": self.x2,
+                "kgain2": self.kgain2,
+                "f12": self.f12,
+                "scaled_period": self._scaled_period,
+            }
+            self._commit_step(last_position)
+            mark_point(f"step#{idx + 1}")
 
             if self.test_mode:
                 x1_trajectory.append(self.x1)
@@ -382,7 +550,20 @@ class KalmanExperiment(ComputeExperiment):
                     },
                 }
             )
+            step_stats.record(time.perf_counter() - step_start)
 
+            scheduler.end_step()
+            if scheduler.mode == RESCALE:
+                self._rescale_time_currents(scheduler.achieved_period)
+
+        if self._io_sink is not None:
+            self._io_sink.close()
+            self._io_sink = None
+        self._commit_step(last_position, complete=True)
+
+        step_stats.log_summary(self.logger)
+        critical_stats.log_summary(self.logger)
+        scheduler.log_summary(self.logger)
         self.logger.info("=" * 60)
 
         if self.test_mode:
@@ -406,8 +587,12 @@ class KalmanExperiment(ComputeExperiment):
                 "MAX_CURRENT": self.max_current,
             },
             "imeas_vector": self.imeas_vector,
+            "imeas_pattern_key": self.imeas_pattern_key,
+            "resumed_from_step": start_step if self.resume_state is not None else None,
             "final_x1": self.x1,
             "final_x2": self.x2,
+            "step_latency": step_stats.summary(),
+            "step_timing": scheduler.summary(),
             "history": history,
         }
 
@@ -419,9 +604,10 @@ class KalmanExperiment(ComputeExperiment):
         """
         Measure OUT1 and OUT2 currents in a single 5270B spot measurement.
 
-        Uses multi-channel MM 1,CH_OUT1,CH_OUT2 and parses both currents
-        from the returned data string. Falls back to per-terminal
-        measurement if either terminal is not on the 5270B.
+        Uses multi-channel MM 1,CH_OUT1,CH_OUT2 and takes each current from
+        the data element with its channel header (terminal_readings()), so
+        the channel order of the response does not matter. Falls back to
+        per-terminal measurement if either terminal is not on the 5270B.
         """
         out1_cfg = self.get_terminal_config("OUT1")
         out2_cfg = self.get_terminal_config("OUT2")
@@ -433,38 +619,31 @@ class KalmanExperiment(ComputeExperiment):
             }
 
         iv = self._get_instrument(InstrumentType.IV5270B)
-        channels = [out1_cfg.channel, out2_cfg.channel]
+        channels = list(self.config_index.channels(("OUT1", "OUT2")))
+        # OUT tracks the X just forced, so seed the ranges from X1/X2
+        self.prepare_measurement_range("OUT1", expected=self.x1)
+        self.prepare_measurement_range("OUT2", expected=self.x2)
         iv.set_measurement_mode(1, channels)
         iv.execute_measurement()
         raw = iv.read_data()
+        overflow1 = self.check_range_overflow("OUT1", raw)
+        overflow2 = self.check_range_overflow("OUT2", raw)
+        if overflow1 or overflow2:
+            # Predicted range overflowed: measure again in auto range
+            iv.execute_measurement()
+            raw = iv.read_data()
 
         self.logger.debug("5270B OUT1/OUT2 raw data: %s", raw)
 
-        out1_current = 0.0
-        out2_current = 0.0
-
-        try:
-            parts = raw.split(",")
-            cleaned = [self._remove_3letter_prefix(p) for p in parts]
-
-            # First value: OUT1 current
-            if len(cleaned) >= 1:
-                try:
-                    out1_current = float(cleaned[0])
-                except ValueError:
-                    out1_str = cleaned[0].replace("I", "").replace("A", "")
-                    out1_current = float(out1_str)
-
-            # Second value: OUT2 current
-            if len(cleaned) >= 2:
-                try:
-                    out2_current = float(cleaned[1])
-                except ValueError:
-                    out2_str = cleaned[1].replace("I", "").replace("A", "")
-                    out2_current = float(out2_str)
-        except Exception as exc:
-            self.logger.warning("Error parsing OUT1/OUT2 currents from 5270B data %r: %s", raw, exc)
+        readings = self.terminal_readings(("OUT1", "OUT2"), raw)
+        missing = [t for t, r in readings.items() if r is None]
+        if missing:
+            self.logger.warning("No %s current in 5270B data %r", "/".join(missing), raw)
+        out1_current = readings["OUT1"].value if readings["OUT1"] is not None else 0.0
+        out2_current = readings["OUT2"].value if readings["OUT2"] is not None else 0.0
 
+        self.note_measurement("OUT1", out1_current)
+        self.note_measurement("OUT2", out2_current)
         self.logger.info("OUT1 current = %g A, OUT2 current = %g A", out1_current, out2_current)
         return {"OUT1": out1_current, "OUT2": out2_current}
 
@@ -561,6 +740,12 @@ class KalmanExperiment(ComputeExperiment):
 
     def shutdown(self) -> None:
         """Override shutdown to close Kalman CSV output."""
+        if self._io_sink is not None:
+            try:
+                self._io_sink.close()
+            except RuntimeError as e:
+                self.logger.error(f"Kalman background writer failed: {e}")
+            self._io_sink = None
         self._close_csv_output()
         super().shutdown()
 
@@ -586,12 +771,24 @@ def main() -> None:
         default=SETTINGS.VCC_DEFAULT,
         help=f"VCC voltage in volts (default: {SETTINGS.VCC_DEFAULT})",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Regenerate the IMEAS pattern instead of using the pattern cache",
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help="Continue an interrupted run from its last checkpoint (logs/checkpoints/RUN_ID.json)",
+    )
     args = parser.parse_args()
 
     with KalmanExperiment(
         test_mode=args.test,
         vdd=args.vdd,
         vcc=args.vcc,
+        use_pattern_cache=False if args.no_cache else None,
+        resume=args.resume,
     ) as experiment:
         results = experiment.run()
 
@@ -605,6 +802,8 @@ def main() -> None:
         f"VCC={results['parameters']['VCC']} V",
     )
     print(f"IMEAS points: {len(results.get('imeas_vector', []))}")
+    if results.get("imeas_pattern_key"):
+        print(f"IMEAS pattern key: {results['imeas_pattern_key']}")
     print(f"Final X1: {results.get('final_x1', 0.0)} A")
     print(f"Final X2: {results.get('final_x2', 0.0)} A")
     print("=" * 60)
@@ -65,6 +65,7 @@ from typing import Dict, List, Any
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from experiments.adaptive_sweep import AdaptiveSweep
 from experiments.base_experiment import ExperimentRunner, CURRENT_SOURCE_COMPLIANCE
 from configs.programmer import (
     PROGRAMMER_CONFIG,
@@ -180,11 +181,8 @@ class ProgrammerExperiment(ExperimentRunner):
         # Get instrument references
         iv = self._get_instrument(InstrumentType.IV5270B)
         
-        # Get all used channels from terminal configs
-        used_channels = set()
-        for terminal_name, terminal_cfg in PROGRAMMER_TERMINALS.items():
-            if terminal_cfg.instrument == InstrumentType.IV5270B:
-                used_channels.add(terminal_cfg.channel)
+        # Get all used channels from the compiled terminal index
+        used_channels = set(self.config_index.channels_of(InstrumentType.IV5270B))
         
         # Enable all 5270B channels (1-8) - Channel 0 (GNDU) is automatically enabled
         all_channels = list(range(1, 9))  # Channels 1-8
@@ -202,8 +200,7 @@ class ProgrammerExperiment(ExperimentRunner):
             if ch == 0:
                 channel_info.append(f"CH0 (VSS/GNDU)")
             else:
-                term_name = next((name for name, cfg in PROGRAMMER_TERMINALS.items() 
-                                if cfg.instrument == InstrumentType.IV5270B and cfg.channel == ch), f"CH{ch}")
+                term_name = self.config_index.terminal_at(InstrumentType.IV5270B, ch, f"CH{ch}")
                 channel_info.append(f"CH{ch} ({term_name})")
         for ch in unused_channels:
             channel_info.append(f"CH{ch} (GNDU)")
@@ -221,6 +218,9 @@ class ProgrammerExperiment(ExperimentRunner):
         # Set initial current values to 0
         self._set_currents(0.0, 0.0)
         
+        # ADC / integration time / ranges from PROGRAMMER_MEASUREMENT_PROFILES
+        self.apply_measurement_profiles()
+        
         self.logger.info("=" * 60)
         self.logger.info("INITIALIZATION COMPLETE - Ready for measurements")
         self.logger.info("=" * 60)
@@ -444,11 +444,15 @@ class ProgrammerExperiment(ExperimentRunner):
         """
         iv = self._get_instrument(InstrumentType.IV5270B)
         cfg = self.get_terminal_config("ICELLMEAS")
+        self.prepare_measurement_range("ICELLMEAS")
         
         # Set measurement mode to spot measurement
         iv.set_measurement_mode(1, [cfg.channel])
         iv.execute_measurement()
         data = iv.read_data()
+        if self.check_range_overflow("ICELLMEAS", data):
+            iv.execute_measurement()
+            data = iv.read_data()
         
         try:
             # Parse current from response
@@ -457,6 +461,7 @@ class ProgrammerExperiment(ExperimentRunner):
             current = 0.0
             self.logger.warning(f"Could not parse ICELLMEAS current: {data}")
         
+        self.note_measurement("ICELLMEAS", current)
         self.logger.info(f"ICELLMEAS {label}: {current} A")
         return current
     
@@ -562,6 +567,7 @@ class ProgrammerExperiment(ExperimentRunner):
         
         # Open CSV files for writing
         self._csv_file = open(csv_filename, 'w', newline='', encoding='utf-8')
+        self.register_run_file(csv_filename, "csv")
         self._csv_writer = csv.writer(self._csv_file)
         
         self._csv_file_latest = open(csv_filename_latest, 'w', newline='', encoding='utf-8')
@@ -652,6 +658,98 @@ class ProgrammerExperiment(ExperimentRunner):
     # Main Experiment Execution
     # ========================================================================
     
+    def _measure_prog_in_point(self, mode: str, irefp: float, prog_in: float,
+                               vrefp: float) -> Dict[str, Any]:
+        """
+        Measure one PROG_IN point: set PROG_IN, ICELLMEAS start, trigger WR_ENB
+        and read the PROG_OUT pulse width, ICELLMEAS final, write the CSV row.
+        
+        Args:
+            mode: "ERASE" or "PROGRAM" (ERASE_PROG already set for the mode)
+            irefp: IREFP current in effect (A)
+            prog_in: PROG_IN current to set (A)
+            vrefp: VREFP measured for this IREFP (V)
+        
+        Returns:
+            Measurement dict (MODE, IREFP, PROG_IN, ICELLMEAS_START,
+            ICELLMEAS_FINAL, PULSE_WIDTH)
+        """
+        # Set PROG_IN current level
+        self.set_terminal_current("PROG_IN", prog_in)
+        
+        # Allow settling time for PROG_IN
+        if not self.test_mode:
+            time.sleep(0.01)
+        
+        # Ensure ERASE_PROG is LOW before ICELLMEAS measurement in ERASE mode
+        if mode == "ERASE":
+            self.set_terminal_voltage("ERASE_PROG", 0.0)
+            self.logger.info("ERASE_PROG set to 0V before ICELLMEAS START measurement (ERASE mode)")
+        # Starting ICELLMEAS measurement
+        icellmeas_start = self.measure_icellmeas_current("START")
+        # Restore ERASE_PROG to VCC after ICELLMEAS measurement in ERASE mode
+        if mode == "ERASE":
+            self.set_terminal_voltage("ERASE_PROG", self.vcc)
+            self.logger.info(f"ERASE_PROG restored to {self.vcc}V after ICELLMEAS START measurement (ERASE mode)")
+
+        # Initiate counter measurement (arms counter to wait for trigger)
+        self.initiate_time_interval()
+        
+        # Trigger PPG
+        self.trigger_wr_enb()
+        
+        # Fetch counter measurement result
+        pulse_width = self.fetch_time_interval()
+
+        # Ensure ERASE_PROG is LOW before ICELLMEAS measurement in ERASE mode
+        if mode == "ERASE":
+            self.set_terminal_voltage("ERASE_PROG", 0.0)
+            self.logger.info("ERASE_PROG set to 0V before ICELLMEAS FINAL measurement (ERASE mode)")
+        # Final ICELLMEAS measurement
+        icellmeas_final = self.measure_icellmeas_current("FINAL")
+        # Restore ERASE_PROG to VCC after ICELLMEAS measurement in ERASE mode
+        if mode == "ERASE":
+            self.set_terminal_voltage("ERASE_PROG", self.vcc)
+            self.logger.info(f"ERASE_PROG restored to {self.vcc}V after ICELLMEAS FINAL measurement (ERASE mode)")
+        
+        # Prepare values for CSV (use dummy data in test mode)
+        csv_vrefp = vrefp
+        csv_icellmeas_start = icellmeas_start
+        csv_icellmeas_final = icellmeas_final
+        csv_pulse_width = pulse_width
+        
+        if self.test_mode:
+            # Use dummy values for CSV measurements, but keep correct current settings
+            csv_vrefp = 1.0  # Dummy voltage
+            csv_icellmeas_start = 1e-12  # Dummy measurement
+            csv_icellmeas_final = 1e-12  # Dummy measurement
+            csv_pulse_width = 1e-6  # Dummy pulse width (1 µs)
+        
+        # Write to CSV
+        self._write_measurement_row(
+            mode=mode,
+            irefp=irefp,
+            prog_in=prog_in,
+            vrefp=csv_vrefp,
+            icellmeas_start=csv_icellmeas_start,
+            icellmeas_final=csv_icellmeas_final,
+            pulse_width=csv_pulse_width
+        )
+        
+        # Record measurement
+        measurement = {
+            "MODE": mode,
+            "IREFP": irefp,
+            "PROG_IN": prog_in,
+            "ICELLMEAS_START": icellmeas_start,
+            "ICELLMEAS_FINAL": icellmeas_final,
+            "PULSE_WIDTH": pulse_width,
+        }
+        
+        self.logger.info(f"Results: Start={icellmeas_start}A, "
+                       f"Final={icellmeas_final}A, Width={pulse_width*1e6:.3f}µs")
+        return measurement
+    
     def run(self) -> dict:
         """
         Execute the Programmer experiment.
@@ -704,7 +802,10 @@ class ProgrammerExperiment(ExperimentRunner):
             self.logger.warning("No IREFP values set, using [0.0]")
         
         # Total measurements = 2 modes * IREFP values * PROG_IN values
-        total_measurements = 2 * len(self.irefp_values) * len(self.prog_in_values)
+        # (adaptive PROG_IN: at most ADAPTIVE_PROG_IN_BUDGET points per IREFP)
+        points_per_irefp = (SETTINGS.ADAPTIVE_PROG_IN_BUDGET if SETTINGS.ADAPTIVE_PROG_IN
+                            else len(self.prog_in_values))
+        total_measurements = 2 * len(self.irefp_values) * points_per_irefp
         measurement_num = 0
         
         # ====================================================================
@@ -751,73 +852,28 @@ class ProgrammerExperiment(ExperimentRunner):
                         self.logger.warning(f"WARNING: VREFP out of safe range: {vrefp}V (expected 0.5V to 1.5V)")
                         self.logger.warning(f"IREFP setting: {irefp*1e9:.1f}nA")
                 
-                for prog_in in self.prog_in_values:
+                if SETTINGS.ADAPTIVE_PROG_IN:
+                    sweep = AdaptiveSweep(
+                        min(self.prog_in_values), max(self.prog_in_values),
+                        coarse_points=SETTINGS.ADAPTIVE_PROG_IN_COARSE_POINTS,
+                        budget=SETTINGS.ADAPTIVE_PROG_IN_BUDGET,
+                        min_ratio=SETTINGS.ADAPTIVE_PROG_IN_MIN_RATIO,
+                        tolerance=SETTINGS.ADAPTIVE_PROG_IN_TOLERANCE,
+                    )
+                    prog_in_points = iter(sweep.propose, None)
+                else:
+                    sweep = None
+                    prog_in_points = iter(self.prog_in_values)
+                
+                for prog_in in prog_in_points:
                     measurement_num += 1
                     self.logger.info("-" * 40)
                     self.logger.info(f"[{measurement_num}/{total_measurements}] {mode}: "
                                    f"IREFP={irefp*1e9:.1f}nA, PROG_IN={prog_in*1e9:.1f}nA")
                     
-                    # Set PROG_IN current level
-                    self.set_terminal_current("PROG_IN", prog_in)
-                    
-                    # Allow settling time for PROG_IN
-                    if not self.test_mode:
-                        time.sleep(0.01)
-                    
-                    # Ensure ERASE_PROG is LOW before ICELLMEAS measurement in ERASE mode
-                    if mode == "ERASE":
-                        self.set_terminal_voltage("ERASE_PROG", 0.0)
-                        self.logger.info("ERASE_PROG set to 0V before ICELLMEAS START measurement (ERASE mode)")
-                    # Starting ICELLMEAS measurement
-                    icellmeas_start = self.measure_icellmeas_current("START")
-                    # Restore ERASE_PROG to VCC after ICELLMEAS measurement in ERASE mode
-                    if mode == "ERASE":
-                        self.set_terminal_voltage("ERASE_PROG", self.vcc)
-                        self.logger.info(f"ERASE_PROG restored to {self.vcc}V after ICELLMEAS START measurement (ERASE mode)")
-
-                    # Initiate counter measurement (arms counter to wait for trigger)
-                    self.initiate_time_interval()
-                    
-                    # Trigger PPG
-                    self.trigger_wr_enb()
-                    
-                    # Fetch counter measurement result
-                    pulse_width = self.fetch_time_interval()
-
-                    # Ensure ERASE_PROG is LOW before ICELLMEAS measurement in ERASE mode
-                    if mode == "ERASE":
-                        self.set_terminal_voltage("ERASE_PROG", 0.0)
-                        self.logger.info("ERASE_PROG set to 0V before ICELLMEAS FINAL measurement (ERASE mode)")
-                    # Final ICELLMEAS measurement
-                    icellmeas_final = self.measure_icellmeas_current("FINAL")
-                    # Restore ERASE_PROG to VCC after ICELLMEAS measurement in ERASE mode
-                    if mode == "ERASE":
-                        self.set_terminal_voltage("ERASE_PROG", self.vcc)
-                        self.logger.info(f"ERASE_PROG restored to {self.vcc}V after ICELLMEAS FINAL measurement (ERASE mode)")
-                    
-                    # Prepare values for CSV (use dummy data in test mode)
-                    csv_vrefp = vrefp
-                    csv_icellmeas_start = icellmeas_start
-                    csv_icellmeas_final = icellmeas_final
-                    csv_pulse_width = pulse_width
-                    
-                    if self.test_mode:
-                        # Use dummy values for CSV measurements, but keep correct current settings
-                        csv_vrefp = 1.0  # Dummy voltage
-                        csv_icellmeas_start = 1e-12  # Dummy measurement
-                        csv_icellmeas_final = 1e-12  # Dummy measurement
-                        csv_pulse_width = 1e-6  # Dummy pulse width (1 µs)
-                    
-                    # Write to CSV
-                    self._write_measurement_row(
-                        mode=mode,
-                        irefp=irefp,
-                        prog_in=prog_in,
-                        vrefp=csv_vrefp,
-                        icellmeas_start=csv_icellmeas_start,
-                        icellmeas_final=csv_icellmeas_final,
-                        pulse_width=csv_pulse_width
-                    )
+                    measurement = self._measure_prog_in_point(mode, irefp, prog_in, vrefp)
+                    if sweep is not None:
+                        sweep.observe(prog_in, measurement["PULSE_WIDTH"])
                     
                     # Check for errors after first measurement (first set of conditions)
                     # Ignore counter errors (they don't cause exit)
@@ -826,19 +882,7 @@ class ProgrammerExperiment(ExperimentRunner):
                         errors = self.check_all_instrument_errors()
                         self.report_and_exit_on_errors_filtered(errors)
                     
-                    # Record measurement
-                    measurement = {
-                        "MODE": mode,
-                        "IREFP": irefp,
-                        "PROG_IN": prog_in,
-                        "ICELLMEAS_START": icellmeas_start,
-                        "ICELLMEAS_FINAL": icellmeas_final,
-                        "PULSE_WIDTH": pulse_width,
-                    }
                     results["measurements"].append(measurement)
-                    
-                    self.logger.info(f"Results: Start={icellmeas_start}A, "
-                                   f"Final={icellmeas_final}A, Width={pulse_width*1e6:.3f}µs")
         
         self.logger.info("=" * 60)
         self.logger.info("MEASUREMENT LOOP COMPLETE")
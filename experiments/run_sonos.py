@@ -21,6 +21,7 @@ import sys
 import os
 import argparse
 import logging
+import math
 import time
 import csv
 from datetime import datetime
@@ -37,6 +38,8 @@ from configs.sonos import (
 )
 from configs.resource_types import InstrumentType
 from configs import sonos_settings as SETTINGS
+from experiments.cell_init_controller import CellInitController
+from experiments.sonos_strategies import make_strategy
 
 
 def seconds_to_ppg_width(seconds: float) -> str:
@@ -72,6 +75,17 @@ class SonosExperiment(ExperimentRunner):
         self.vdd = vdd if vdd is not None else SONOS_DEFAULTS["VDD"]
         self.vcc = vcc if vcc is not None else SONOS_DEFAULTS["VCC"]
         self._mapping = mapping or SETTINGS.cell_init_pulse_time
+        # An explicit mapping keeps the mapping-only cell_init
+        self._cell_init_controller: Optional[CellInitController] = None
+        if mapping is None and SETTINGS.CELL_INIT_CONTROLLER == "model":
+            self._cell_init_controller = CellInitController(
+                self._mapping,
+                max_pulse=SETTINGS.WR_ENB_MAX_PULSE_SEC,
+                min_pulse=SETTINGS.CELL_INIT_MIN_PULSE_SEC,
+                max_step_ratio=SETTINGS.CELL_INIT_MAX_STEP_RATIO,
+                forgetting=SETTINGS.CELL_INIT_FORGETTING,
+                allow_erase=SETTINGS.CELL_INIT_ALLOW_ERASE,
+            )
         self._max_pulse_sec = SETTINGS.WR_ENB_MAX_PULSE_SEC
         self._target_error = SETTINGS.TARGET_ERROR
         self._imax = SETTINGS.IMAX
@@ -100,8 +114,7 @@ class SonosExperiment(ExperimentRunner):
         self.logger.info("=" * 60)
 
         iv = self._get_instrument(InstrumentType.IV5270B)
-        used_channels = {cfg.channel for name, cfg in SONOS_TERMINALS.items()
-                        if cfg.instrument == InstrumentType.IV5270B and cfg.channel > 0}
+        used_channels = {ch for ch in self.config_index.channels_of(InstrumentType.IV5270B) if ch > 0}
         all_channels = list(range(1, 9))
         iv.enable_channels(all_channels)
         unused = [ch for ch in all_channels if ch not in used_channels]
@@ -111,6 +124,7 @@ class SonosExperiment(ExperimentRunner):
         self._configure_voltage_sources("PROGRAM")  # Start in program for cell_init if needed
         self.set_terminal_current("PROG_IN", 0.0)
         self.set_terminal_current("IREFP", 0.0)
+        self.apply_measurement_profiles()
         self.logger.info("=" * 60)
         self.logger.info("INITIALIZATION COMPLETE")
         self.logger.info("=" * 60)
@@ -185,14 +199,19 @@ class SonosExperiment(ExperimentRunner):
         """Raw spot current measurement on ICELLMEAS (assumes mode already set)."""
         iv = self._get_instrument(InstrumentType.IV5270B)
         cfg = self.get_terminal_config("ICELLMEAS")
+        self.prepare_measurement_range("ICELLMEAS")
         iv.set_measurement_mode(1, [cfg.channel])
         iv.execute_measurement()
         data = iv.read_data()
+        if self.check_range_overflow("ICELLMEAS", data):
+            iv.execute_measurement()
+            data = iv.read_data()
         try:
             current = float(data.split("I")[1].strip())
         except (IndexError, ValueError):
             current = 0.0
             self.logger.warning(f"Could not parse ICELLMEAS: {data}")
+        self.note_measurement("ICELLMEAS", current)
         self.logger.info(f"ICELLMEAS {label}: {current} A")
         return current
 
@@ -214,36 +233,135 @@ class SonosExperiment(ExperimentRunner):
         if not self.test_mode:
             time.sleep(width_sec + SETTINGS.POST_PULSE_DELAY)
 
+    def capture_icellmeas_transient(self, pulse_width_seconds: float,
+                                    interval: float = None,
+                                    tail_seconds: float = None):
+        """
+        Sample ICELLMEAS (5270B MM 10) through and after one WR_ENB pulse in
+        program mode, instead of a single spot after the pulse. Each capture
+        is kept in the run's "transients" sample store
+        (measurements/sonos_<timestamp>_transients.kls, read with
+        instruments.sample_store.read_samples).
+
+        Args:
+            pulse_width_seconds: WR_ENB pulse width (capped like trigger_wr_enb)
+            interval: Sampling interval in seconds (default TRANSIENT_SAMPLE_INTERVAL)
+            tail_seconds: Time sampled after the pulse (default TRANSIENT_TAIL_SEC)
+
+        Returns:
+            NumPy array (points, 2): time in seconds, ICELLMEAS in A (a view
+            of the stored capture)
+        """
+        if interval is None:
+            interval = SETTINGS.TRANSIENT_SAMPLE_INTERVAL
+        if tail_seconds is None:
+            tail_seconds = SETTINGS.TRANSIENT_TAIL_SEC
+        width_sec = min(max(0.0, pulse_width_seconds), self._max_pulse_sec)
+        points = max(1, math.ceil((width_sec + tail_seconds) / interval))
+        self.set_mode_program()
+        if not self.test_mode:
+            time.sleep(SETTINGS.SETTLING_TIME)
+        return self.capture_transient(
+            ["ICELLMEAS"], interval, points,
+            trigger=lambda: self.trigger_wr_enb(width_sec),
+            store=self.open_sample_store("transients", ["t", "ICELLMEAS"]),
+            label=f"WR_ENB {width_sec:g}s",
+        )
+
     # -------------------------------------------------------------------------
     # cell_init: set ICELLMEAS to target within TARGET_ERROR (prog_in=0, WR_ENB)
     # -------------------------------------------------------------------------
 
-    def cell_init(self, target_current: float, target_error: float = None) -> None:
+    def cell_init(self, target_current: float, target_error: float = None,
+                  allow_erase: bool = None) -> int:
         """
-        Set PROG_IN=0, use program mode, and pulse WR_ENB (width from mapping)
-        until |ICELLMEAS - target_current| <= target_error.
-        Pulse width from mapping(icellmeas_measured, target_current), capped at 100 ms.
+        Set PROG_IN=0, use program mode, and pulse WR_ENB until
+        |ICELLMEAS - target_current| <= target_error.
+        Pulse width from the cell_init controller (learned response model) or,
+        without one, from mapping(icellmeas_measured, target_current); capped at 100 ms.
+
+        Args:
+            target_current: Target ICELLMEAS (A)
+            target_error: Tolerance (A; default TARGET_ERROR)
+            allow_erase: Use erase pulses while ICELLMEAS is below target
+                         (default CELL_INIT_ALLOW_ERASE)
+
+        Returns:
+            Number of pulses used.
         """
         if target_error is None:
             target_error = self._target_error
+        if allow_erase is None:
+            allow_erase = SETTINGS.CELL_INIT_ALLOW_ERASE
         self.set_terminal_current("PROG_IN", 0.0)
         self.set_mode_program()
         if not self.test_mode:
             time.sleep(SETTINGS.SETTLING_TIME)
         max_iter = getattr(SETTINGS, "CELL_INIT_MAX_ITERATIONS", 200)
+        if self._cell_init_controller is not None:
+            return self._cell_init_model(target_current, target_error, max_iter, allow_erase)
         for iteration in range(max_iter):
             ic = self._measure_icellmeas_current(f"cell_init iter {iteration+1}")
             err = abs(ic - target_current)
             if err <= target_error:
                 self.logger.info(f"cell_init converged to {target_current} A (error {err})")
-                return
+                return iteration
             pulse_sec = self._mapping(ic, target_current)
             pulse_sec = min(pulse_sec, self._max_pulse_sec)
             if pulse_sec <= 0:
                 self.logger.warning("cell_init mapping returned 0; stopping")
-                return
-            self.trigger_wr_enb(pulse_sec)
+                return iteration
+            if allow_erase and ic < target_current:
+                self._erase_pulse(pulse_sec)
+            else:
+                self.trigger_wr_enb(pulse_sec)
         self.logger.warning(f"cell_init did not converge within {max_iter} iterations")
+        return max_iter
+
+    def _erase_pulse(self, pulse_sec: float) -> None:
+        """One WR_ENB pulse in erase mode, back in program mode afterwards."""
+        self.set_mode_erase()
+        if not self.test_mode:
+            time.sleep(SETTINGS.SETTLING_TIME)
+        self.trigger_wr_enb(pulse_sec)
+        self.set_mode_program()
+        if not self.test_mode:
+            time.sleep(SETTINGS.SETTLING_TIME)
+
+    def _cell_init_model(self, target_current: float, target_error: float, max_iter: int,
+                         allow_erase: bool) -> int:
+        """cell_init loop driven by the CellInitController (program mode on entry)."""
+        controller = self._cell_init_controller
+        ic = self._measure_icellmeas_current("cell_init iter 1")
+        pulses = 0
+        while True:
+            err = abs(ic - target_current)
+            if err <= target_error:
+                self.logger.info(f"cell_init converged to {target_current} A (error {err}) "
+                                 f"in {pulses} pulses")
+                break
+            if pulses >= max_iter:
+                self.logger.warning(f"cell_init did not converge within {max_iter} iterations")
+                break
+            mode, pulse_sec, from_model = controller.propose(ic, target_current, allow_erase)
+            if pulse_sec <= 0:
+                self.logger.warning("cell_init: ICELLMEAS below target and erase pulses "
+                                    "are off; stopping")
+                break
+            self.logger.debug(f"cell_init: {mode} pulse {pulse_sec * 1e3:.3f} ms "
+                              f"({'model' if from_model else 'mapping'})")
+            if mode == "ERASE":
+                self._erase_pulse(pulse_sec)
+            else:
+                self.trigger_wr_enb(pulse_sec)
+            pulses += 1
+            ic_after = self._measure_icellmeas_current(f"cell_init iter {pulses + 1}")
+            controller.observe(mode, pulse_sec, ic, ic_after)
+            ic = ic_after
+        controller.finish(pulses)
+        self.logger.info(f"cell_init pulses: {pulses} (mean {controller.mean_pulses:.1f} "
+                         f"over {len(controller.pulse_counts)} calls)")
+        return pulses
 
     # -------------------------------------------------------------------------
     # CSV
@@ -261,11 +379,13 @@ class SonosExperiment(ExperimentRunner):
         csv_filename = os.path.join(measurements_dir, f"sonos_{test_type}_{timestamp}.csv")
         csv_latest = os.path.join(measurements_dir, "sonos.csv")
         self._csv_file = open(csv_filename, "w", newline="", encoding="utf-8")
+        self.register_run_file(csv_filename, "csv")
         self._csv_writer = csv.writer(self._csv_file)
         self._csv_file_latest = open(csv_latest, "w", newline="", encoding="utf-8")
         self._csv_writer_latest = csv.writer(self._csv_file_latest)
         headers = [
-            "TEST_TYPE", "PHASE", "STEP", "PARAM", "ICELLMEAS_BEFORE", "ICELLMEAS_AFTER"
+            "TEST_TYPE", "PHASE", "STEP", "PARAM", "ICELLMEAS_BEFORE", "ICELLMEAS_AFTER",
+            "STRATEGY",
         ]
         self._csv_writer.writerow(headers)
         self._csv_file.flush()
@@ -275,13 +395,13 @@ class SonosExperiment(ExperimentRunner):
         self.logger.info(f"CSV: {csv_filename}")
 
     def _write_row(self, test_type: str, phase: str, step: int, param: str,
-                   ic_before: float, ic_after: float) -> None:
+                   ic_before: float, ic_after: float, strategy: str = "LIST") -> None:
         if not self._csv_initialized:
             self._initialize_csv_output(test_type)
         # In test mode use dummy values so CSV structure is valid (same as run_programmer)
         if self.test_mode:
             ic_before, ic_after = 1e-12, 1e-12
-        row = [test_type, phase, step, param, ic_before, ic_after]
+        row = [test_type, phase, step, param, ic_before, ic_after, strategy]
         self._csv_writer.writerow(row)
         self._csv_file.flush()
         self._csv_writer_latest.writerow(row)
@@ -367,14 +487,31 @@ class SonosExperiment(ExperimentRunner):
     def run_prog_actual(self) -> dict:
         """
         PROG_ACTUAL: WR_ENB constant (e.g. 100 ms). cell_init(IMAX), program mode,
-        steps with list of PROG_IN until ICELLMEAS <= IMIN. Then cell_init(IMIN),
-        erase mode, steps until IMAX or stopped (same constant WR_ENB).
+        steps over the PROG_IN list (visited per PROG_ACTUAL_STRATEGY) until
+        ICELLMEAS <= IMIN. Then cell_init(IMIN), erase mode, steps until IMAX,
+        a stall (PROG_ACTUAL_STALL_STEPS) or the step limit (same constant WR_ENB).
+        With PROG_ACTUAL_REUSE_BEFORE, each step's "before" is the previous
+        step's "after" instead of a new measurement.
+
+        A visit to a lower PROG_IN than the previous visit is preceded by
+        cell_init back to the ICELLMEAS the nearest lower visit started from
+        (IMAX if none), since the pulses in between have programmed the cell
+        further. That cell_init uses erase pulses whatever
+        CELL_INIT_ALLOW_ERASE says, as it has to raise ICELLMEAS.
         """
         self._initialize_csv_output("PROG_ACTUAL")
         prog_in_list = list(SETTINGS.PROG_ACTUAL_PROG_IN_LIST)
         wr_enb_sec = SETTINGS.PROG_ACTUAL_WR_ENB_MS / 1000.0
         wr_enb_sec = min(wr_enb_sec, self._max_pulse_sec)
-        results = {"test_type": "PROG_ACTUAL", "phases": [], "measurements": []}
+        strategy = make_strategy(
+            SETTINGS.PROG_ACTUAL_STRATEGY, prog_in_list,
+            stride=SETTINGS.PROG_ACTUAL_COARSE_STRIDE,
+            refine_threshold=SETTINGS.PROG_ACTUAL_REFINE_THRESHOLD,
+            response_threshold=SETTINGS.PROG_ACTUAL_RESPONSE_THRESHOLD,
+        )
+        reuse_before = SETTINGS.PROG_ACTUAL_REUSE_BEFORE
+        results = {"test_type": "PROG_ACTUAL", "strategy": strategy.name,
+                   "phases": [], "measurements": []}
 
         # Phase 1: program
         self.logger.info("=" * 60)
@@ -382,11 +519,29 @@ class SonosExperiment(ExperimentRunner):
         self.cell_init(self._imax, self._target_error)
         self.set_mode_program()
         step = 0
-        for prog_in in prog_in_list:
+        ic_after = None
+        last_index = None
+        start_currents: Dict[int, float] = {}  # Visited index -> ICELLMEAS before its pulse
+        while True:
+            index = strategy.propose()
+            if index is None:
+                break
+            prog_in = prog_in_list[index]
+            if last_index is not None and index < last_index:
+                lower = [i for i in start_currents if i < index]
+                target = start_currents[max(lower)] if lower else self._imax
+                self.logger.info(f"PROG_IN={prog_in}A visited after PROG_IN={prog_in_list[last_index]}A; "
+                                 f"cell_init({target}) first")
+                self.cell_init(target, self._target_error, allow_erase=True)
+                self.set_mode_program()
+                ic_after = None
             self.set_terminal_current("PROG_IN", prog_in)
             if not self.test_mode:
                 time.sleep(SETTINGS.SETTLING_TIME)
-            ic_before = self.measure_icellmeas_in_program_mode("before")
+            if reuse_before and ic_after is not None:
+                ic_before = ic_after
+            else:
+                ic_before = self.measure_icellmeas_in_program_mode("before")
             self.set_mode_program()
             if not self.test_mode:
                 time.sleep(SETTINGS.SETTLING_TIME)
@@ -394,7 +549,11 @@ class SonosExperiment(ExperimentRunner):
             ic_after = self.measure_icellmeas_in_program_mode("after")
             self.set_mode_program()
             step += 1
-            self._write_row("PROG_ACTUAL", "PROGRAM", step, f"PROG_IN={prog_in}A", ic_before, ic_after)
+            last_index = index
+            start_currents[index] = ic_before
+            strategy.observe(index, ic_before, ic_after)
+            self._write_row("PROG_ACTUAL", "PROGRAM", step, f"PROG_IN={prog_in}A",
+                            ic_before, ic_after, strategy.name)
             results["measurements"].append({
                 "phase": "PROGRAM", "step": step, "param": prog_in,
                 "ICELLMEAS_BEFORE": ic_before, "ICELLMEAS_AFTER": ic_after,
@@ -411,8 +570,13 @@ class SonosExperiment(ExperimentRunner):
         self.set_terminal_current("PROG_IN", 0.0)
         self.set_mode_erase()
         step = 0
+        ic_after = None
+        stalled = 0
         while True:
-            ic_before = self.measure_icellmeas_in_program_mode("before")
+            if reuse_before and ic_after is not None:
+                ic_before = ic_after
+            else:
+                ic_before = self.measure_icellmeas_in_program_mode("before")
             self.set_mode_erase()
             if not self.test_mode:
                 time.sleep(SETTINGS.SETTLING_TIME)
@@ -420,7 +584,7 @@ class SonosExperiment(ExperimentRunner):
             ic_after = self.measure_icellmeas_in_program_mode("after")
             self.set_mode_erase()
             step += 1
-            self._write_row("PROG_ACTUAL", "ERASE", step, "WR_ENB_const", ic_before, ic_after)
+            self._write_row("PROG_ACTUAL", "ERASE", step, "WR_ENB_const", ic_before, ic_after, "CONST")
             results["measurements"].append({
                 "phase": "ERASE", "step": step, "param": wr_enb_sec,
                 "ICELLMEAS_BEFORE": ic_before, "ICELLMEAS_AFTER": ic_after,
@@ -428,6 +592,16 @@ class SonosExperiment(ExperimentRunner):
             if ic_after >= self._imax:
                 self.logger.info(f"Reached IMAX at step {step}")
                 break
+            # Early termination: ICELLMEAS has stopped rising (not in test mode,
+            # where every reading is 0)
+            if abs(ic_after - ic_before) <= SETTINGS.PROG_ACTUAL_STALL_TOLERANCE * abs(ic_before):
+                stalled += 1
+            else:
+                stalled = 0
+            if (SETTINGS.PROG_ACTUAL_STALL_STEPS and not self.test_mode
+                    and stalled >= SETTINGS.PROG_ACTUAL_STALL_STEPS):
+                self.logger.warning(f"Erase phase stalled for {stalled} steps below IMAX; stopping at step {step}")
+                break
             if step >= 500:  # Safety
                 self.logger.warning("Erase phase step limit reached")
                 break
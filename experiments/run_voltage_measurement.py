@@ -98,7 +98,9 @@ class VoltageMeasurementExperiment(ExperimentRunner):
             - Only current values change during measurement loops
             - All instruments are disabled ONCE at experiment end (in shutdown())
         """
-        super().__init__(COMPUTE_CONFIG, test_mode)
+        # COMPUTE_CONFIG named "VoltageMeasurement", so logs and run index
+        # entries are kept apart from Compute runs
+        super().__init__(COMPUTE_CONFIG._replace(name="VoltageMeasurement"), test_mode)  # type: ignore[attr-defined]
         self.vdd = vdd if vdd is not None else COMPUTE_DEFAULTS["VDD"]
         self.vcc = vcc if vcc is not None else COMPUTE_DEFAULTS["VCC"]
         
@@ -362,6 +364,7 @@ class VoltageMeasurementExperiment(ExperimentRunner):
         filepath = os.path.join(measurements_dir, filename)
         
         # Write CSV file
+        self.register_run_file(filepath, "csv")
         with open(filepath, 'w', newline='') as csvfile:
             writer = csv.writer(csvfile)
             
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+PROG_IN Search Strategies for Sonos PROG_ACTUAL
+===============================================
+
+Decide which entries of PROG_ACTUAL_PROG_IN_LIST the program phase of
+`SonosExperiment.run_prog_actual` visits. Each visit costs a WR_ENB pulse plus
+a measurement, so the goal is to locate where the cell's per-pulse response
+changes with fewer visits than a full sweep.
+
+The response of a visit is the relative drop in ICELLMEAS over its pulse,
+(before - after) / before.
+
+Strategies:
+    SWEEP      every entry in order (the original behaviour)
+    ADAPTIVE   every stride-th entry, then the midpoints of neighbouring
+               visits whose responses differ by more than refine_threshold
+    BISECTION  the first entry whose response reaches response_threshold,
+               assuming the response grows with PROG_IN
+
+A strategy proposes list indices via propose() and is told the result via
+observe(); the caller still stops the phase when ICELLMEAS reaches IMIN.
+
+ADAPTIVE and BISECTION treat the response as a function of PROG_IN alone,
+but every pulse programs the cell further. They can propose a lower index
+than the previous visit, so the caller re-initialises the cell (cell_init)
+before such a visit; SWEEP never goes back.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+def pulse_response(before: float, after: float) -> float:
+    """Relative ICELLMEAS drop over one pulse (0.0 if before is not positive)."""
+    return (before - after) / before if before > 0 else 0.0
+
+
+class ProgInStrategy:
+    """Base class: visits every entry in order."""
+
+    name = "SWEEP"
+
+    def __init__(self, values: Sequence[float]):
+        self.values = list(values)
+        self.responses: Dict[int, float] = {}
+        self._next = 0
+
+    def propose(self) -> Optional[int]:
+        """Index of the next PROG_IN to visit, or None when done."""
+        while self._next < len(self.values) and self._next in self.responses:
+            self._next += 1
+        return self._next if self._next < len(self.values) else None
+
+    def observe(self, index: int, before: float, after: float) -> None:
+        """Record the measured response at a visited index."""
+        self.responses[index] = pulse_response(before, after)
+
+
+class AdaptiveStrategy(ProgInStrategy):
+    """Coarse stride, refined between visits whose responses differ strongly."""
+
+    name = "ADAPTIVE"
+
+    def __init__(self, values: Sequence[float], stride: int = 3, refine_threshold: float = 0.5):
+        super().__init__(values)
+        self.refine_threshold = refine_threshold
+        n = len(self.values)
+        coarse = list(range(0, n, max(1, stride)))
+        if n and coarse[-1] != n - 1:
+            coarse.append(n - 1)
+        self._coarse = coarse
+        self._intervals: List[Tuple[int, int]] = []
+
+    def _differs(self, a: int, b: int) -> bool:
+        ra, rb = self.responses[a], self.responses[b]
+        return abs(ra - rb) > self.refine_threshold * max(abs(ra), abs(rb), 1e-12)
+
+    def _check(self, a: int, b: int) -> None:
+        if b - a > 1 and self._differs(a, b):
+            self._intervals.append((a, b))
+
+    def propose(self) -> Optional[int]:
+        while self._intervals:
+            a, b = self._intervals.pop()
+            mid = (a + b) // 2
+            if mid not in self.responses:
+                return mid
+        while self._coarse:
+            index = self._coarse.pop(0)
+            if index not in self.responses:
+                return index
+        return None
+
+    def observe(self, index: int, before: float, after: float) -> None:
+        super().observe(index, before, after)
+        visited = sorted(self.responses)
+        pos = visited.index(index)
+        if pos > 0:
+            self._check(visited[pos - 1], index)
+        if pos + 1 < len(visited):
+            self._check(index, visited[pos + 1])
+
+
+class BisectionStrategy(ProgInStrategy):
+    """Binary search for the first PROG_IN whose response reaches response_threshold."""
+
+    name = "BISECTION"
+
+    def __init__(self, values: Sequence[float], response_threshold: float = 0.05):
+        super().__init__(values)
+        self.response_threshold = response_threshold
+        self._lo = 0
+        self._hi = len(self.values) - 1
+        self.found: Optional[int] = None
+
+    def propose(self) -> Optional[int]:
+        if self.found is not None or self._lo > self._hi:
+            return None
+        mid = (self._lo + self._hi) // 2
+        if mid in self.responses:
+            self._narrow(mid)
+            return self.propose()
+        return mid
+
+    def _narrow(self, index: int) -> None:
+        if self.responses[index] >= self.response_threshold:
+            if index == self._lo:
+                self.found = index
+            self._hi = index
+        else:
+            self._lo = index + 1
+        if self._lo == self._hi and self._lo in self.responses:
+            self.found = self._lo if self.responses[self._lo] >= self.response_threshold else None
+            self._lo = self._hi + 1
+
+    def observe(self, index: int, before: float, after: float) -> None:
+        super().observe(index, before, after)
+        self._narrow(index)
+
+
+STRATEGIES = {
+    "sweep": ProgInStrategy,
+    "adaptive": AdaptiveStrategy,
+    "bisection": BisectionStrategy,
+}
+
+
+def make_strategy(name: str, values: Sequence[float], **options) -> ProgInStrategy:
+    """
+    Build a strategy by name ("sweep", "adaptive", "bisection").
+
+    options are passed to the strategy (stride / refine_threshold for
+    adaptive, response_threshold for bisection) and ignored by the others.
+    """
+    try:
+        cls = STRATEGIES[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown PROG_IN strategy {name!r}; expected one of {sorted(STRATEGIES)}")
+    if cls is AdaptiveStrategy:
+        return cls(values, stride=options.get("stride", 3),
+                   refine_threshold=options.get("refine_threshold", 0.5))
+    if cls is BisectionStrategy:
+        return cls(values, response_threshold=options.get("response_threshold", 0.05))
+    return cls(values)
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Real-Time Step Scheduler
+========================
+
+Keeps a closed loop (e.g. `experiments/run_kalman.py`) on the discrete-time
+step its model assumes (kalman_settings.TIME_STEP):
+
+- "pace":    wait until a monotonic-clock deadline (start + k * period) at
+             the end of each step. Deadlines are absolute, so waits do not
+             accumulate drift; after an overrun the schedule restarts from
+             the late step instead of bursting to catch up.
+- "rescale": run as fast as the hardware allows and report the achieved
+             period (smoothed), so time-dependent quantities can be scaled
+             to it.
+- "off":     only measure.
+
+Achieved periods, jitter (deviation from the target period) and overruns are
+tracked in every mode.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import time
+from typing import Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+PACE = "pace"
+RESCALE = "rescale"
+OFF = "off"
+MODES = (PACE, RESCALE, OFF)
+
+
+class StepScheduler:
+    """
+    Paces and/or times loop steps against a target period.
+
+    Args:
+        period: Target step period in seconds.
+        mode: PACE, RESCALE or OFF.
+        smoothing: EMA weight of the newest step in achieved_period (0-1].
+        test_mode: When True, pacing waits are skipped; the periods tracked are
+                   the ones actually achieved.
+    """
+
+    def __init__(self, period: float, mode: str = OFF, smoothing: float = 0.2,
+                 test_mode: bool = False):
+        if mode not in MODES:
+            raise ValueError(f"Unknown step scheduler mode {mode!r}; expected one of {MODES}")
+        if period <= 0:
+            raise ValueError(f"Step period must be positive, got {period}")
+        self.period = period
+        self.mode = mode
+        self.smoothing = smoothing
+        self.test_mode = test_mode
+
+        self.achieved_period: Optional[float] = None  # EMA of step periods
+        self.steps = 0
+        self.overruns = 0
+        self._deadline: Optional[float] = None
+        self._last: Optional[float] = None
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._max_jitter = 0.0
+
+    def start(self) -> None:
+        """Start the schedule; the first step ends one period from now."""
+        now = time.monotonic()
+        self._last = now
+        self._deadline = now + self.period
+
+    def end_step(self) -> float:
+        """
+        Mark the end of a step (waiting for its deadline when pacing).
+
+        Returns:
+            The step's achieved period in seconds.
+        """
+        if self._last is None:
+            self.start()
+
+        now = time.monotonic()
+        if now > self._deadline:
+            self.overruns += 1
+            self._deadline = now  # Restart the schedule from this late step
+        elif self.mode == PACE:
+            if not self.test_mode:
+                time.sleep(self._deadline - now)
+                now = time.monotonic()
+        self._deadline += self.period
+
+        achieved = now - self._last
+        self._last = now
+        self.steps += 1
+        self._sum += achieved
+        self._sum_sq += achieved * achieved
+        self._max_jitter = max(self._max_jitter, abs(achieved - self.period))
+        if self.achieved_period is None:
+            self.achieved_period = achieved
+        else:
+            self.achieved_period += self.smoothing * (achieved - self.achieved_period)
+        return achieved
+
+    def summary(self) -> Dict[str, float]:
+        """Return target/mean period, jitter (std and max |period - target|) and overruns."""
+        n = self.steps
+        mean = self._sum / n if n else 0.0
+        var = max(self._sum_sq / n - mean * mean, 0.0) if n else 0.0
+        return {
+            "mode": self.mode,
+            "target_period": self.period,
+            "steps": n,
+            "mean_period": mean,
+            "jitter_std": math.sqrt(var),
+            "jitter_max": self._max_jitter,
+            "overruns": self.overruns,
+        }
+
+    def log_summary(self, log: logging.Logger) -> None:
+        """Log the summary in milliseconds."""
+        s = self.summary()
+        log.info(f"Step timing ({s['mode']}): target={s['target_period'] * 1e3:.3f} ms, "
+                 f"mean={s['mean_period'] * 1e3:.3f} ms, jitter std={s['jitter_std'] * 1e3:.3f} ms, "
+                 f"max={s['jitter_max'] * 1e3:.3f} ms, overruns={s['overruns']}/{s['steps']}")
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Switch Pattern Sequencer
+========================
+
+Walks the E5250A switch matrix through a sequence of 36-output patterns and
+takes a measurement at each one. Used by `experiments/run_big_kalman.py`.
+
+- When the caller lets the sequencer choose the order, patterns are ordered to
+  minimize relay toggles: reflected Gray-code order when the patterns are every
+  combination of the outputs that vary, otherwise greedy nearest-neighbour by
+  Hamming distance.
+- Each step sends only the changed outputs (SW_E5250A.apply_pattern).
+- The relay settling time is waited only when a changed output is one that
+  affects the measurement (`sensitive_outputs`).
+- Generators are consumed lazily in the given order (no reordering).
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import (
+    Any, Callable, Dict, Iterable, List, Optional, Sequence, Union,
+)
+
+from instruments.sw_e5250a import NUM_OUTPUTS, BREAK_BEFORE_MAKE
+
+
+logger = logging.getLogger(__name__)
+
+# A pattern is either NUM_OUTPUTS booleans (output 1 first) or an int bitmask
+# (bit 0 = output 1; set bit = VCC).
+Pattern = Union[Sequence[bool], int]
+
+# Greedy nearest-neighbour ordering is O(n^2); beyond this many patterns the
+# given order is kept.
+MAX_REORDER_PATTERNS = 4096
+
+
+def pattern_to_mask(pattern: Pattern) -> int:
+    """Convert a pattern (bool list or int bitmask) to an int bitmask."""
+    if isinstance(pattern, int):
+        if not 0 <= pattern < (1 << NUM_OUTPUTS):
+            raise ValueError(f"pattern bitmask must fit in {NUM_OUTPUTS} bits, got {pattern:#x}")
+        return pattern
+    if len(pattern) != NUM_OUTPUTS:
+        raise ValueError(f"pattern length must be {NUM_OUTPUTS}, got {len(pattern)}")
+    mask = 0
+    for i, to_vcc in enumerate(pattern):
+        if to_vcc:
+            mask |= 1 << i
+    return mask
+
+
+def mask_to_pattern(mask: int) -> List[bool]:
+    """Convert an int bitmask to a list of NUM_OUTPUTS booleans (output 1 first)."""
+    return [bool(mask >> i & 1) for i in range(NUM_OUTPUTS)]
+
+
+def _gray_code_order(masks: List[int]) -> Optional[List[int]]:
+    """
+    Return indices of masks in reflected Gray-code order, or None if the masks
+    are not exactly every combination of the bits that vary between them.
+    """
+    base = masks[0]
+    varying = 0
+    for m in masks:
+        varying |= m ^ base
+    bits = [b for b in range(NUM_OUTPUTS) if varying >> b & 1]
+    if len(masks) != 1 << len(bits):
+        return None
+    fixed = base & ~varying
+    position = {}
+    for idx, m in enumerate(masks):
+        if m & ~varying != fixed or m in position:
+            return None
+        position[m] = idx
+
+    order = []
+    for k in range(len(masks)):
+        gray = k ^ (k >> 1)
+        m = fixed
+        for j, b in enumerate(bits):
+            if gray >> j & 1:
+                m |= 1 << b
+        order.append(position[m])
+    # Start the Gray walk from whichever pattern was given first
+    start = order.index(0)
+    return order[start:] + order[:start]
+
+
+def _nearest_neighbour_order(masks: List[int]) -> List[int]:
+    """Greedy Hamming-distance ordering starting from the first pattern."""
+    remaining = list(range(1, len(masks)))
+    order = [0]
+    current = masks[0]
+    while remaining:
+        best_pos = min(range(len(remaining)),
+                       key=lambda p: bin(current ^ masks[remaining[p]]).count("1"))
+        idx = remaining.pop(best_pos)
+        order.append(idx)
+        current = masks[idx]
+    return order
+
+
+def order_patterns(masks: Sequence[int]) -> List[int]:
+    """
+    Choose a visiting order for masks that minimizes relay toggles.
+
+    Returns:
+        Indices into masks in visiting order.
+    """
+    masks = list(masks)
+    if len(masks) <= 2:
+        return list(range(len(masks)))
+    gray = _gray_code_order(masks)
+    if gray is not None:
+        return gray
+    if len(masks) > MAX_REORDER_PATTERNS:
+        logger.info(f"{len(masks)} patterns exceed MAX_REORDER_PATTERNS; keeping given order")
+        return list(range(len(masks)))
+    return _nearest_neighbour_order(masks)
+
+
+class SwitchPatternSequencer:
+    """
+    Applies switch patterns one after another and measures at each.
+
+    Args:
+        switch: SW_E5250A instance.
+        measure: Called after each pattern is applied and settled; returns a
+                 dict of measured values for that pattern.
+        settle_time: Relay settling time in seconds.
+        sensitive_outputs: 1-based outputs whose switching affects the
+                           measurement. None = every output does.
+        order: Relay switching order passed to SW_E5250A.apply_pattern().
+        test_mode: When True, settling waits are skipped.
+    """
+
+    def __init__(self, switch, measure: Callable[[], Dict[str, Any]],
+                 settle_time: float = 0.0,
+                 sensitive_outputs: Optional[Iterable[int]] = None,
+                 order: str = BREAK_BEFORE_MAKE,
+                 test_mode: bool = False):
+        self.switch = switch
+        self.measure = measure
+        self.settle_time = settle_time
+        self.order = order
+        self.test_mode = test_mode
+        if sensitive_outputs is None:
+            self._sensitive_mask = (1 << NUM_OUTPUTS) - 1
+        else:
+            self._sensitive_mask = sum(1 << (i - 1) for i in set(sensitive_outputs))
+
+        # Statistics of the last run()
+        self.patterns_applied = 0
+        self.relay_toggles = 0
+        self.settles = 0
+        self.elapsed = 0.0
+
+    @property
+    def patterns_per_second(self) -> float:
+        """Pattern throughput of the last run()."""
+        return self.patterns_applied / self.elapsed if self.elapsed > 0 else 0.0
+
+    def run(self, patterns: Iterable[Pattern], reorder: bool = True) -> List[Dict[str, Any]]:
+        """
+        Apply each pattern, settle if needed, and measure.
+
+        Args:
+            patterns: List of patterns, or any iterable (consumed lazily in order).
+            reorder: Allow reordering to minimize relay toggles (lists only).
+
+        Returns:
+            One dict per pattern, in the order applied, with keys INDEX (position
+            in the input), PATTERN (hex bitmask), TOGGLES, SETTLED plus the
+            values returned by measure().
+        """
+        if isinstance(patterns, Sequence) and reorder:
+            masks = [pattern_to_mask(p) for p in patterns]
+            steps = ((idx, masks[idx]) for idx in order_patterns(masks))
+        else:
+            steps = ((idx, pattern_to_mask(p)) for idx, p in enumerate(patterns))
+
+        self.patterns_applied = 0
+        self.relay_toggles = 0
+        self.settles = 0
+        results = []
+        start = time.perf_counter()
+
+        for idx, mask in steps:
+            changed = self.switch.apply_pattern(mask_to_pattern(mask), order=self.order)
+            changed_mask = sum(1 << (i - 1) for i in changed)
+            settled = bool(changed_mask & self._sensitive_mask) and self.settle_time > 0
+            if settled:
+                self.settles += 1
+                if not self.test_mode:
+                    time.sleep(self.settle_time)
+
+            row = {
+                "INDEX": idx,
+                "PATTERN": f"{mask:#011x}",
+                "TOGGLES": len(changed),
+                "SETTLED": settled,
+            }
+            row.update(self.measure())
+            results.append(row)
+
+            self.patterns_applied += 1
+            self.relay_toggles += len(changed)
+
+        self.elapsed = time.perf_counter() - start
+        logger.info(f"Switch sequence: {self.patterns_applied} patterns, "
+                    f"{self.relay_toggles} relay toggles, {self.settles} settles, "
+                    f"{self.elapsed:.3f} s ({self.patterns_per_second:.1f} patterns/s)")
+        return results
@@ -16,13 +16,32 @@ Instruments:
 """
 
 from .base import InstrumentBase
-from .ct_53230a import CT53230A
-from .iv_4156b import IV4156B
-from .iv_5270b import IV5270B
-from .pg_81104a import PG81104A
-from .sr570 import SR570
-from .sr560 import SR560
-from .sw_e5250a import SW_E5250A
+
+# Driver classes are imported on first access (PEP 562), so an experiment
+# only loads the drivers of the instruments it uses
+_LAZY_ATTRIBUTES = {
+    'CT53230A': '.ct_53230a',
+    'IV4156B': '.iv_4156b',
+    'IV5270B': '.iv_5270b',
+    'PG81104A': '.pg_81104a',
+    'SR570': '.sr570',
+    'SR560': '.sr560',
+    'SW_E5250A': '.sw_e5250a',
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
 
 __all__ = [
     'InstrumentBase',
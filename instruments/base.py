@@ -6,15 +6,23 @@ Provides common functionality for all instrument classes including:
 - TEST_MODE support for logging commands without hardware
 - Error handling with try/except
 - Response logging
+- Command stream recording (instruments/recorder.py)
 - CSV measurement recording
+- Concurrent I/O (submit, and the async awrite/aread/aquery/acall) on a
+  per-instrument worker thread
 """
 
 import os
 import csv
+import functools
 import logging
+import threading
 import time
 from datetime import datetime
-from typing import Optional, Any, Union, List
+from typing import Optional, Any, Callable, Union, List
+
+from . import recorder as command_recorder
+from .command_log import CommandLogWriter
 
 # Global TEST_MODE flag - when True, commands are logged instead of sent
 TEST_MODE = False
@@ -28,6 +36,7 @@ class TimingTracker:
         self.sweep_count: int = 0
         self.sweep_commands = {'WV', 'WI', 'LSV', 'BSV'}  # Sweep commands for 4156B/5270B
         self.sweep_instruments = {'IV4156B', 'IV5270B'}  # Instruments with sweep commands
+        self._lock = threading.Lock()  # Instruments driven concurrently (acall) record from worker threads
     
     def start(self) -> None:
         """Start timing."""
@@ -40,16 +49,17 @@ class TimingTracker:
         if not TEST_MODE:
             return
         
-        self.command_count += 1
-        
-        # Check if this is a sweep command for 4156B or 5270B
-        if instrument_name in self.sweep_instruments:
-            # Check if command starts with a sweep command
-            command_upper = command.strip().upper()
-            for sweep_cmd in self.sweep_commands:
-                if command_upper.startswith(sweep_cmd + ' ') or command_upper == sweep_cmd:
-                    self.sweep_count += 1
-                    break
+        with self._lock:
+            self.command_count += 1
+            
+            # Check if this is a sweep command for 4156B or 5270B
+            if instrument_name in self.sweep_instruments:
+                # Check if command starts with a sweep command
+                command_upper = command.strip().upper()
+                for sweep_cmd in self.sweep_commands:
+                    if command_upper.startswith(sweep_cmd + ' ') or command_upper == sweep_cmd:
+                        self.sweep_count += 1
+                        break
     
     def get_elapsed_time(self) -> float:
         """Get elapsed time in seconds."""
@@ -84,9 +94,8 @@ RESULTS_FILE = os.path.join(MEASUREMENTS_DIR, 'results.csv')
 _current_test_commands_file: Optional[str] = None
 _current_test_commands_file_latest: Optional[str] = None
 
-# Global variable for current instrument command log file (set per experiment)
-_current_instrument_command_log: Optional[str] = None
-_current_instrument_command_log_latest: Optional[str] = None
+# Current structured instrument command log (set per experiment)
+_current_instrument_command_log: Optional[CommandLogWriter] = None
 
 
 def get_test_commands_file() -> str:
@@ -134,46 +143,38 @@ def get_instrument_command_log() -> Optional[str]:
     Get the current instrument command log file path.
     
     Returns:
-        Path to the instrument command log file for the current experiment.
+        Path to the structured command log (.kcl) for the current experiment.
         Returns None if not set.
     """
-    global _current_instrument_command_log
-    return _current_instrument_command_log
+    if _current_instrument_command_log is None:
+        return None
+    return _current_instrument_command_log.path
 
 
-def set_instrument_command_log(file_path: str, latest_file_path: str = None) -> None:
+def set_instrument_command_log(file_path: str) -> None:
     """
-    Set the instrument command log file path for the current experiment.
+    Set the instrument command log for the current experiment.
     
-    This should be called at the start of each experiment.
-    Any existing file at this path will be overwritten.
+    This should be called at the start of each experiment. The log is the
+    structured binary format of instruments/command_log.py (file_path plus
+    .kcs/.kci files next to it); any existing log at this path is overwritten.
+    Read it with scripts/query_command_log.py.
     
     Args:
-        file_path: Path to the instrument command log file for this experiment
-        latest_file_path: Optional path to latest file (overwrites each run)
+        file_path: Path to the command log (.kcl) for this experiment
     """
-    global _current_instrument_command_log, _current_instrument_command_log_latest
-    _current_instrument_command_log = file_path
-    _current_instrument_command_log_latest = latest_file_path
-    # Ensure the directory exists
+    global _current_instrument_command_log
     ensure_directories()
-    # Remove old file if it exists (start fresh for each experiment)
-    if os.path.exists(file_path):
-        os.remove(file_path)
-    # Write header to timestamped file
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(f"# Instrument Command Log\n")
-        f.write(f"# Format: [timestamp] [instrument] [command]\n")
-        f.write(f"# Errors are marked with [ERROR] prefix\n\n")
-    # Write header to latest file if provided
-    if latest_file_path:
-        if os.path.exists(latest_file_path):
-            os.remove(latest_file_path)
-        with open(latest_file_path, 'w', encoding='utf-8') as f:
-            f.write(f"# Instrument Command Log\n")
-            f.write(f"# Format: [timestamp] [instrument] [command]\n")
-            f.write(f"# Errors are marked with [ERROR] prefix\n")
-            f.write(f"# Latest run (overwrites each time)\n\n")
+    close_instrument_command_log()
+    _current_instrument_command_log = CommandLogWriter(file_path)
+
+
+def close_instrument_command_log() -> None:
+    """Write the index of the current instrument command log and close it."""
+    global _current_instrument_command_log
+    if _current_instrument_command_log is not None:
+        _current_instrument_command_log.close()
+        _current_instrument_command_log = None
 
 
 def set_test_mode(enabled: bool) -> None:
@@ -291,6 +292,15 @@ def format_number(value: Union[int, float],
     return f"{sign}{formatted}"
 
 
+def _serialized(method):
+    """Run an I/O method under the instrument's I/O lock."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._io_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class InstrumentBase:
     """
     Base class for all instrument drivers.
@@ -298,6 +308,12 @@ class InstrumentBase:
     Provides common GPIB communication methods with TEST_MODE support,
     error handling, and measurement logging.
     
+    I/O is serialized per instrument: write/read/query hold an I/O lock, and
+    submit() and the async API (awrite/aread/aquery/acall) run on one worker
+    thread per instrument, so several instruments can be driven concurrently
+    (waiting on the futures, or with asyncio.gather) while existing sync
+    callers keep working unchanged.
+    
     Attributes:
         name: Human-readable instrument name
         resource: PyVISA resource object (None in TEST_MODE)
@@ -324,6 +340,10 @@ class InstrumentBase:
         self._last_command: Optional[str] = None  # Track last command sent to instrument
         self._last_non_error_command: Optional[str] = None  # Track last command that wasn't an error query
         
+        # I/O serialization and the async API's worker thread (created on first use)
+        self._io_lock = threading.RLock()
+        self._executor = None  # ThreadPoolExecutor, created on first submit()
+        
         # Set up logging
         self.logger = logging.getLogger(f'instruments.{name}')
         self.logger.setLevel(logging.DEBUG)
@@ -358,48 +378,54 @@ class InstrumentBase:
         error_patterns = ["SYST:ERR?", "ERR?", ":SYST:ERR?"]
         return any(cmd_upper == pattern or cmd_upper.endswith(pattern) for pattern in error_patterns)
     
-    def _log_command(self, command: str, command_type: str = "WRITE") -> None:
+    def _log_command(self, command: str, command_type: str = "WRITE") -> Any:
         """
-        Log a command to the instrument command log file.
+        Log a command to the instrument command log before it is sent.
+        
+        The record is on disk before the I/O starts, so a hang or a killed
+        process still leaves it in the log; pass the returned token to
+        _log_command_done() when the I/O returns to record its duration.
         
         Args:
-            command: Command string
+            command: Command string ("" for reads)
             command_type: Type of command (WRITE, QUERY, READ)
+        
+        Returns:
+            Token for _log_command_done() (None when not logging)
         """
-        log_file = get_instrument_command_log()
-        if log_file:
+        log = _current_instrument_command_log
+        if log is not None:
             try:
-                timestamp = datetime.now().isoformat()
-                with open(log_file, 'a', encoding='utf-8') as f:
-                    f.write(f"[{timestamp}] {self.name} {command_type}: {command}\n")
+                return log.begin(self.name, command_type, command)
             except Exception as e:
                 # Don't fail if logging fails
                 self.logger.debug(f"Failed to write to command log: {e}")
+        return None
+    
+    def _log_command_done(self, token: Any) -> None:
+        """Record the duration of a command logged by _log_command()."""
+        log = _current_instrument_command_log
+        if log is not None and token is not None:
+            try:
+                log.finish(token)
+            except Exception as e:
+                self.logger.debug(f"Failed to write to command log: {e}")
     
     def _log_error(self, error_msg: str) -> None:
         """
-        Log an error to the instrument command log file.
+        Log an error to the instrument command log.
         
         Args:
             error_msg: Error message to log
         """
-        log_file = get_instrument_command_log()
-        if log_file:
+        log = _current_instrument_command_log
+        if log is not None:
             try:
-                timestamp = datetime.now().isoformat()
-                log_line = f"[{timestamp}] {self.name} [ERROR]: {error_msg}\n"
-                # Write to timestamped file
-                with open(log_file, 'a', encoding='utf-8') as f:
-                    f.write(log_line)
-                # Also write to latest file if it exists
-                global _current_instrument_command_log_latest
-                if _current_instrument_command_log_latest and os.path.exists(_current_instrument_command_log_latest):
-                    with open(_current_instrument_command_log_latest, 'a', encoding='utf-8') as f:
-                        f.write(log_line)
+                log.log(self.name, "ERROR", error_msg)
             except Exception as e:
-                # Don't fail if logging fails
-                self.logger.debug(f"Failed to write error to command log: {e}")
+                self.logger.debug(f"Failed to write to command log: {e}")
     
+    @_serialized
     def write(self, command: str) -> None:
         """
         Send a command to the instrument.
@@ -416,31 +442,37 @@ class InstrumentBase:
         if not self._is_error_query(command):
             self._last_non_error_command = command
         
-        # Log to instrument command log
-        self._log_command(command, "WRITE")
+        if command_recorder.active is not None:
+            command_recorder.active.write(self.name, command)
         
-        if TEST_MODE:
-            # Track command for timing estimation
-            _timing_tracker.record_command(self.name, command)
-            
-            # Log command to test file with improved formatting
-            cmd_line = f"{timestamp} | {self.name} | WRITE | {command}\n"
-            with open(get_test_commands_file(), 'a') as f:
-                f.write(cmd_line)
-            # Also write to latest file if it exists
-            global _current_test_commands_file_latest
-            if _current_test_commands_file_latest and os.path.exists(_current_test_commands_file_latest):
-                with open(_current_test_commands_file_latest, 'a') as f:
+        # Log to instrument command log (duration filled in when the write returns)
+        logged = self._log_command(command, "WRITE")
+        try:
+            if TEST_MODE:
+                # Track command for timing estimation
+                _timing_tracker.record_command(self.name, command)
+                
+                # Log command to test file with improved formatting
+                cmd_line = f"{timestamp} | {self.name} | WRITE | {command}\n"
+                with open(get_test_commands_file(), 'a') as f:
                     f.write(cmd_line)
-            self.logger.debug(f"TEST_MODE WRITE: {command}")
-        else:
-            try:
-                self.resource.write(command)
-                self.logger.debug(f"WRITE: {command}")
-            except Exception as e:
-                self.logger.error(f"Write error for '{command}': {e}")
-                raise
-    
+                # Also write to latest file if it exists
+                global _current_test_commands_file_latest
+                if _current_test_commands_file_latest and os.path.exists(_current_test_commands_file_latest):
+                    with open(_current_test_commands_file_latest, 'a') as f:
+                        f.write(cmd_line)
+                self.logger.debug(f"TEST_MODE WRITE: {command}")
+            else:
+                try:
+                    self.resource.write(command)
+                    self.logger.debug(f"WRITE: {command}")
+                except Exception as e:
+                    self.logger.error(f"Write error for '{command}': {e}")
+                    raise
+        finally:
+            self._log_command_done(logged)
+    
+    @_serialized
     def read(self) -> str:
         """
         Read response from the instrument.
@@ -452,30 +484,37 @@ class InstrumentBase:
         """
         timestamp = datetime.now().isoformat()
         
-        if TEST_MODE:
-            # Track read as a command (1ms overhead)
-            _timing_tracker.record_command(self.name, "READ")
-            
-            response = "TEST_MODE_RESPONSE"
-            cmd_line = f"{timestamp} | {self.name} | READ | {response}\n"
-            with open(get_test_commands_file(), 'a') as f:
-                f.write(cmd_line)
-            # Also write to latest file if it exists
-            global _current_test_commands_file_latest
-            if _current_test_commands_file_latest and os.path.exists(_current_test_commands_file_latest):
-                with open(_current_test_commands_file_latest, 'a') as f:
+        # Log to instrument command log (duration filled in when the read returns)
+        logged = self._log_command("", "READ")
+        try:
+            if TEST_MODE:
+                # Track read as a command (1ms overhead)
+                _timing_tracker.record_command(self.name, "READ")
+                
+                response = "TEST_MODE_RESPONSE"
+                cmd_line = f"{timestamp} | {self.name} | READ | {response}\n"
+                with open(get_test_commands_file(), 'a') as f:
                     f.write(cmd_line)
-            self.logger.debug(f"TEST_MODE READ: {response}")
-            return response
-        else:
-            try:
-                response = self.resource.read()
-                self.logger.debug(f"READ: {response}")
-                return response
-            except Exception as e:
-                self.logger.error(f"Read error: {e}")
-                raise
+                # Also write to latest file if it exists
+                global _current_test_commands_file_latest
+                if _current_test_commands_file_latest and os.path.exists(_current_test_commands_file_latest):
+                    with open(_current_test_commands_file_latest, 'a') as f:
+                        f.write(cmd_line)
+                self.logger.debug(f"TEST_MODE READ: {response}")
+            else:
+                try:
+                    response = self.resource.read()
+                    self.logger.debug(f"READ: {response}")
+                except Exception as e:
+                    self.logger.error(f"Read error: {e}")
+                    raise
+        finally:
+            self._log_command_done(logged)
+        if command_recorder.active is not None:
+            command_recorder.active.read(self.name, response)
+        return response
     
+    @_serialized
     def query(self, command: str) -> str:
         """
         Send a query command and read the response.
@@ -495,33 +534,36 @@ class InstrumentBase:
         if not self._is_error_query(command):
             self._last_non_error_command = command
         
-        # Log to instrument command log
-        self._log_command(command, "QUERY")
-        
-        if TEST_MODE:
-            # Track query as a command (1ms overhead for the write part)
-            # Note: query is write + read, but we count it as one command
-            _timing_tracker.record_command(self.name, command)
-            
-            response = "TEST_MODE_RESPONSE"
-            cmd_line = f"{timestamp} | {self.name} | QUERY | {command} -> {response}\n"
-            with open(get_test_commands_file(), 'a') as f:
-                f.write(cmd_line)
-            # Also write to latest file if it exists
-            global _current_test_commands_file_latest
-            if _current_test_commands_file_latest and os.path.exists(_current_test_commands_file_latest):
-                with open(_current_test_commands_file_latest, 'a') as f:
+        # Log to instrument command log (duration filled in when the query returns)
+        logged = self._log_command(command, "QUERY")
+        try:
+            if TEST_MODE:
+                # Track query as a command (1ms overhead for the write part)
+                # Note: query is write + read, but we count it as one command
+                _timing_tracker.record_command(self.name, command)
+                
+                response = "TEST_MODE_RESPONSE"
+                cmd_line = f"{timestamp} | {self.name} | QUERY | {command} -> {response}\n"
+                with open(get_test_commands_file(), 'a') as f:
                     f.write(cmd_line)
-            self.logger.debug(f"TEST_MODE QUERY: {command} -> {response}")
-            return response
-        else:
-            try:
-                response = self.resource.query(command)
-                self.logger.debug(f"QUERY: {command} -> {response}")
-                return response
-            except Exception as e:
-                self.logger.error(f"Query error for '{command}': {e}")
-                raise
+                # Also write to latest file if it exists
+                global _current_test_commands_file_latest
+                if _current_test_commands_file_latest and os.path.exists(_current_test_commands_file_latest):
+                    with open(_current_test_commands_file_latest, 'a') as f:
+                        f.write(cmd_line)
+                self.logger.debug(f"TEST_MODE QUERY: {command} -> {response}")
+            else:
+                try:
+                    response = self.resource.query(command)
+                    self.logger.debug(f"QUERY: {command} -> {response}")
+                except Exception as e:
+                    self.logger.error(f"Query error for '{command}': {e}")
+                    raise
+        finally:
+            self._log_command_done(logged)
+        if command_recorder.active is not None:
+            command_recorder.active.query(self.name, command, response)
+        return response
     
     def reset(self) -> None:
         """
@@ -689,8 +731,78 @@ class InstrumentBase:
         
         self.logger.info(f"Recorded: {function} = {value} {units}")
     
+    # =========================================================================
+    # Concurrent I/O
+    # =========================================================================
+    
+    def _io_executor(self):
+        """The instrument's single I/O worker thread (a ThreadPoolExecutor)."""
+        with self._io_lock:
+            if self._executor is None:
+                # Imported here: only concurrent I/O needs it, and experiment
+                # CLIs import this module on startup
+                from concurrent.futures import ThreadPoolExecutor
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{self.name}-io")
+            return self._executor
+    
+    def _call_locked(self, func: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        with self._io_lock:
+            return func(*args, **kwargs)
+    
+    def submit(self, func: Callable[..., Any], *args: Any, **kwargs: Any):
+        """
+        Start func(*args, **kwargs) on this instrument's I/O worker thread.
+        
+        The I/O lock is held for the whole call, so a multi-command sequence
+        (e.g. MM + XE + read) is not interleaved with other I/O on this
+        instrument. Needs no event loop, so it also works from code already
+        running one (e.g. a Jupyter kernel).
+        
+        Returns:
+            concurrent.futures.Future with the result
+        
+        Example:
+            futures = [iv5270b.submit(spot, iv5270b, [1, 3]), iv4156b.submit(iv4156b.query, "*IDN?")]
+            data_5270b, idn_4156b = [f.result() for f in futures]
+        """
+        return self._io_executor().submit(self._call_locked, func, args, kwargs)
+    
+    async def acall(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Async submit(): run func(*args, **kwargs) on this instrument's I/O
+        worker thread and await the result.
+        
+        Example:
+            def spot(inst, channels):
+                inst.set_measurement_mode(1, channels)
+                inst.execute_measurement()
+                return inst.read()
+            
+            data_5270b, idn_4156b = await asyncio.gather(
+                iv5270b.acall(spot, iv5270b, [1, 3]),
+                iv4156b.aquery("*IDN?"),
+            )
+        """
+        import asyncio  # Imported here, like ThreadPoolExecutor (startup time)
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+    
+    async def awrite(self, command: str) -> None:
+        """Async write() (see acall)."""
+        await self.acall(self.write, command)
+    
+    async def aread(self) -> str:
+        """Async read() (see acall)."""
+        return await self.acall(self.read)
+    
+    async def aquery(self, command: str) -> str:
+        """Async query() (see acall)."""
+        return await self.acall(self.query, command)
+    
     def close(self) -> None:
         """Close the instrument connection."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
         if self.resource is not None:
             try:
                 self.resource.close()
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+Structured Instrument Command Log
+
+Binary replacement for the text instrument command log
+(`[timestamp] NAME WRITE: cmd` per line). One log is three files:
+
+    <name>.kcl   header + fixed-width records (RECORD, 20 bytes):
+                     t_ns        monotonic ns since the log was opened
+                     instrument  instrument id
+                     op          WRITE, QUERY, READ or ERROR
+                     command     string id of the command (error text for
+                                 ERROR, empty for READ)
+                     duration    us spent in the write/query/read (PENDING
+                                 until it returns)
+    <name>.kcs   string table: instrument names (NAME) and commands (TEXT),
+                 each stored once; instruments and commands are numbered
+                 separately, in order of first use
+    <name>.kci   index: one entry per BLOCK_RECORDS records (first record,
+                 first/last t_ns, bitmask of instrument ids in the block), so
+                 a query skips blocks by time and instrument
+
+A record is written and flushed before its I/O starts and its duration is
+filled in when the I/O returns, so after a hang, an interrupt or a killed
+process the log ends with the operation that was in flight.
+
+The .kcl header holds the wall-clock time at t_ns = 0, so the text view can
+be reconstructed on demand (CommandLogReader.text(); scripts/
+query_command_log.py). Records past the last index entry (a run that did not
+close its log) are still read, just without skipping.
+"""
+
+import os
+import re
+import struct
+import threading
+import time
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+MAGIC = b"KLCMDLG2"
+HEADER = struct.Struct("<8sdQ")      # magic, wall-clock epoch at t0, monotonic ns at t0
+RECORD = struct.Struct("<QHBxII")    # t_ns, instrument, op, command, duration_us
+INDEX_ENTRY = struct.Struct("<QQQQ")  # first record, first t_ns, last t_ns, instrument mask
+STRING_ENTRY = struct.Struct("<BI")  # kind, length
+DURATION = struct.Struct("<I")
+DURATION_OFFSET = 16                 # Byte offset of duration_us in RECORD
+
+NAME = 0  # String kinds
+TEXT = 1
+
+PENDING = 0xFFFFFFFF  # Duration of an operation that has not returned
+BLOCK_RECORDS = 4096
+
+OPS = ("WRITE", "QUERY", "READ", "ERROR")
+OP_CODES = {name: code for code, name in enumerate(OPS)}
+
+
+def log_paths(path: str) -> tuple:
+    """(records, strings, index) paths of a log given any of them or its base name."""
+    base = os.path.splitext(path)[0] if path.endswith((".kcl", ".kcs", ".kci")) else path
+    return f"{base}.kcl", f"{base}.kcs", f"{base}.kci"
+
+
+class CommandLogWriter:
+    """
+    Appends records to a structured command log (thread-safe). Every record
+    is flushed when it is written.
+
+    Args:
+        path: Log path (.kcl; the .kcs/.kci files are created next to it).
+              Existing files are overwritten.
+    """
+
+    def __init__(self, path: str):
+        self.path, strings_path, index_path = log_paths(path)
+        self._records: BinaryIO = open(self.path, "wb")
+        self._strings: BinaryIO = open(strings_path, "wb")
+        self._index: BinaryIO = open(index_path, "wb")
+        self._t0 = time.monotonic_ns()
+        self._records.write(HEADER.pack(MAGIC, time.time(), self._t0))
+        self._instrument_ids: Dict[str, int] = {}
+        self._text_ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.count = 0
+        self._block_first_t = 0
+        self._block_last_t = 0
+        self._block_mask = 0
+
+    def _intern(self, table: Dict[str, int], kind: int, value: str) -> int:
+        ident = table.get(value)
+        if ident is None:
+            ident = table[value] = len(table)
+            data = value.encode("utf-8")
+            self._strings.write(STRING_ENTRY.pack(kind, len(data)) + data)
+        return ident
+
+    def _append(self, instrument: str, op: str, command: str, start_ns: int, duration_us: int) -> int:
+        inst_id = self._intern(self._instrument_ids, NAME, instrument)
+        t_ns = max(start_ns - self._t0, 0)
+        self._records.write(RECORD.pack(t_ns, inst_id, OP_CODES[op],
+                                        self._intern(self._text_ids, TEXT, command), duration_us))
+        if self.count % BLOCK_RECORDS == 0:
+            self._block_first_t = t_ns
+            self._block_mask = 0
+        self._block_last_t = t_ns
+        self._block_mask |= 1 << min(inst_id, 63)
+        number = self.count
+        self.count += 1
+        if self.count % BLOCK_RECORDS == 0:
+            self._write_index_entry()
+        self._flush()
+        return number
+
+    def begin(self, instrument: str, op: str, command: str) -> Optional[Tuple[int, int]]:
+        """
+        Append the record of an operation about to start, duration PENDING.
+
+        Args:
+            instrument: Instrument name.
+            op: WRITE, QUERY or READ.
+            command: Command, or "" for reads.
+
+        Returns:
+            Token for finish() (None if the log is closed).
+        """
+        start = time.monotonic_ns()
+        with self._lock:
+            if self._records.closed:
+                return None
+            return self._append(instrument, op, command, start, PENDING), start
+
+    def finish(self, token: Optional[Tuple[int, int]]) -> None:
+        """Fill in the duration of a record appended by begin()."""
+        if token is None:
+            return
+        number, start = token
+        duration_us = min((time.monotonic_ns() - start) // 1000, PENDING - 1)
+        with self._lock:
+            if self._records.closed:
+                return
+            self._records.seek(HEADER.size + number * RECORD.size + DURATION_OFFSET)
+            self._records.write(DURATION.pack(duration_us))
+            self._records.seek(0, os.SEEK_END)
+
+    def log(self, instrument: str, op: str, command: str) -> None:
+        """Append a record with zero duration (e.g. ERROR)."""
+        with self._lock:
+            if not self._records.closed:
+                self._append(instrument, op, command, time.monotonic_ns(), 0)
+
+    def _write_index_entry(self) -> None:
+        first = (self.count - 1) // BLOCK_RECORDS * BLOCK_RECORDS
+        self._index.write(INDEX_ENTRY.pack(first, self._block_first_t, self._block_last_t, self._block_mask))
+
+    def _flush(self) -> None:
+        # Strings before records, so every flushed record can be resolved
+        self._strings.flush()
+        self._records.flush()
+        self._index.flush()
+
+    def close(self) -> None:
+        """Index the last partial block and close the files."""
+        with self._lock:
+            if self._records.closed:
+                return
+            if self.count % BLOCK_RECORDS:
+                self._write_index_entry()
+            self._flush()
+            for f in (self._strings, self._records, self._index):
+                f.close()
+
+
+class LogRecord(NamedTuple):
+    """One decoded record."""
+    number: int
+    t_ns: int
+    time: datetime
+    instrument: str
+    op: str
+    command: str
+    duration_us: Optional[int]  # None while the operation had not returned
+
+    def text(self, durations: bool = False) -> str:
+        """The line the text command log would have had."""
+        op = "[ERROR]" if self.op == "ERROR" else self.op
+        line = f"[{self.time.isoformat()}] {self.instrument} {op}: {self.command}"
+        if not durations:
+            return line
+        if self.duration_us is None:
+            return f"{line} (no reply)"
+        return f"{line} ({self.duration_us / 1000:.3f} ms)"
+
+
+class CommandLogReader:
+    """
+    Reads and filters a structured command log.
+
+    Args:
+        path: Log path (.kcl, .kcs, .kci or the base name).
+
+    Raises:
+        ValueError: If the file is not a structured command log.
+    """
+
+    def __init__(self, path: str):
+        self.path, strings_path, index_path = log_paths(path)
+        with open(self.path, "rb") as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size or header[:8] != MAGIC:
+            raise ValueError(f"{self.path} is not a structured command log")
+        _, self.start_epoch, _ = HEADER.unpack(header)
+        self.count = (os.path.getsize(self.path) - HEADER.size) // RECORD.size
+
+        self.instrument_names: List[str] = []
+        self.strings: List[str] = []
+        with open(strings_path, "rb") as f:
+            data = f.read()
+        pos = 0
+        while pos + STRING_ENTRY.size <= len(data):
+            kind, length = STRING_ENTRY.unpack_from(data, pos)
+            pos += STRING_ENTRY.size
+            if pos + length > len(data):
+                break
+            (self.instrument_names if kind == NAME else self.strings).append(
+                data[pos:pos + length].decode("utf-8"))
+            pos += length
+
+        self.index: List[tuple] = []
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as f:
+                data = f.read()
+            self.index = [INDEX_ENTRY.unpack_from(data, off)
+                          for off in range(0, len(data) - INDEX_ENTRY.size + 1, INDEX_ENTRY.size)]
+
+    def instruments(self) -> List[str]:
+        """Names of the instruments in the log."""
+        ids = set()
+        with open(self.path, "rb") as f:
+            f.seek(HEADER.size)
+            for rec in RECORD.iter_unpack(f.read(self.count * RECORD.size)):
+                ids.add(rec[1])
+        return sorted(self.instrument_names[i] for i in ids if i < len(self.instrument_names))
+
+    def _blocks(self, mask: Optional[int], start_ns: Optional[int], end_ns: Optional[int]) -> Iterator[tuple]:
+        """(first record, count) of the blocks that may match."""
+        indexed = 0
+        for first, first_t, last_t, block_mask in self.index:
+            count = min(BLOCK_RECORDS, self.count - first)
+            indexed = first + count
+            if count <= 0:
+                continue
+            if mask is not None and not block_mask & mask:
+                continue
+            if start_ns is not None and last_t < start_ns:
+                continue
+            if end_ns is not None and first_t > end_ns:
+                continue
+            yield first, count
+        if indexed < self.count:
+            yield indexed, self.count - indexed  # Unindexed tail
+
+    def records(self, instruments: Optional[Sequence[str]] = None,
+                start: Optional[float] = None, end: Optional[float] = None,
+                command: Optional[str] = None, ops: Optional[Iterable[str]] = None) -> Iterator[LogRecord]:
+        """
+        Matching records, in order.
+
+        Args:
+            instruments: Instrument names to keep (default: all).
+            start, end: Time window in seconds since the log was opened.
+            command: Regular expression searched in the command text.
+            ops: Operations to keep (default: all).
+        """
+        inst_ids = None
+        mask = None
+        if instruments:
+            inst_ids = {i for i, s in enumerate(self.instrument_names) if s in set(instruments)}
+            mask = 0
+            for i in inst_ids:
+                mask |= 1 << min(i, 63)
+        command_ids = None
+        if command is not None:
+            pattern = re.compile(command)
+            command_ids = {i for i, s in enumerate(self.strings) if pattern.search(s)}
+        op_codes = {OP_CODES[op] for op in ops} if ops else None
+        start_ns = int(start * 1e9) if start is not None else None
+        end_ns = int(end * 1e9) if end is not None else None
+
+        with open(self.path, "rb") as f:
+            for first, count in self._blocks(mask, start_ns, end_ns):
+                f.seek(HEADER.size + first * RECORD.size)
+                data = f.read(count * RECORD.size)
+                for n, (t_ns, inst, op, cmd, duration) in enumerate(RECORD.iter_unpack(data), first):
+                    if inst_ids is not None and inst not in inst_ids:
+                        continue
+                    if start_ns is not None and t_ns < start_ns:
+                        continue
+                    if end_ns is not None and t_ns > end_ns:
+                        continue
+                    if command_ids is not None and cmd not in command_ids:
+                        continue
+                    if op_codes is not None and op not in op_codes:
+                        continue
+                    if inst >= len(self.instrument_names) or cmd >= len(self.strings):
+                        return  # Record written after the last flushed string
+                    yield LogRecord(n, t_ns, datetime.fromtimestamp(self.start_epoch + t_ns / 1e9),
+                                    self.instrument_names[inst], OPS[op], self.strings[cmd],
+                                    None if duration == PENDING else duration)
+
+    def text(self, **filters) -> Iterator[str]:
+        """Text view of the matching records (see records() for filters)."""
+        for record in self.records(**filters):
+            yield record.text()
@@ -141,11 +141,20 @@ class IV4156B(InstrumentBase):
         
         Reference: DI command - DI channel, range, current, compliance
         """
+        self.write(self.format_current_command(channel, current, compliance, i_range))
+        self.logger.debug(f"CH{channel}: DI={format_number(current)}A (sent as {format_number(-current)}A), Vcomp={format_number(compliance)}V")
+    
+    @staticmethod
+    def format_current_command(channel: int, current: float,
+                               compliance: float = 100.0, i_range: int = 0) -> str:
+        """
+        Return the DI command set_current() sends, without sending it.
+        
+        Lets a caller format the command ahead of time and send it later
+        with write().
+        """
         # Negate current for instrument (positive in code = negative to instrument)
-        negated_current = -current
-        cmd = f"DI {channel},{i_range},{format_number(negated_current)},{format_number(compliance)}"
-        self.write(cmd)
-        self.logger.debug(f"CH{channel}: DI={format_number(current)}A (sent as {format_number(negated_current)}A), Vcomp={format_number(compliance)}V")
+        return f"DI {channel},{i_range},{format_number(-current)},{format_number(compliance)}"
     
     def set_vsu_voltage(self, vsu_channel: int, voltage: float) -> None:
         """
@@ -13,6 +13,9 @@ Features:
     - High-speed sampling mode
 """
 
+import re
+import warnings
+
 from .base import InstrumentBase, format_number
 from typing import List, Optional, Tuple
 
@@ -38,6 +41,7 @@ class IV5270B(InstrumentBase):
             timeout: Communication timeout in ms (default: 20000)
         """
         super().__init__(resource_manager, address, "IV5270B", timeout)
+        self._sampling: Optional[dict] = None  # Set by configure_sampling()
     
     def reset(self) -> None:
         """Reset the instrument to default state."""
@@ -160,11 +164,20 @@ class IV5270B(InstrumentBase):
         
         Reference: DI command - DI channel, range, current, compliance
         """
+        self.write(self.format_current_command(channel, current, compliance, i_range))
+        self.logger.debug(f"CH{channel}: DI={format_number(current)}A (sent as {format_number(-current)}A), Vcomp={format_number(compliance)}V")
+    
+    @staticmethod
+    def format_current_command(channel: int, current: float,
+                               compliance: float = 1.0, i_range: int = 0) -> str:
+        """
+        Return the DI command set_current() sends, without sending it.
+        
+        Lets a caller format the command ahead of time and send it later
+        with write().
+        """
         # Negate current for instrument (positive in code = negative to instrument)
-        negated_current = -current
-        cmd = f"DI {channel},{i_range},{format_number(negated_current)},{format_number(compliance)}"
-        self.write(cmd)
-        self.logger.debug(f"CH{channel}: DI={format_number(current)}A (sent as {format_number(negated_current)}A), Vcomp={format_number(compliance)}V")
+        return f"DI {channel},{i_range},{format_number(-current)},{format_number(compliance)}"
     
     def set_series_resistor(self, channel: int, enabled: bool) -> None:
         """
@@ -216,7 +229,8 @@ class IV5270B(InstrumentBase):
         
         Args:
             channel: SMU channel
-            i_range: Range (11=1nA to 20=1A, or -11 to -20 for limited auto)
+            i_range: Range (0=auto, 11=1nA to 20=1A limited auto,
+                     -11 to -20 fixed); see instruments/ranging.py
         
         Reference: RI command
         """
@@ -228,12 +242,51 @@ class IV5270B(InstrumentBase):
         
         Args:
             channel: SMU channel
-            v_range: Range (11=2V, 12=20V, 13=40V, etc.)
+            v_range: Range (0=auto, 5=0.5V, 11=2V, 12=20V, 13=40V limited auto,
+                     negative for fixed); see instruments/ranging.py
         
         Reference: RV command
         """
         self.write(f"RV {channel},{v_range}")
     
+    def set_adc_type(self, channel: int, adc: int) -> None:
+        """
+        Select the A/D converter used by a channel.
+        
+        Args:
+            channel: SMU channel
+            adc: 0 = high-speed ADC, 1 = high-resolution ADC
+        
+        Reference: AAD command
+        """
+        self.write(f"AAD {channel},{adc}")
+    
+    def set_integration_time(self, adc: int, mode: int, value: float) -> None:
+        """
+        Set integration time / number of samples for one A/D converter type.
+        
+        Args:
+            adc: 0 = high-speed ADC, 1 = high-resolution ADC
+            mode: 0 = auto, 1 = manual, 2 = power line cycles (PLC)
+            value: Coefficient / number of samples / number of PLC for the mode
+        
+        Reference: AIT command - AIT type, mode, N
+        """
+        self.write(f"AIT {adc},{mode},{format_number(value)}")
+        self.logger.info(f"Integration time: ADC {adc}, mode {mode}, N={value}")
+    
+    def set_averaging(self, samples: int, mode: int = 1) -> None:
+        """
+        Set the number of averaging samples of the high-speed ADC.
+        
+        Args:
+            samples: Number of samples (1-1023)
+            mode: 0 = auto, 1 = manual
+        
+        Reference: AV command - AV number, mode
+        """
+        self.write(f"AV {samples},{mode}")
+    
     def set_wait_time(self, mode: int, hold: float, delay: float) -> None:
         """
         Set wait time for spot measurements.
@@ -610,7 +663,9 @@ class IV5270B(InstrumentBase):
     
     def configure_high_speed_sampling(self, voltage: float, samples: int) -> None:
         """
-        Configure high-speed sampling mode.
+        Configure high-speed sampling mode (legacy multi-channel sweep setup).
+        
+        For time-series acquisition use configure_sampling() / acquire_sampling().
         
         Args:
             voltage: Bias voltage
@@ -649,4 +704,258 @@ class IV5270B(InstrumentBase):
         """
         self.execute_measurement()
         return self.read_data()
+    
+    # =========================================================================
+    # Sampling Measurement (MM 10)
+    # =========================================================================
+    
+    def set_sampling_source_voltage(self, channel: int, base: float, bias: float,
+                                    compliance: float = 0.1, v_range: int = 0) -> None:
+        """
+        Set a channel as a voltage sampling source.
+        
+        The channel outputs base during the base hold time, then steps to bias
+        when sampling starts.
+        
+        Args:
+            channel: SMU channel
+            base: Base voltage in volts
+            bias: Bias voltage in volts
+            compliance: Current compliance in amps
+            v_range: Output range (0=auto)
+        
+        Reference: MV command - MV channel, range, base, bias, compliance
+        """
+        self.write(f"MV {channel},{v_range},{format_number(base)},"
+                   f"{format_number(bias)},{format_number(compliance)}")
+    
+    def set_sampling_source_current(self, channel: int, base: float, bias: float,
+                                    compliance: float = 1.0, i_range: int = 0) -> None:
+        """
+        Set a channel as a current sampling source.
+        
+        Currents are negated like set_current() (positive = into instrument).
+        
+        Args:
+            channel: SMU channel
+            base: Base current in amps
+            bias: Bias current in amps
+            compliance: Voltage compliance in volts
+            i_range: Output range (0=auto)
+        
+        Reference: MI command - MI channel, range, base, bias, compliance
+        """
+        self.write(f"MI {channel},{i_range},{format_number(-base)},"
+                   f"{format_number(-bias)},{format_number(compliance)}")
+    
+    def clear_sampling_sources(self) -> None:
+        """
+        Clear all sampling source settings.
+        
+        Reference: MCC command
+        """
+        self.write("MCC")
+    
+    def configure_sampling(self, channels: List[int], interval: float, points: int,
+                           hold_bias: float = 0.0, hold_base: Optional[float] = None,
+                           abort: bool = False, timestamps: bool = True) -> None:
+        """
+        Configure a sampling measurement (MM 10) on the given channels.
+        
+        Sampling sources (MV/MI) are optional; channels already forced with
+        DV/DI keep their DC output. Call start_sampling() / read_sampling_array()
+        (or acquire_sampling()) afterwards.
+        
+        Args:
+            channels: Measurement channels, in the column order of the result
+            interval: Sampling interval in seconds
+            points: Number of sampling points
+            hold_bias: Hold time (s) at bias before the first sample
+            hold_base: Hold time (s) at base before bias is applied (None = omit)
+            abort: If True, abort sampling when a channel reaches compliance
+            timestamps: If True, the instrument returns a time stamp per point
+        
+        Reference: TSC, MSC, MT, MM commands
+        """
+        if not channels:
+            raise ValueError("configure_sampling requires at least one channel")
+        if interval <= 0 or points < 1:
+            raise ValueError(f"Invalid sampling interval/points: {interval}, {points}")
+        
+        self.write(f"TSC {1 if timestamps else 0}")
+        # MSC abort: 1 = disabled, 2 = enabled; post: 1 = return to base value
+        self.write(f"MSC {2 if abort else 1},1")
+        mt = f"MT {format_number(hold_bias)},{format_number(interval)},{int(points)}"
+        if hold_base is not None:
+            mt += f",{format_number(hold_base)}"
+        self.write(mt)
+        self.set_measurement_mode(10, channels)
+        
+        self._sampling = {
+            "channels": list(channels),
+            "interval": interval,
+            "points": int(points),
+            "duration": (hold_base or 0.0) + hold_bias + interval * points,
+        }
+        self.logger.info(f"Sampling configured: CH{list(channels)}, {points} points "
+                         f"every {format_number(interval)}s")
+    
+    def start_sampling(self) -> None:
+        """Start the configured sampling measurement (XE); data is read later."""
+        if self._sampling is None:
+            raise RuntimeError("configure_sampling() must be called before start_sampling()")
+        self.execute_measurement()
+    
+    def read_sampling_array(self, out=None):
+        """
+        Read the whole sampling result in one transfer and return it as an array.
+        
+        The read timeout is extended to cover the configured sampling duration.
+        
+        Args:
+            out: Optional array of shape (points, 1 + len(channels)) to decode
+                 into (e.g. SegmentedMemmapWriter.reserve(points))
+        
+        Returns:
+            NumPy array of shape (points, 1 + len(channels)): column 0 is time in
+            seconds from the first sample, then one column per channel in the
+            order given to configure_sampling(). In TEST_MODE the values are zero
+            and the time column is nominal. With out, the filled rows of out
+            (fewer than points if the instrument returned fewer).
+        """
+        import numpy as np
+        
+        cfg = self._sampling
+        if cfg is None:
+            raise RuntimeError("configure_sampling() must be called before read_sampling_array()")
+        
+        saved_timeout = None
+        if self.resource is not None:
+            saved_timeout = self.resource.timeout
+            needed_ms = int(cfg["duration"] * 1000 * 1.5) + self.timeout
+            self.resource.timeout = max(saved_timeout, needed_ms)
+        try:
+            data = self.read_data()
+        finally:
+            if saved_timeout is not None:
+                self.resource.timeout = saved_timeout
+        
+        n_ch = len(cfg["channels"])
+        if data.strip() == "TEST_MODE_RESPONSE":
+            result = np.zeros((cfg["points"], 1 + n_ch)) if out is None else out[:cfg["points"]]
+            result[:, 1:] = 0.0
+            result[:, 0] = np.arange(len(result)) * cfg["interval"]
+            return result
+        return parse_sampling_data(data, n_ch, cfg["interval"], out=out)
+    
+    def acquire_sampling(self, out=None):
+        """
+        Run the configured sampling measurement and return its array.
+        
+        Returns:
+            See read_sampling_array()
+        """
+        self.start_sampling()
+        return self.read_sampling_array(out=out)
+
+
+# FMT 1 data element: 3-letter header (status, channel, type) + value, at the
+# start of a comma-separated token
+_HEADER_LENGTH = 3
+_WHITESPACE = re.compile(r"\s+")
+_SAMPLING_TOKEN = re.compile(r"(?:^|,)([A-Z])([A-Z])([A-Z])([-+]?[\d.]+(?:[Ee][-+]?\d+)?)")
+_VALUE_START = b"+-.0123456789"
+
+
+def _sampling_elements(text: str):
+    """
+    (type letters as uint8, values) of the elements of a whitespace-free FMT 1
+    response.
+    
+    Well-formed responses are decoded without a Python object per element:
+    the headers are blanked in one pass over the bytes and the values parsed
+    by one np.fromstring call. A response with an empty, short or malformed
+    element falls back to a regex scan that skips the bad elements.
+    """
+    import numpy as np
+    
+    text = text.strip(",")
+    if not text:
+        return np.empty(0, dtype=np.uint8), np.empty(0)
+    raw = np.frombuffer(text.encode("ascii", "replace"), dtype=np.uint8)
+    commas = np.flatnonzero(raw == ord(","))
+    starts = np.concatenate(([0], commas + 1))
+    lengths = np.append(commas, len(raw)) - starts
+    if lengths.min() > _HEADER_LENGTH:
+        header_pos = (starts[:, None] + np.arange(_HEADER_LENGTH)).ravel()
+        header = raw[header_pos]
+        if (((header >= ord("A")) & (header <= ord("Z"))).all()
+                and np.isin(raw[starts + _HEADER_LENGTH], np.frombuffer(_VALUE_START, dtype=np.uint8)).all()):
+            blanked = raw.copy()
+            blanked[header_pos] = ord(" ")
+            try:
+                with warnings.catch_warnings():
+                    # Older NumPy warns and returns the values parsed so far
+                    warnings.simplefilter("error", DeprecationWarning)
+                    values = np.fromstring(blanked.tobytes().decode("ascii"), sep=",")
+            except (ValueError, DeprecationWarning):
+                values = None
+            if values is not None and len(values) == len(starts):
+                return raw[starts + _HEADER_LENGTH - 1], values
+    
+    elements = _SAMPLING_TOKEN.findall(text)
+    types = np.frombuffer("".join(e[2] for e in elements).encode("ascii"), dtype=np.uint8)
+    return types, np.array([float(e[3]) for e in elements])
+
+
+def parse_sampling_data(data: str, n_channels: int, interval: float, out=None):
+    """
+    Parse an E5270B sampling (MM 10) response into an array.
+    
+    Tokens are grouped per sampling point: an optional index (type X) and time
+    stamp (type T) followed by one value per measurement channel. When no time
+    stamps are returned, time is index × interval. Empty or malformed
+    elements are skipped.
+    
+    Elements are decoded as whole arrays (see _sampling_elements()), then the
+    channel values are copied into the result array, which can be a view of
+    a memory-mapped store.
+    
+    Args:
+        data: Raw response (FMT 1, comma separated)
+        n_channels: Number of measurement channels
+        interval: Sampling interval in seconds
+        out: Optional array of shape (max points, 1 + n_channels) to decode
+             into; points beyond its length are dropped
+    
+    Returns:
+        NumPy array of shape (points, 1 + n_channels); column 0 is time (s).
+        With out, the filled rows of out.
+    """
+    import numpy as np
+    
+    types, values = _sampling_elements(_WHITESPACE.sub("", data))
+    is_time = types == ord("T")
+    channel_pos = np.flatnonzero(~is_time & (types != ord("X")))
+    points = len(channel_pos) // n_channels
+    if out is None:
+        out = np.empty((points, 1 + n_channels))
+    points = min(points, len(out))
+    result = out[:points]
+    channel_pos = channel_pos[:points * n_channels]
+    result[:, 1:] = values[channel_pos].reshape(points, n_channels)
+    
+    # A point's time stamp is the last T element between the previous point's
+    # first value and its own
+    first_pos = channel_pos[::n_channels]
+    time_pos = np.flatnonzero(is_time)
+    stamp = np.searchsorted(time_pos, first_pos) - 1
+    previous = np.concatenate(([-1], first_pos[:-1]))
+    timed = (stamp >= 0) & (time_pos[np.maximum(stamp, 0)] > previous) if len(time_pos) else None
+    if points and timed is not None and timed.all():
+        result[:, 0] = values[time_pos[stamp]]
+        result[:, 0] -= result[0, 0]
+    else:
+        result[:, 0] = np.arange(points) * interval
+    return result
 
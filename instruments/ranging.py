@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+FLEX Measurement Range Tables
+
+Range codes shared by the 5270B and 4156B FLEX commands (RI, RV):
+    0   = auto ranging
+    +N  = limited auto ranging (never below range N)
+    -N  = fixed range N
+
+Reference: E5270B Programming Guide, RI/RV command tables.
+"""
+
+import math
+import re
+from typing import Dict, Hashable, NamedTuple, Optional, Tuple
+
+
+# Current range code -> full scale (A)
+CURRENT_RANGES = {
+    9: 10e-12,
+    10: 100e-12,
+    11: 1e-9,
+    12: 10e-9,
+    13: 100e-9,
+    14: 1e-6,
+    15: 10e-6,
+    16: 100e-6,
+    17: 1e-3,
+    18: 10e-3,
+    19: 100e-3,
+    20: 1.0,
+}
+
+# Voltage range code -> full scale (V)
+VOLTAGE_RANGES = {
+    5: 0.5,
+    11: 2.0,
+    12: 20.0,
+    13: 40.0,
+    14: 100.0,
+}
+
+# A value is placed on a range only if |value| * (1 + RANGE_HEADROOM) fits
+RANGE_HEADROOM = 0.25
+
+
+def _range_for(value: float, table: dict, minimum: int, headroom: float) -> int:
+    """Smallest range code >= minimum whose full scale holds value with headroom."""
+    needed = abs(value) * (1.0 + headroom)
+    for code in sorted(table):
+        if code >= minimum and table[code] >= needed:
+            return code
+    return max(table)
+
+
+def current_range_for(current: float, minimum: int = 11,
+                      headroom: float = RANGE_HEADROOM) -> int:
+    """
+    Return the current range code (11 = 1nA ... 20 = 1A) that holds current.
+
+    Args:
+        current: Expected current in amps (sign ignored)
+        minimum: Lowest range code the channel supports / should use
+        headroom: Fractional margin above |current|
+    """
+    if current is None or math.isnan(current):
+        return minimum
+    return _range_for(current, CURRENT_RANGES, minimum, headroom)
+
+
+def voltage_range_for(voltage: float, minimum: int = 5,
+                      headroom: float = RANGE_HEADROOM) -> int:
+    """
+    Return the voltage range code (5 = 0.5V, 11 = 2V, ...) that holds voltage.
+
+    Args:
+        voltage: Expected voltage in volts (sign ignored)
+        minimum: Lowest range code to use
+        headroom: Fractional margin above |voltage|
+    """
+    if voltage is None or math.isnan(voltage):
+        return minimum
+    return _range_for(voltage, VOLTAGE_RANGES, minimum, headroom)
+
+
+def range_full_scale(code: int, current: bool = True) -> Optional[float]:
+    """Full scale of a range code (sign ignored); None for auto (0)."""
+    if code == 0:
+        return None
+    table = CURRENT_RANGES if current else VOLTAGE_RANGES
+    return table.get(abs(code))
+
+
+# ============================================================================
+# FLEX data status and range prediction
+# ============================================================================
+
+# FMT 1 status letters that mean the value is not usable at the range in effect
+OVERFLOW_STATUS = {"V", "X"}  # V = over measurement range, X = oscillation
+
+
+class FlexReading(NamedTuple):
+    """One FMT 1 data element, e.g. "NAI+1.23456E-09"."""
+    status: str      # N = normal, C/T = compliance, V = overflow, ...
+    channel: int     # 1-8 (0 for GNDU / non-channel data)
+    data_type: str   # I, V, T, ...
+    value: float
+
+
+_FLEX_TOKEN = re.compile(r"^\s*([A-Z])([A-Z])([A-Z])\s*([-+]?[\d.]+(?:[Ee][-+]?\d+)?)\s*$")
+
+
+def parse_flex_value(token: str) -> Optional[FlexReading]:
+    """Parse one FMT 1 data element; None if it has no 3-letter header."""
+    m = _FLEX_TOKEN.match(token)
+    if not m:
+        return None
+    letter = m.group(2)
+    channel = ord(letter) - ord("A") + 1 if "A" <= letter <= "H" else 0
+    return FlexReading(m.group(1), channel, m.group(3), float(m.group(4)))
+
+
+class RangePredictor:
+    """
+    Predicts a fixed current range for the next measurement on a channel.
+
+    Remembers the values measured on each key (e.g. (instrument, channel)).
+    The FMT 1 ASCII data carries no range field, so the range a point resolved
+    to is taken from its magnitude. The next value is predicted from the last
+    one, scaled by the forcing hint when one is given (e.g. OUT follows X1)
+    and extrapolated from the last two; the fixed range holding the largest
+    candidate is returned. After an overflow, auto ranging is returned until
+    a good value is recorded.
+    """
+
+    def __init__(self, headroom: float = RANGE_HEADROOM):
+        self.headroom = headroom
+        self._history: Dict[Hashable, Tuple[float, ...]] = {}
+        self._hints: Dict[Hashable, Optional[float]] = {}
+        self._fallback: set = set()
+
+    def predict(self, key: Hashable, hint: Optional[float] = None,
+                minimum: int = 11) -> int:
+        """
+        Return the RI code for the next measurement on key.
+
+        Returns:
+            -N (fixed range N) when there is history, +N (limited auto from the
+            hint's range) for the first point, 0 (auto) after an overflow or
+            with nothing to go on.
+        """
+        if key in self._fallback:
+            return 0
+        history = self._history.get(key)
+        if not history:
+            if hint is None:
+                return 0
+            return current_range_for(hint, minimum, self.headroom)
+
+        last = history[-1]
+        candidates = [abs(last)]
+        last_hint = self._hints.get(key)
+        if hint is not None and last_hint:
+            candidates.append(abs(last * hint / last_hint))
+        if len(history) > 1:
+            candidates.append(abs(2 * last - history[-2]))
+        return -current_range_for(max(candidates), minimum, self.headroom)
+
+    def record(self, key: Hashable, value: float, hint: Optional[float] = None) -> None:
+        """Record a good measurement (clears any overflow fallback)."""
+        self._history[key] = (self._history.get(key, ())[-1:] + (value,))
+        self._hints[key] = hint
+        self._fallback.discard(key)
+
+    def mark_overflow(self, key: Hashable) -> None:
+        """Use auto ranging on key until the next good measurement."""
+        self._fallback.add(key)
+
+    def reset(self) -> None:
+        """Forget all history."""
+        self._history.clear()
+        self._hints.clear()
+        self._fallback.clear()
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Command Stream Recorder
+
+Records the exact, ordered stream of instrument writes, reads and queries in
+a compact binary file (*.klrec), for replay/diff regression checks
+(scripts/replay_diff.py).
+
+Instrument names and command strings are interned: each distinct string is
+stored once and later records refer to it by number, so a recording of a
+long run (the same DI/MM/XE commands repeated thousands of times) costs a
+few bytes per command.
+
+File format (integers are unsigned LEB128 varints, strings are varint length
++ UTF-8):
+    MAGIC
+    records: one type byte, then
+        NAME  id, string             (instrument name table)
+        TEXT  id, string             (command / response table)
+        WRITE instrument, command
+        READ  instrument, response
+        QUERY instrument, command, response
+        POINT label                  (text id)
+
+POINT closes a measurement point: every record since the previous POINT
+belongs to it (see mark_point()).
+
+Usage:
+    recorder = CommandRecorder("logs/compute_cmd.klrec")
+    set_command_recorder(recorder)      # InstrumentBase now records to it
+    ...
+    mark_point("4q_mult_erase#1")       # after each measured point
+    ...
+    set_command_recorder(None)
+    recorder.close()
+
+    for event in read_recording("logs/compute_cmd.klrec"):
+        print(event.kind, event.instrument, event.command, event.response)
+"""
+
+import threading
+from typing import BinaryIO, Dict, Iterator, NamedTuple, Optional
+
+MAGIC = b"KLREC1\n"
+
+NAME = 0x01
+TEXT = 0x02
+WRITE = 0x10
+READ = 0x11
+QUERY = 0x12
+POINT = 0x20
+
+KIND_NAMES = {WRITE: "WRITE", READ: "READ", QUERY: "QUERY", POINT: "POINT"}
+
+# Recorder InstrumentBase writes to (None = not recording)
+active: Optional["CommandRecorder"] = None
+
+
+class RecordedEvent(NamedTuple):
+    """One recorded event."""
+    kind: str                   # WRITE, READ, QUERY or POINT
+    instrument: Optional[str]   # None for POINT
+    command: Optional[str]      # Command (WRITE/QUERY) or point label (POINT)
+    response: Optional[str]     # READ/QUERY response
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+class CommandRecorder:
+    """
+    Binary command stream writer (thread-safe: instruments driven through
+    the async API record from their own worker threads).
+
+    Args:
+        path: Output file (*.klrec); overwritten.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file: BinaryIO = open(path, "wb")
+        self._file.write(MAGIC)
+        self._names: Dict[str, int] = {}
+        self._texts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.events = 0
+
+    def _intern(self, table: Dict[str, int], record_type: int, value: str) -> bytes:
+        ident = table.get(value)
+        if ident is None:
+            ident = table[value] = len(table)
+            data = value.encode("utf-8")
+            self._file.write(bytes((record_type,)) + _varint(ident) + _varint(len(data)) + data)
+        return _varint(ident)
+
+    def _record(self, record_type: int, *fields: bytes) -> None:
+        self._file.write(bytes((record_type,)) + b"".join(fields))
+        self.events += 1
+
+    def write(self, instrument: str, command: str) -> None:
+        """Record a write."""
+        with self._lock:
+            self._record(WRITE, self._intern(self._names, NAME, instrument),
+                         self._intern(self._texts, TEXT, command))
+
+    def read(self, instrument: str, response: str) -> None:
+        """Record a read and its response."""
+        with self._lock:
+            self._record(READ, self._intern(self._names, NAME, instrument),
+                         self._intern(self._texts, TEXT, response))
+
+    def query(self, instrument: str, command: str, response: str) -> None:
+        """Record a query and its response."""
+        with self._lock:
+            self._record(QUERY, self._intern(self._names, NAME, instrument),
+                         self._intern(self._texts, TEXT, command),
+                         self._intern(self._texts, TEXT, response))
+
+    def point(self, label: str) -> None:
+        """Close the current measurement point."""
+        with self._lock:
+            self._record(POINT, self._intern(self._texts, TEXT, label))
+
+    def close(self) -> None:
+        """Flush and close the file."""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def set_command_recorder(recorder: Optional[CommandRecorder]) -> None:
+    """Start recording every instrument command to recorder (None stops)."""
+    global active
+    active = recorder
+
+
+def get_command_recorder() -> Optional[CommandRecorder]:
+    """Return the active recorder, or None."""
+    return active
+
+
+def mark_point(label: str) -> None:
+    """
+    Close a measurement point in the active recording (no-op when not
+    recording). Call once a point has been measured; the commands recorded
+    since the previous mark are attributed to label.
+    """
+    if active is not None:
+        active.point(label)
+
+
+def read_recording(path: str) -> Iterator[RecordedEvent]:
+    """
+    Iterate over the events of a recording.
+
+    Raises:
+        ValueError: If the file is not a recording or is truncated.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path} is not a command recording")
+    pos = len(MAGIC)
+    names: Dict[int, str] = {}
+    texts: Dict[int, str] = {}
+
+    def varint() -> int:
+        nonlocal pos
+        value = shift = 0
+        while True:
+            if pos >= len(data):
+                raise ValueError(f"{path} is truncated")
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return value
+            shift += 7
+
+    while pos < len(data):
+        record_type = data[pos]
+        pos += 1
+        if record_type in (NAME, TEXT):
+            ident, length = varint(), varint()
+            if pos + length > len(data):
+                raise ValueError(f"{path} is truncated")
+            value = data[pos:pos + length].decode("utf-8")
+            pos += length
+            (names if record_type == NAME else texts)[ident] = value
+        elif record_type == WRITE:
+            yield RecordedEvent("WRITE", names[varint()], texts[varint()], None)
+        elif record_type == READ:
+            yield RecordedEvent("READ", names[varint()], None, texts[varint()])
+        elif record_type == QUERY:
+            instrument, command = names[varint()], texts[varint()]
+            yield RecordedEvent("QUERY", instrument, command, texts[varint()])
+        elif record_type == POINT:
+            yield RecordedEvent("POINT", None, texts[varint()], None)
+        else:
+            raise ValueError(f"{path}: unknown record type 0x{record_type:02x} at byte {pos - 1}")
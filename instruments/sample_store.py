@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Memory-Mapped Sample Store
+
+Binary storage for sampling data (5270B MM 10 transients, ...), written
+straight from the instrument's decoded buffer into a memory-mapped file
+instead of through csv.writer rows, and read back by analysis as an array
+without parsing.
+
+One store is two files:
+
+    <name>.kls      HEADER_BYTES header, then rows of len(columns) values
+                    (C order, header dtype). Column 0 is time in seconds
+                    from the start of the capture, then one column per
+                    channel. The file grows by segment_rows rows at a time;
+                    rows past header "rows" are unused.
+    <name>.kls.idx  capture index, one JSON object per line:
+                        {"row": first row, "rows": n, "time": ISO start,
+                         "label": ...}
+
+The header is MAGIC followed by JSON (padded with spaces):
+    {"dtype": "<f8", "columns": ["t", "ICELLMEAS"], "rows": n,
+     "segment_rows": n, "created": ISO time}
+
+Usage:
+    store = SegmentedMemmapWriter("measurements/sonos_transients.kls", ["t", "ICELLMEAS"])
+    block = store.reserve(points)                    # writable view, no copy
+    n = len(parse_sampling_data(data, 1, interval, out=block))
+    store.commit(n, label="pulse 1 ms")
+    store.close()
+
+    samples = read_samples("measurements/sonos_transients.kls")
+    t, i = samples.capture(0).T
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+MAGIC = b"KLSAMP1\n"
+HEADER_BYTES = 4096
+SEGMENT_ROWS = 65536
+
+
+def index_path(path: str) -> str:
+    """Path of a store's capture index."""
+    return f"{path}.idx"
+
+
+def _read_header(f) -> Dict[str, Any]:
+    header = f.read(HEADER_BYTES)
+    if not header.startswith(MAGIC):
+        raise ValueError(f"{f.name} is not a sample store")
+    return json.loads(header[len(MAGIC):].decode("ascii"))
+
+
+class SegmentedMemmapWriter:
+    """
+    Appends sample blocks to a memory-mapped store.
+
+    Blocks are reserved as views into the mapped file, filled in place (e.g.
+    parse_sampling_data(..., out=block)) and committed; no per-sample Python
+    objects are kept. Views returned by reserve()/commit() stay valid after
+    the file grows.
+
+    Args:
+        path: Store path (.kls).
+        columns: Column names, time first (e.g. ["t", "ICELLMEAS"]).
+        dtype: Sample dtype (default float64).
+        segment_rows: Rows added each time the file grows.
+        append: If the store exists, continue after its last row instead of
+                overwriting it (columns and dtype must match).
+
+    Raises:
+        ValueError: If appending to a store with other columns or dtype.
+    """
+
+    def __init__(self, path: str, columns: Sequence[str], dtype: str = "<f8",
+                 segment_rows: int = SEGMENT_ROWS, append: bool = False):
+        self.path = path
+        self.columns = list(columns)
+        self.dtype = np.dtype(dtype)
+        self.segment_rows = segment_rows
+        self.rows = 0
+        self._row_bytes = self.dtype.itemsize * len(self.columns)
+        self._created = datetime.now().isoformat()
+
+        if append and os.path.exists(path):
+            self._file = open(path, "r+b")
+            header = _read_header(self._file)
+            if header["columns"] != self.columns or np.dtype(header["dtype"]) != self.dtype:
+                self._file.close()
+                raise ValueError(f"{path} has columns {header['columns']} ({header['dtype']}), "
+                                 f"not {self.columns} ({self.dtype.str})")
+            self.rows = header["rows"]
+            self._created = header["created"]
+            self._index = open(index_path(path), "a", encoding="utf-8")
+        else:
+            self._file = open(path, "w+b")
+            self._index = open(index_path(path), "w", encoding="utf-8")
+        self.capacity = 0
+        self._map: Optional[np.memmap] = None
+        self._grow(max(self.rows, segment_rows))
+        self._write_header()
+
+    def _grow(self, rows: int) -> None:
+        """Extend the file to hold rows rows (rounded up to whole segments) and remap."""
+        segments = -(-rows // self.segment_rows)
+        capacity = segments * self.segment_rows
+        if self._map is not None:
+            if capacity <= self.capacity:
+                return
+            self._map.flush()
+        self._file.truncate(HEADER_BYTES + capacity * self._row_bytes)
+        self._map = np.memmap(self._file, dtype=self.dtype, mode="r+", offset=HEADER_BYTES,
+                              shape=(capacity, len(self.columns)))
+        self.capacity = capacity
+
+    def _write_header(self) -> None:
+        header = json.dumps({"dtype": self.dtype.str, "columns": self.columns, "rows": self.rows,
+                             "segment_rows": self.segment_rows, "created": self._created})
+        data = MAGIC + header.encode("ascii")
+        if len(data) > HEADER_BYTES:
+            raise ValueError(f"Sample store header too long ({len(data)} bytes)")
+        self._file.seek(0)
+        self._file.write(data.ljust(HEADER_BYTES, b" "))
+        self._file.flush()
+
+    def reserve(self, rows: int) -> np.ndarray:
+        """Writable view of the next rows rows (not stored until commit())."""
+        self._grow(self.rows + rows)
+        return self._map[self.rows:self.rows + rows]
+
+    def commit(self, rows: int, label: str = "") -> np.ndarray:
+        """
+        Store the first rows rows of the last reserve() as one capture.
+
+        Returns:
+            The stored rows (a view into the file).
+        """
+        if self.rows + rows > self.capacity:
+            raise ValueError(f"commit({rows}) exceeds the reserved rows")
+        first = self.rows
+        self.rows += rows
+        self._map.flush()
+        self._write_header()
+        self._index.write(json.dumps({"row": first, "rows": rows,
+                                      "time": datetime.now().isoformat(), "label": label}) + "\n")
+        self._index.flush()
+        return self._map[first:self.rows]
+
+    def append(self, data: np.ndarray, label: str = "") -> np.ndarray:
+        """Copy an array of shape (n, len(columns)) into the store as one capture."""
+        self.reserve(len(data))[:] = data
+        return self.commit(len(data), label)
+
+    def close(self) -> None:
+        """Flush the data and header and close the files."""
+        if self._file.closed:
+            return
+        self._map.flush()
+        self._write_header()
+        self._map = None
+        self._file.close()
+        self._index.close()
+
+
+class Capture(NamedTuple):
+    """One committed block of a store."""
+    row: int
+    rows: int
+    time: str
+    label: str
+
+
+class SampleFile(NamedTuple):
+    """A store opened for reading."""
+    path: str
+    columns: List[str]
+    data: np.ndarray             # Read-only memmap, shape (rows, len(columns))
+    captures: List[Capture]
+
+    def capture(self, number: int) -> np.ndarray:
+        """Rows of one capture (a view, not a copy)."""
+        c = self.captures[number]
+        return self.data[c.row:c.row + c.rows]
+
+
+def read_samples(path: str) -> SampleFile:
+    """
+    Memory-map a store for analysis.
+
+    Raises:
+        ValueError: If the file is not a sample store.
+    """
+    with open(path, "rb") as f:
+        header = _read_header(f)
+    columns = header["columns"]
+    rows = header["rows"]
+    if rows:
+        data = np.memmap(path, dtype=np.dtype(header["dtype"]), mode="r", offset=HEADER_BYTES,
+                         shape=(rows, len(columns)))
+    else:
+        data = np.empty((0, len(columns)), dtype=np.dtype(header["dtype"]))
+    captures = []
+    if os.path.exists(index_path(path)):
+        with open(index_path(path), encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    if entry["row"] + entry["rows"] <= rows:  # Committed before the last header write
+                        captures.append(Capture(entry["row"], entry["rows"], entry["time"], entry["label"]))
+    return SampleFile(path, columns, data, captures)
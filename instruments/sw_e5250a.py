@@ -14,7 +14,7 @@ Reference: Agilent E5250A User's Guide (E5250_user.pdf), :ROUTe subsystem.
 """
 
 from .base import InstrumentBase
-from typing import List
+from typing import List, Optional, Sequence
 
 
 # Input port numbers for this setup (E5252A)
@@ -24,6 +24,10 @@ INPUT_VSS = 2   # Input 2 = VSS
 # Output count: 3 blades × 12 channels
 NUM_OUTPUTS = 36
 
+# Relay switching order used by apply_pattern()
+BREAK_BEFORE_MAKE = "break_before_make"
+MAKE_BEFORE_BREAK = "make_before_break"
+
 
 class SW_E5250A(InstrumentBase):
     """
@@ -44,10 +48,14 @@ class SW_E5250A(InstrumentBase):
             timeout: Communication timeout in ms (default: 5000)
         """
         super().__init__(resource_manager, address, "SW_E5250A", timeout)
+        # Known route per output (index 0 = output 1): True = VCC, False = VSS,
+        # None = open / unknown. Used by apply_pattern() to send only changes.
+        self._routes: List[Optional[bool]] = [None] * NUM_OUTPUTS
 
     def reset(self) -> None:
         """Reset the instrument to default state."""
         self.write("*RST")
+        self._routes = [None] * NUM_OUTPUTS
         self.logger.info("E5250A reset")
 
     def clear_status(self) -> None:
@@ -68,6 +76,7 @@ class SW_E5250A(InstrumentBase):
         # Open all possible connections: input 01 outputs 01-36, input 02 outputs 01-36
         # Channel list: (@101:136,@201:236) for 5-digit; short form 101:136, 201:236
         self.write(":ROUT:OPEN (@101:136,@201:236)")
+        self._routes = [None] * NUM_OUTPUTS
         self.logger.info("E5250A: all switches open")
 
     def connect_output_to_vcc(self, output_one_based: int) -> None:
@@ -81,6 +90,7 @@ class SW_E5250A(InstrumentBase):
             raise ValueError(f"output_one_based must be 1..{NUM_OUTPUTS}, got {output_one_based}")
         ch = self._channel_number(INPUT_VCC, output_one_based)
         self.write(f":ROUT:CLOS (@{ch})")
+        self._routes[output_one_based - 1] = True
         self.logger.debug(f"E5250A: output {output_one_based} → VCC (input 1)")
 
     def connect_output_to_vss(self, output_one_based: int) -> None:
@@ -94,6 +104,7 @@ class SW_E5250A(InstrumentBase):
             raise ValueError(f"output_one_based must be 1..{NUM_OUTPUTS}, got {output_one_based}")
         ch = self._channel_number(INPUT_VSS, output_one_based)
         self.write(f":ROUT:CLOS (@{ch})")
+        self._routes[output_one_based - 1] = False
         self.logger.debug(f"E5250A: output {output_one_based} → VSS (input 2)")
 
     def set_output(self, output_one_based: int, to_vcc: bool) -> None:
@@ -122,6 +133,63 @@ class SW_E5250A(InstrumentBase):
         for i, to_vcc in enumerate(pattern, start=1):
             self.set_output(i, to_vcc)
 
+    def apply_pattern(self, pattern: Sequence[bool],
+                      order: str = BREAK_BEFORE_MAKE) -> List[int]:
+        """
+        Move the matrix to a pattern, switching only the outputs that change.
+
+        Unlike set_outputs_from_pattern(), which sends one :ROUT:CLOS per output,
+        this compares against the last known route of each output and sends at
+        most one batched :ROUT:OPEN and one batched :ROUT:CLOS.
+
+        Args:
+            pattern: NUM_OUTPUTS booleans (True = VCC, False = VSS), output 1 first.
+            order: BREAK_BEFORE_MAKE opens the old routes before closing the new
+                   ones. MAKE_BEFORE_BREAK closes the new routes first; this only
+                   differs on hardware when the mainframe is in multiple-route
+                   mode, and then briefly ties each changed output to both VCC
+                   and VSS, so use it only where that is safe.
+
+        Returns:
+            Changed outputs (1-based), in ascending order.
+        """
+        if len(pattern) != NUM_OUTPUTS:
+            raise ValueError(f"pattern length must be {NUM_OUTPUTS}, got {len(pattern)}")
+        if order not in (BREAK_BEFORE_MAKE, MAKE_BEFORE_BREAK):
+            raise ValueError(f"order must be {BREAK_BEFORE_MAKE!r} or {MAKE_BEFORE_BREAK!r}, got {order!r}")
+
+        changed = []
+        to_open = []
+        to_close = []
+        for i, to_vcc in enumerate(pattern, start=1):
+            to_vcc = bool(to_vcc)
+            current = self._routes[i - 1]
+            if current is to_vcc:
+                continue
+            changed.append(i)
+            if current is not None:
+                to_open.append(self._channel_number(INPUT_VCC if current else INPUT_VSS, i))
+            to_close.append(self._channel_number(INPUT_VCC if to_vcc else INPUT_VSS, i))
+
+        if not changed:
+            return changed
+
+        open_cmd = f":ROUT:OPEN (@{','.join(to_open)})" if to_open else None
+        close_cmd = f":ROUT:CLOS (@{','.join(to_close)})"
+        if order == MAKE_BEFORE_BREAK:
+            self.write(close_cmd)
+            if open_cmd:
+                self.write(open_cmd)
+        else:
+            if open_cmd:
+                self.write(open_cmd)
+            self.write(close_cmd)
+
+        for i in changed:
+            self._routes[i - 1] = bool(pattern[i - 1])
+        self.logger.debug(f"E5250A: pattern applied, {len(changed)} output(s) switched")
+        return changed
+
     def _channel_number(self, input_port: int, output_port: int) -> str:
         """Format 5-digit channel for Auto Config: card 0, input 01-10, output 01-36."""
         return f"0{input_port:02d}{output_port:02d}"
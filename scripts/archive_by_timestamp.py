@@ -7,51 +7,70 @@ This script finds all files matching a given timestamp pattern and archives them
 into a compressed file in the archive directory.
 
 Usage:
-    python scripts/archive_by_timestamp.py <timestamp>
+    python scripts/archive_by_timestamp.py <timestamp> [--rescan]
     
     timestamp: Date/time pattern to match (e.g., "20251219_123124" or "20251219_1231")
+    --rescan:  bring the run index up to date with logs/ and measurements/
+               before the lookup
     
 Examples:
     python scripts/archive_by_timestamp.py 20251219_123124
     python scripts/archive_by_timestamp.py 20251219_1231
     
-The script searches in:
+Files are looked up in the run index (logs/run_index.sqlite, see
+experiments/run_index.py) among the files in:
     - logs/
     - measurements/
+Runners record their files in the index at shutdown; files of a run that
+did not shut down (or were added by hand) are found after --rescan or
+`python -m experiments.run_index scan`.
     
 All matching files from these directories are compressed into a single archive file placed in:
     - archive/
+The archive's members are then added to the run index.
 """
 
+import argparse
 import os
 import sys
 import zipfile
 from pathlib import Path
 
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def find_files_by_timestamp(timestamp_pattern: str, search_dirs: list) -> list:
+from experiments.run_index import RunIndex
+
+
+def find_files_by_timestamp(timestamp_pattern: str, search_dirs: list, index: RunIndex,
+                            rescan: bool = False) -> list:
     """
     Find all files matching the timestamp pattern in the given directories.
     
     Args:
         timestamp_pattern: Timestamp pattern to search for (e.g., "20251219_123124")
         search_dirs: List of directories to search
+        index: Run index to look the files up in
+        rescan: Update the index from search_dirs before the lookup (walks
+                and stats every file under them)
         
     Returns:
         List of Path objects for matching files
     """
-    matching_files = []
-    
     for search_dir in search_dirs:
         if not os.path.exists(search_dir):
             print(f"Warning: Directory {search_dir} does not exist, skipping...")
-            continue
-            
-        for root, dirs, files in os.walk(search_dir):
-            for file in files:
-                if timestamp_pattern in file:
-                    file_path = Path(root) / file
-                    matching_files.append(file_path)
+    
+    if rescan:
+        updated = index.scan([str(d) for d in search_dirs], archive_dir=None)
+        print(f"Run index updated from {[str(d) for d in search_dirs]} ({updated} new or changed file(s))")
+    
+    roots = [Path(d).resolve() for d in search_dirs]
+    matching_files = []
+    for indexed in index.files(pattern=timestamp_pattern, archived=False):
+        file_path = Path(indexed.path)
+        if file_path.is_file() and any(root in file_path.resolve().parents for root in roots):
+            matching_files.append(file_path)
     
     return matching_files
 
@@ -102,13 +121,13 @@ def create_archive(files: list, timestamp_pattern: str, archive_dir: Path) -> Pa
 
 def main():
     """Main function."""
-    if len(sys.argv) != 2:
-        print("Usage: python scripts/archive_by_timestamp.py <timestamp>")
-        print("\nExample:")
-        print("  python scripts/archive_by_timestamp.py 20251219_123124")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Archive the files of a run by timestamp")
+    parser.add_argument("timestamp", help='Date/time pattern to match (e.g. "20251219_123124")')
+    parser.add_argument("--rescan", action="store_true",
+                        help="Update the run index from logs/ and measurements/ first")
+    args = parser.parse_args()
     
-    timestamp_pattern = sys.argv[1]
+    timestamp_pattern = args.timestamp
     
     # Get project root (assuming script is in scripts/ directory)
     script_dir = Path(__file__).parent
@@ -125,10 +144,14 @@ def main():
     print()
     
     # Find matching files
-    matching_files = find_files_by_timestamp(timestamp_pattern, search_dirs)
+    index = RunIndex()
+    matching_files = find_files_by_timestamp(timestamp_pattern, search_dirs, index, rescan=args.rescan)
     
     if not matching_files:
+        index.close()
         print(f"No files found matching timestamp pattern: {timestamp_pattern}")
+        if not args.rescan:
+            print("(Files written outside a runner are indexed with --rescan.)")
         sys.exit(1)
     
     print(f"Found {len(matching_files)} matching file(s):")
@@ -139,6 +162,8 @@ def main():
     # Create archive
     archive_dir = project_root / "archive"
     archive_path = create_archive(matching_files, timestamp_pattern, archive_dir)
+    index.record_archive(str(archive_path))
+    index.close()
     
     print()
     print(f"Archive created successfully: {archive_path}")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Import-time benchmark for experiment entry points
+
+Measures how long each `python -m experiments.run_*` entry point takes to
+start, so slow imports (NumPy, matplotlib, pyvisa, eager package imports)
+do not creep back into the CLI path.
+
+For each entry point it reports:
+    - import: median in-process import time of the module
+    - --help: median wall-clock time of `python -m <module> --help`
+              (interpreter startup included)
+    - slowest: the modules with the largest cumulative import time
+               (from `python -X importtime`)
+
+Usage:
+    python scripts/bench_import_time.py [--runs N] [--top K] [--limit MS] [module ...]
+
+    --limit: exit with status 1 if any --help time exceeds MS milliseconds
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = [
+    "experiments.run_compute",
+    "experiments.run_kalman",
+    "experiments.run_big_kalman",
+    "experiments.run_programmer",
+    "experiments.run_sonos",
+    "experiments.run_voltage_measurement",
+    "experiments.multi_bench",
+]
+
+
+def _run(args):
+    return subprocess.run([sys.executable] + args, cwd=REPO_ROOT, capture_output=True, text=True)
+
+
+def startup_time_ms():
+    """Wall-clock time of an empty interpreter run, in ms."""
+    start = time.perf_counter()
+    _run(["-c", "pass"])
+    return (time.perf_counter() - start) * 1e3
+
+
+def import_time_ms(module):
+    """In-process import time of module (fresh interpreter), in ms."""
+    code = ("import time; t = time.perf_counter(); import {0}; "
+            "print((time.perf_counter() - t) * 1e3)").format(module)
+    result = _run(["-c", code])
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def help_time_ms(module):
+    """Wall-clock time of `python -m module --help`, in ms."""
+    start = time.perf_counter()
+    result = _run(["-m", module, "--help"])
+    elapsed = (time.perf_counter() - start) * 1e3
+    if result.returncode != 0:
+        raise RuntimeError(f"{module} --help failed:\n{result.stderr}")
+    return elapsed
+
+
+def slowest_imports(module, top):
+    """(cumulative ms, name) of the slowest imports below module, from -X importtime."""
+    result = _run(["-X", "importtime", "-c", f"import {module}"])
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        if name == module:
+            continue
+        entries.append((int(cumulative) / 1e3, name))
+    return sorted(entries, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark experiment entry point import time")
+    parser.add_argument("modules", nargs="*", default=ENTRY_POINTS, help="Modules to benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per measurement (default: 5)")
+    parser.add_argument("--top", type=int, default=3, help="Slowest imports to list (default: 3)")
+    parser.add_argument("--limit", type=float, default=None, help="Fail if --help exceeds this (ms)")
+    args = parser.parse_args()
+
+    baseline = statistics.median(startup_time_ms() for _ in range(args.runs))
+    print(f"Interpreter startup (python -c pass): {baseline:.1f} ms\n")
+    print(f"{'Entry point':<40} {'import':>10} {'--help':>10}")
+    print("-" * 62)
+
+    over_limit = []
+    for module in args.modules:
+        imp = statistics.median(import_time_ms(module) for _ in range(args.runs))
+        hlp = statistics.median(help_time_ms(module) for _ in range(args.runs))
+        print(f"{module:<40} {imp:>8.1f}ms {hlp:>8.1f}ms")
+        for cumulative, name in slowest_imports(module, args.top):
+            print(f"    {cumulative:>7.1f} ms  {name}")
+        if args.limit is not None and hlp > args.limit:
+            over_limit.append(module)
+
+    if over_limit:
+        print(f"\n--help slower than {args.limit:g} ms: {', '.join(over_limit)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Query Structured Instrument Command Logs
+
+Filters a structured command log (logs/<name>_inst_<timestamp>.kcl, see
+instruments/command_log.py) and prints the matching records in the text
+format of the old instrument command log, or a summary.
+
+Usage:
+    python scripts/query_command_log.py [LOG] [--instrument NAME ...] [--since T] [--until T]
+                                        [--command REGEX] [--op OP ...] [--errors]
+                                        [--durations] [--limit N] [--stats]
+
+    LOG:          .kcl file, or a name prefix such as "compute" (newest
+                  logs/<prefix>_inst_*.kcl); default: newest log
+    --since/--until: seconds from the start of the log, or an ISO time
+                  (e.g. 2025-12-19T12:31:24)
+    --command:    regular expression searched in the command text
+    --op:         WRITE, QUERY, READ, ERROR
+    --errors:     same as --op ERROR
+    --durations:  append the time each operation took
+    --stats:      print counts and time per instrument/operation and the
+                  commands with the most total time instead of records
+
+Examples:
+    python scripts/query_command_log.py compute --instrument IV5270B --command "^MM"
+    python scripts/query_command_log.py --errors
+    python scripts/query_command_log.py compute --since 120 --until 125 --durations
+"""
+
+import argparse
+import glob
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from instruments.base import LOG_DIR
+from instruments.command_log import OPS, CommandLogReader
+
+
+def find_log(name):
+    """Resolve a .kcl path or name prefix to a log file (newest match)."""
+    if name and os.path.exists(name):
+        return name
+    pattern = os.path.join(LOG_DIR, f"{name}_inst_*.kcl" if name else "*_inst_*.kcl")
+    matches = sorted(glob.glob(pattern), key=os.path.getmtime)
+    if not matches:
+        raise SystemExit(f"No command log matches {pattern}")
+    return matches[-1]
+
+
+def parse_time(value, reader):
+    """Seconds from the start of the log, from seconds or an ISO time."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp() - reader.start_epoch
+
+
+def print_stats(records):
+    """Counts/time per instrument and operation, and the costliest commands."""
+    per_op = defaultdict(lambda: [0, 0])
+    per_command = defaultdict(lambda: [0, 0])
+    first = last = None
+    for r in records:
+        per_op[(r.instrument, r.op)][0] += 1
+        per_op[(r.instrument, r.op)][1] += r.duration_us or 0
+        key = (r.instrument, r.command.split(" ")[0] if r.op != "READ" else "(read)")
+        per_command[key][0] += 1
+        per_command[key][1] += r.duration_us or 0
+        first = first or r
+        last = r
+    if first is None:
+        print("No matching records")
+        return
+    print(f"Records {first.number}-{last.number}, {first.time.isoformat()} - {last.time.isoformat()}")
+    print(f"\n{'Instrument':<12} {'Op':<6} {'count':>9} {'total ms':>12} {'mean us':>10}")
+    for (inst, op), (count, us) in sorted(per_op.items()):
+        print(f"{inst:<12} {op:<6} {count:>9} {us / 1000:>12.1f} {us / count:>10.1f}")
+    print(f"\n{'Instrument':<12} {'Command':<12} {'count':>9} {'total ms':>12}")
+    for (inst, cmd), (count, us) in sorted(per_command.items(), key=lambda kv: -kv[1][1])[:15]:
+        print(f"{inst:<12} {cmd:<12} {count:>9} {us / 1000:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query a structured instrument command log")
+    parser.add_argument("log", nargs="?", help="Log file or name prefix (default: newest log)")
+    parser.add_argument("--instrument", nargs="+", help="Instrument names to keep")
+    parser.add_argument("--since", help="Start time (s from log start, or ISO time)")
+    parser.add_argument("--until", help="End time (s from log start, or ISO time)")
+    parser.add_argument("--command", help="Regular expression searched in the command")
+    parser.add_argument("--op", nargs="+", choices=OPS, help="Operations to keep")
+    parser.add_argument("--errors", action="store_true", help="Only errors")
+    parser.add_argument("--durations", action="store_true", help="Show operation durations")
+    parser.add_argument("--limit", type=int, help="Print at most N records")
+    parser.add_argument("--stats", action="store_true", help="Summary instead of records")
+    args = parser.parse_args()
+
+    reader = CommandLogReader(find_log(args.log))
+    records = reader.records(
+        instruments=args.instrument,
+        start=parse_time(args.since, reader),
+        end=parse_time(args.until, reader),
+        command=args.command,
+        ops=["ERROR"] if args.errors else args.op,
+    )
+
+    if args.stats:
+        print(f"Log: {reader.path} ({reader.count} records)")
+        print_stats(records)
+        return
+
+    for n, record in enumerate(records):
+        if args.limit is not None and n >= args.limit:
+            break
+        print(record.text(durations=args.durations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Replay/Diff Regression Harness for Instrument Command Streams
+
+Runs an experiment in TEST_MODE with the binary command recorder
+(instruments/recorder.py) active and compares its command stream with a
+golden recording, so changes to batching and command elision can be checked
+not to change what the hardware receives.
+
+The comparison reports:
+    - transactions (writes/reads/queries) and commands (';'-batched writes
+      split) per instrument, golden vs new
+    - per-point command count deltas (points are delimited by mark_point())
+    - a semantic check: each instrument's settings are replayed as state
+      (keyed by mnemonic, plus the first argument - the channel - for FLEX
+      commands) and the state in effect at every action (XE, reads,
+      queries, argument-less commands such as *RST) must match. Batching,
+      reordering between actions and dropping redundant re-sends pass;
+      a changed value, channel or measurement sequence does not.
+
+Usage:
+    python scripts/replay_diff.py record <experiment> [--output PATH] [-- experiment args]
+    python scripts/replay_diff.py diff <experiment> [--golden PATH] [-- experiment args]
+    python scripts/replay_diff.py compare GOLDEN NEW
+
+    experiment: compute, kalman, big_kalman, programmer, sonos, voltage
+    --output/--golden: golden recording (default: logs/golden/<experiment>.klrec)
+    --points: number of changed points to list (default: 10)
+
+Examples:
+    python scripts/replay_diff.py record compute
+    python scripts/replay_diff.py diff compute -- --plan-engine
+
+diff and compare exit with status 1 if the streams are not semantically
+equivalent or the number of points differs.
+"""
+
+import argparse
+import os
+import runpy
+import sys
+import tempfile
+from collections import Counter, OrderedDict
+
+# Add parent directory to path for imports
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from instruments.base import LOG_DIR
+from instruments.recorder import CommandRecorder, read_recording, set_command_recorder
+
+GOLDEN_DIR = os.path.join(LOG_DIR, "golden")
+
+EXPERIMENTS = {
+    "compute": "experiments.run_compute",
+    "kalman": "experiments.run_kalman",
+    "big_kalman": "experiments.run_big_kalman",
+    "programmer": "experiments.run_programmer",
+    "sonos": "experiments.run_sonos",
+    "voltage": "experiments.run_voltage_measurement",
+}
+
+# Commands with arguments that still act (rather than configure)
+ACTION_COMMANDS = {"XE", "TI", "TV", "*TRG", ":INIT", "INIT", "*WAI", "*OPC"}
+
+
+def record_experiment(experiment, output, experiment_args=()):
+    """Run an experiment in TEST_MODE, recording its command stream to output."""
+    module = EXPERIMENTS[experiment]
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    recorder = CommandRecorder(output)
+    set_command_recorder(recorder)
+    argv = sys.argv
+    sys.argv = [module, "--test"] + list(experiment_args)
+    try:
+        runpy.run_module(module, run_name="__main__", alter_sys=True)
+    finally:
+        sys.argv = argv
+        set_command_recorder(None)
+        recorder.close()
+    return recorder.events
+
+
+def split_commands(command):
+    """Commands of one write (FLEX writes may batch several with ';')."""
+    return [c.strip() for c in command.split(";") if c.strip()]
+
+
+def _setting(command):
+    """(key, value) of a setting command, or None if the command is an action."""
+    mnemonic, _, args = command.partition(" ")
+    mnemonic = mnemonic.upper()
+    if not args or mnemonic.endswith("?") or mnemonic in ACTION_COMMANDS:
+        return None
+    if ":" in mnemonic or mnemonic.startswith("*"):
+        return mnemonic, args.strip()  # SCPI: one value per header
+    first, _, rest = args.partition(",")
+    return (mnemonic, first.strip()), rest.strip()
+
+
+class StreamSummary:
+    """Per-point counts and per-instrument semantic actions of one recording."""
+
+    def __init__(self, path):
+        self.path = path
+        self.points = []                 # [(label, Counter transactions, Counter commands)]
+        self.transactions = Counter()
+        self.commands = Counter()
+        self.actions = OrderedDict()     # instrument -> [(point index, action, state)]
+        state = {}
+        transactions, commands = Counter(), Counter()
+
+        for event in read_recording(path):
+            if event.kind == "POINT":
+                self.points.append((event.command, transactions, commands))
+                transactions, commands = Counter(), Counter()
+                continue
+            inst = event.instrument
+            transactions[inst] += 1
+            self.transactions[inst] += 1
+            inst_state = state.setdefault(inst, {})
+            actions = self.actions.setdefault(inst, [])
+            point = len(self.points)
+            if event.kind == "WRITE":
+                for command in split_commands(event.command):
+                    commands[inst] += 1
+                    self.commands[inst] += 1
+                    setting = _setting(command)
+                    if setting is not None:
+                        inst_state[setting[0]] = setting[1]
+                    else:
+                        actions.append((point, command, tuple(sorted(inst_state.items(), key=repr))))
+                        if command.upper() == "*RST":
+                            inst_state.clear()
+            else:
+                commands[inst] += 1
+                self.commands[inst] += 1
+                action = event.command if event.kind == "QUERY" else "READ"
+                actions.append((point, action, tuple(sorted(inst_state.items(), key=repr))))
+        if transactions:
+            self.points.append(("(after last point)", transactions, commands))
+
+    def label(self, point):
+        return self.points[point][0] if point < len(self.points) else "(after last point)"
+
+
+def semantic_diff(golden, new):
+    """First semantic difference per instrument as text lines (empty if equivalent)."""
+    lines = []
+    for inst in sorted(set(golden.actions) | set(new.actions)):
+        g_actions = golden.actions.get(inst, [])
+        n_actions = new.actions.get(inst, [])
+        for i, (g, n) in enumerate(zip(g_actions, n_actions)):
+            if g[1:] == n[1:]:
+                continue
+            lines.append(f"{inst}: action {i + 1} differs (golden point {golden.label(g[0])}, "
+                         f"new point {new.label(n[0])})")
+            lines.append(f"    golden: {g[1]}    new: {n[1]}")
+            g_state, n_state = dict(g[2]), dict(n[2])
+            for key in sorted(set(g_state) | set(n_state), key=repr):
+                if g_state.get(key) != n_state.get(key):
+                    lines.append(f"    {key}: golden={g_state.get(key)!r} new={n_state.get(key)!r}")
+            break
+        else:
+            if len(g_actions) != len(n_actions):
+                lines.append(f"{inst}: {len(g_actions)} actions in golden, {len(n_actions)} in new")
+    return lines
+
+
+def report(golden, new, max_points=10):
+    """Print the comparison; return True if the streams are equivalent."""
+    instruments = sorted(set(golden.transactions) | set(new.transactions))
+    print(f"Golden: {golden.path} ({len(golden.points)} points)")
+    print(f"New:    {new.path} ({len(new.points)} points)")
+    print()
+    print(f"{'Instrument':<12} {'transactions':>28} {'commands':>28}")
+    for inst in instruments + ["TOTAL"]:
+        if inst == "TOTAL":
+            gt, nt = sum(golden.transactions.values()), sum(new.transactions.values())
+            gc, nc = sum(golden.commands.values()), sum(new.commands.values())
+        else:
+            gt, nt = golden.transactions[inst], new.transactions[inst]
+            gc, nc = golden.commands[inst], new.commands[inst]
+        print(f"{inst:<12} {gt:>8} -> {nt:>8} ({nt - gt:+7}) {gc:>8} -> {nc:>8} ({nc - gc:+7})")
+
+    changed = []
+    deltas = Counter()
+    for i, (g, n) in enumerate(zip(golden.points, new.points)):
+        delta = {inst: n[1][inst] - g[1][inst] for inst in set(g[1]) | set(n[1]) if n[1][inst] != g[1][inst]}
+        deltas[sum(delta.values())] += 1
+        if delta or g[0] != n[0]:
+            changed.append((i, g[0], n[0], delta))
+    print()
+    print(f"Points with changed transaction counts: {len(changed)}/{min(len(golden.points), len(new.points))}")
+    for total, count in sorted(deltas.items()):
+        print(f"    {total:+d} transactions: {count} point(s)")
+    for i, g_label, n_label, delta in changed[:max_points]:
+        label = g_label if g_label == n_label else f"{g_label} / new {n_label}"
+        print(f"    [{i + 1}] {label}: " + (", ".join(f"{k} {v:+d}" for k, v in sorted(delta.items())) or "label differs"))
+
+    print()
+    equivalent = True
+    if len(golden.points) != len(new.points):
+        print(f"Point count differs: {len(golden.points)} golden, {len(new.points)} new")
+        equivalent = False
+    differences = semantic_diff(golden, new)
+    if differences:
+        print("Semantic check: DIFFERENT")
+        for line in differences:
+            print(f"  {line}")
+        equivalent = False
+    else:
+        actions = sum(len(a) for a in new.actions.values())
+        print(f"Semantic check: equivalent ({actions} actions on {len(new.actions)} instruments)")
+    return equivalent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and diff instrument command streams")
+    sub = parser.add_subparsers(dest="action", required=True)
+    rec = sub.add_parser("record", help="Record a golden command stream")
+    rec.add_argument("experiment", choices=sorted(EXPERIMENTS))
+    rec.add_argument("--output", help="Golden recording (default: logs/golden/<experiment>.klrec)")
+    dif = sub.add_parser("diff", help="Run an experiment and compare with its golden recording")
+    dif.add_argument("experiment", choices=sorted(EXPERIMENTS))
+    dif.add_argument("--golden", help="Golden recording (default: logs/golden/<experiment>.klrec)")
+    dif.add_argument("--points", type=int, default=10, help="Changed points to list (default: 10)")
+    cmp_ = sub.add_parser("compare", help="Compare two recordings")
+    cmp_.add_argument("golden")
+    cmp_.add_argument("new")
+    cmp_.add_argument("--points", type=int, default=10, help="Changed points to list (default: 10)")
+
+    argv = sys.argv[1:]
+    experiment_args = []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, experiment_args = argv[:split], argv[split + 1:]
+    args = parser.parse_args(argv)
+
+    if args.action == "record":
+        output = args.output or os.path.join(GOLDEN_DIR, f"{args.experiment}.klrec")
+        events = record_experiment(args.experiment, output, experiment_args)
+        print(f"\nRecorded {events} events to {output}")
+        return
+
+    if args.action == "compare":
+        equivalent = report(StreamSummary(args.golden), StreamSummary(args.new), args.points)
+    else:
+        golden_path = args.golden or os.path.join(GOLDEN_DIR, f"{args.experiment}.klrec")
+        if not os.path.exists(golden_path):
+            parser.error(f"No golden recording at {golden_path}; create it with: record {args.experiment}")
+        fd, new_path = tempfile.mkstemp(suffix=".klrec", prefix=f"{args.experiment}_")
+        os.close(fd)
+        try:
+            record_experiment(args.experiment, new_path, experiment_args)
+            print()
+            equivalent = report(StreamSummary(golden_path), StreamSummary(new_path), args.points)
+        finally:
+            os.remove(new_path)
+    sys.exit(0 if equivalent else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Terminal-to-channel allocator (configs/allocator.py)."""
+
+import importlib.util
+
+import pytest
+
+from configs import compute
+from configs.allocator import allocate, read_instrument_csv, render_config_module, transaction_report
+
+
+@pytest.fixture(scope="module")
+def generated():
+    config = allocate("Compute", read_instrument_csv()["Compute"])
+    return config, render_config_module(config)
+
+
+def _load(source, tmp_path):
+    path = tmp_path / "compute_generated.py"
+    path.write_text(source.replace("from .resource_types", "from configs.resource_types"))
+    spec = importlib.util.spec_from_file_location("compute_generated", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_generated_module_replaces_hand_written(generated, tmp_path):
+    config, source = generated
+    module = _load(source, tmp_path)
+    names = [n for n in vars(compute) if n.startswith("COMPUTE_")]
+    assert [n for n in names if not hasattr(module, n)] == []
+    assert module.COMPUTE_CONFIG == config._replace(measurement_profiles=module.COMPUTE_MEASUREMENT_PROFILES)
+    assert {t: sorted(v) for t, v in module.COMPUTE_BY_TYPE.items()} == \
+        {t: sorted(v) for t, v in compute.COMPUTE_BY_TYPE.items()}
+    assert sorted(module.COMPUTE_FIXED_CURRENT_TERMINALS) == sorted(compute.COMPUTE_FIXED_CURRENT_TERMINALS)
+    assert module.COMPUTE_PPG_STATES == compute.COMPUTE_PPG_STATES
+    assert module.COMPUTE_MEASUREMENT_PROFILES == compute.COMPUTE_MEASUREMENT_PROFILES
+
+
+def test_compute_groups_match_run_compute(generated):
+    config, _ = generated
+    report = transaction_report(config)
+    # One MM on the 5270B (OUT1 + source voltages), one on the 4156B
+    assert [g["instruments"] for g in report["measurement_groups"]] == [["IV5270B"], ["IV4156B"]]
+    assert report == transaction_report(compute.COMPUTE_CONFIG)
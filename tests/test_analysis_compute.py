@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""Compute CSV analysis helpers (analysis/compute.py)."""
+
+import math
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from analysis.compute import round_sig_figs
+
+
+def _reference(x, n=5):
+    if not math.isfinite(x) or x == 0:
+        return x
+    try:
+        return round(x, n - 1 - math.floor(math.log10(abs(x))))
+    except OverflowError:
+        return x
+
+
+def test_round_sig_figs_extremes_without_warnings():
+    values = [sys.float_info.max, -1.5e308, 9.99999e307, 1.23456789e307, 5e-324, 1e-310,
+              0.0, -0.0, math.nan, math.inf, -math.inf, 1.01845e-05, 123456.5]
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        result = round_sig_figs(np.array(values))
+        scalar = round_sig_figs(sys.float_info.max)
+        series = round_sig_figs(pd.Series(values, name="OUT1_current"))
+    expected = [_reference(v) for v in values]
+    np.testing.assert_array_equal(result, expected)
+    np.testing.assert_array_equal(series.to_numpy(), expected)
+    assert series.name == "OUT1_current"
+    assert scalar == sys.float_info.max
+    assert result[9] == math.inf and math.isnan(result[8])
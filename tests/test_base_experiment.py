@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""Spot response parsing in ExperimentRunner (experiments/base_experiment.py)."""
+
+from configs.compute import COMPUTE_CONFIG
+from configs.resource_types import ConfigIndex
+from experiments.base_experiment import ExperimentRunner
+
+
+class _Runner(ExperimentRunner):
+    """ExperimentRunner with only the terminal lookup (no instruments or logs)."""
+
+    def __init__(self):
+        self.config = COMPUTE_CONFIG
+        self.config_index = ConfigIndex(COMPUTE_CONFIG)
+
+
+def _element(terminal, value, status="N"):
+    channel = COMPUTE_CONFIG.terminals[terminal].channel
+    return f"{status}{chr(ord('A') + channel - 1)}I{value:+.6E}"
+
+
+def test_readings_follow_the_channel_header_not_the_order():
+    runner = _Runner()
+    data = ",".join([_element("OUT2", 2e-9), _element("OUT1", 1e-9)])
+    readings = runner.terminal_readings(("OUT1", "OUT2"), data)
+    assert readings["OUT1"].value == 1e-9
+    assert readings["OUT2"].value == 2e-9
+
+
+def test_missing_channel_gives_none():
+    runner = _Runner()
+    readings = runner.terminal_readings(("OUT1", "OUT2"), _element("OUT1", 1e-9) + ",garbage")
+    assert readings["OUT1"].value == 1e-9
+    assert readings["OUT2"] is None
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""E5270B sampling response parsing (instruments/iv_5270b.py)."""
+
+import numpy as np
+import pytest
+
+from instruments.iv_5270b import parse_sampling_data
+
+
+def _response(n, channels=1, timed=True):
+    elements = []
+    for i in range(n):
+        if timed:
+            elements.append(f"NAT{0.5 + i * 1e-3:+.6E}")
+        elements.extend(f"N{'AB'[c]}I{(i + 1) * (c + 1) * 1e-9:+.6E}" for c in range(channels))
+    return ",".join(elements)
+
+
+def test_time_stamps_relative_to_first_point():
+    result = parse_sampling_data(_response(4, channels=2) + "\r\n", 2, 0.01)
+    assert result.shape == (4, 3)
+    np.testing.assert_allclose(result[:, 0], [0.0, 1e-3, 2e-3, 3e-3], atol=1e-12)
+    np.testing.assert_allclose(result[:, 2], [2e-9, 4e-9, 6e-9, 8e-9])
+
+
+def test_untimed_points_use_the_interval():
+    result = parse_sampling_data(_response(3, timed=False), 1, 0.01)
+    np.testing.assert_allclose(result[:, 0], [0.0, 0.01, 0.02])
+
+
+def test_trailing_comma():
+    result = parse_sampling_data("NAI+1.000E-09,NAI+2.000E-09,", 1, 0.01)
+    np.testing.assert_allclose(result[:, 1], [1e-9, 2e-9])
+
+
+@pytest.mark.parametrize("data", [
+    "NAI+1.000E-09,EAIGARBAGE,NAI+2.000E-09",
+    "NAI+1.000E-09,,NAI+2.000E-09",
+    "NAI+1.000E-09,NA,NAI+2.000E-09",
+])
+def test_malformed_elements_are_skipped(data):
+    result = parse_sampling_data(data, 1, 0.01)
+    np.testing.assert_allclose(result[:, 1], [1e-9, 2e-9])
+
+
+def test_trailing_garbage_after_value():
+    result = parse_sampling_data("NAI+1.000E-09;", 1, 0.01)
+    np.testing.assert_allclose(result[:, 1], [1e-9])
+
+
+def test_decodes_into_out_and_drops_points_beyond_it():
+    out = np.zeros((2, 2))
+    result = parse_sampling_data(_response(5), 1, 0.01, out=out)
+    assert np.shares_memory(result, out)
+    np.testing.assert_allclose(out[:, 1], [1e-9, 2e-9])
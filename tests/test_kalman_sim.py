@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""Offline Kalman loop simulator (experiments/kalman_sim.py)."""
+
+import numpy as np
+import pytest
+
+from experiments import kalman_sim
+
+IMEAS = 50e-9 + 20e-9 * np.sin(np.linspace(0.0, 6.0, 400))
+
+
+def _spread(metrics, key):
+    values = metrics[key]
+    return float(np.max(values) - np.min(values))
+
+
+@pytest.mark.parametrize("axis, values", [
+    ("KGAIN1", [10e-9, 25e-9, 50e-9]),
+    ("KGAIN2", [0.1e-9, 0.25e-9, 1e-9]),
+    ("F11", [90e-9, 100e-9, 110e-9]),
+    ("F12", [0.5e-9, 1e-9, 5e-9]),
+])
+def test_filter_parameters_change_the_outputs(axis, values):
+    metrics = kalman_sim.simulate(IMEAS, kalman_sim.parameter_grid(**{axis: values}))
+    assert _spread(metrics, "RMS_ERR1") > 1e-12 or _spread(metrics, "FINAL_X2") > 1e-12
+
+
+def test_kalman_model_tracks_imeas():
+    params = kalman_sim.parameter_grid(KGAIN1=[50e-9])
+    tracking = kalman_sim.simulate(IMEAS, params)
+    static = kalman_sim.simulate(IMEAS, params, kalman_sim.out_tracks_x)
+    assert tracking["RMS_ERR1"][0] < static["RMS_ERR1"][0]
+
+
+def test_tracks_x_model_ignores_filter_parameters():
+    params = kalman_sim.parameter_grid(KGAIN1=[10e-9, 50e-9], F12=[0.5e-9, 5e-9])
+    metrics = kalman_sim.simulate(IMEAS, params, kalman_sim.out_tracks_x)
+    assert _spread(metrics, "FINAL_X1") < 1e-18
+    assert set(kalman_sim.IGNORED_PARAMETERS["tracks_x"]) == {"KGAIN1", "KGAIN2", "F11", "F12"}
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""Run index (experiments/run_index.py)."""
+
+from experiments.run_index import SHORT_NAMES, RunIndex, classify
+
+
+def _touch(path, text="a,b\n1,2\n"):
+    path.write_text(text)
+    return str(path)
+
+
+def test_voltage_measurement_runs_are_not_compute_runs(tmp_path):
+    compute_csv = _touch(tmp_path / "compute_20250101_120000.csv")
+    voltage_csv = _touch(tmp_path / "current_source_voltages_ERASE_20250101_130000.csv")
+    with RunIndex(str(tmp_path / "index.sqlite")) as index:
+        index.record_run("compute_20250101_120000", "Compute", {compute_csv: "csv"})
+        index.record_run(f"{SHORT_NAMES['VoltageMeasurement']}_20250101_130000",
+                         "VoltageMeasurement", {voltage_csv: "csv"})
+        assert index.latest("Compute", "csv").name == "compute_20250101_120000.csv"
+        assert index.latest("VoltageMeasurement", "csv").name == \
+            "current_source_voltages_ERASE_20250101_130000.csv"
+
+
+def test_classify_names_runner_files():
+    assert classify("current_source_voltages_PROGRAM_20250101_130000.csv")[1] == "VoltageMeasurement"
+    assert classify("voltage_20250101_130000.log")[1] == "VoltageMeasurement"
+    assert classify("compute_20250101_120000.csv")[1] == "Compute"
+    assert classify("kalman_inst_20250101_120000.kcl")[1] == "Kalman"
+    assert classify("big_kalman_20250101_120000.csv")[1] == "BigKalman"
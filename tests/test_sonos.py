@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Sonos PROG_ACTUAL against a simulated cell (no instruments)."""
+
+import logging
+
+import pytest
+
+from configs import sonos_settings as SETTINGS
+from experiments.cell_init_controller import CellInitController
+from experiments.run_sonos import SonosExperiment
+
+
+class SimulatedSonos(SonosExperiment):
+    """
+    SonosExperiment whose ICELLMEAS comes from a simple cell model.
+
+    A WR_ENB pulse of w seconds moves ICELLMEAS by 0.8 nA per 10 ms (down in
+    program mode, up in erase mode); in program mode it also drops by a
+    fraction PROG_IN / 1 uA of the current per 100 ms.
+    """
+
+    def __init__(self, current: float = SETTINGS.IMAX, model: bool = False):
+        # No ExperimentRunner.__init__: no instruments, logs or run index
+        self.test_mode = True
+        self.logger = logging.getLogger("test_sonos")
+        self.vdd = SETTINGS.VDD
+        self.vcc = SETTINGS.VCC
+        self._mapping = SETTINGS.cell_init_pulse_time
+        self._cell_init_controller = (
+            CellInitController(self._mapping, max_pulse=SETTINGS.WR_ENB_MAX_PULSE_SEC)
+            if model else None)
+        self._max_pulse_sec = SETTINGS.WR_ENB_MAX_PULSE_SEC
+        self._target_error = SETTINGS.TARGET_ERROR
+        self._imax = SETTINGS.IMAX
+        self._imin = SETTINGS.IMIN
+        self._current_mode = "PROGRAM"
+        self.current = current
+        self.prog_in = 0.0
+
+    def set_terminal_current(self, terminal, current, compliance=None):
+        if terminal == "PROG_IN":
+            self.prog_in = current
+
+    def set_terminal_voltage(self, terminal, voltage, compliance=None):
+        pass
+
+    def _measure_icellmeas_current(self, label=""):
+        return self.current
+
+    def trigger_wr_enb(self, pulse_width_seconds):
+        width = min(max(0.0, pulse_width_seconds), self._max_pulse_sec)
+        linear = 0.8e-9 * width / 0.01
+        if self._current_mode == "ERASE":
+            self.current += linear
+        else:
+            self.current -= linear + self.current * (self.prog_in / 1e-6) * width / 0.1
+
+    def _initialize_csv_output(self, test_type):
+        pass
+
+    def _write_row(self, *args, **kwargs):
+        pass
+
+
+@pytest.mark.parametrize("model", [False, True], ids=["mapping", "model"])
+def test_prog_actual_restores_start_current_before_going_back(monkeypatch, model):
+    monkeypatch.setattr(SETTINGS, "PROG_ACTUAL_STRATEGY", "bisection")
+    monkeypatch.setattr(SETTINGS, "PROG_ACTUAL_REUSE_BEFORE", False)
+    monkeypatch.setattr(SETTINGS, "CELL_INIT_ALLOW_ERASE", False)
+    prog_in_list = list(SETTINGS.PROG_ACTUAL_PROG_IN_LIST)
+
+    results = SimulatedSonos(model=model).run_prog_actual()
+
+    visits = [(prog_in_list.index(m["param"]), m["ICELLMEAS_BEFORE"])
+              for m in results["measurements"] if m["phase"] == "PROGRAM"]
+    starts = {}
+    went_back = 0
+    previous = None
+    for index, before in visits:
+        if previous is not None and index < previous:
+            lower = [i for i in starts if i < index]
+            expected = starts[max(lower)] if lower else SETTINGS.IMAX
+            assert before == pytest.approx(expected, abs=SETTINGS.TARGET_ERROR)
+            went_back += 1
+        starts[index] = before
+        previous = index
+    assert went_back